@@ -1,9 +1,13 @@
+import bisect
 import os
 import shutil
-from core.utils import get_files_in_folder
+from core import archives
+from core.utils import IMAGE_EXTENSIONS, get_files_in_folder, archive_pages
+from batch.claims import ClaimStore, DEFAULT_LEASE
+from batch.journal import Journal, recover, return_page
 
 class BatchManager:
-    def __init__(self, root_dir):
+    def __init__(self, root_dir, owner=None, lease=DEFAULT_LEASE):
         self.root_dir = root_dir
         self.todo_dir = os.path.join(root_dir, "_para_procesar")
         self.done_dir = os.path.join(root_dir, "_processed")
@@ -25,50 +29,242 @@ class BatchManager:
             
         self.files = []
         self.current_index = -1
+        self.last_added = [] # Pages reported by the last apply_changes()
+        self.listing = {} # Directory listings of the last scan (seeds FolderWatcher)
+        
+        # Several operators may share one batch folder: each page is claimed
+        # before it is shown, and the claim is released once it is moved or
+        # navigated away from (or expires if this instance dies).
+        self.claims = ClaimStore(root_dir, owner=owner, lease=lease)
+        self.claims.start_heartbeat()
+        
+        # Saves and moves go through a write-ahead journal; work a crashed
+        # instance left half done is repaired before this one starts.
+        self.recovery = recover(root_dir, self.todo_dir, self.done_dir,
+                                live_owners=self.claims.live_owners(), stale_after=lease)
+        self.journal = Journal(root_dir, self.claims.owner, lease=lease)
 
     def scan(self):
-        self.files = get_files_in_folder(self.todo_dir)
+        self.listing = {}
+        self.files = get_files_in_folder(self.todo_dir, listing=self.listing)
         # If no files in todo, maybe check root? No, stick to structure.
-        self.current_index = 0 if self.files else -1
+        self.current_index = self._claim_from(0, 1)
         return len(self.files)
 
+    def apply_changes(self, added, removed):
+        """
+        Applies an incremental change of the todo tree (see FolderWatcher) to
+        the sorted file list, keeping the cursor on the current page.
+        Returns (pages added, pages removed, current page changed). The current
+        page changes if it disappeared (renamed, or moved by another operator),
+        or if nothing was current and a new page could be claimed.
+        """
+        current = self.current_rel_path()
+        added, gone = self._expand_archives(added, removed)
+        self.last_added = added # Expanded pages (archives listed member by member)
+        before = len(self.files)
+        if gone:
+            if len(gone) < 64:
+                for rel_path in gone:
+                    i = bisect.bisect_left(self.files, rel_path)
+                    if i < len(self.files) and self.files[i] == rel_path:
+                        self.files.pop(i)
+            else:
+                self.files = [f for f in self.files if f not in gone]
+        n_removed = before - len(self.files) # Our own moves are already gone from the list
+
+        before = len(self.files)
+        if added:
+            if len(added) < 64:
+                for rel_path in added:
+                    i = bisect.bisect_left(self.files, rel_path)
+                    if i == len(self.files) or self.files[i] != rel_path:
+                        self.files.insert(i, rel_path)
+            else:
+                self.files = sorted(set(self.files).union(added))
+        n_added = len(self.files) - before
+
+        if current is None:
+            if n_added:
+                self.current_index = self._claim_from(0, 1)
+            return n_added, n_removed, self.current_index != -1
+        if current in gone:
+            self.claims.release(current)
+            start = bisect.bisect_left(self.files, current) # Where it was: continue from there
+            self.current_index = self._claim_from(start, 1)
+            return n_added, n_removed, True
+        self.current_index = bisect.bisect_left(self.files, current)
+        return n_added, n_removed, False
+
+    def _expand_archives(self, added, removed):
+        """
+        The watcher reports archives as single entries: an added archive stands
+        for its pending pages, a removed one for every page listed under it.
+        """
+        pages = []
+        for rel_path in added:
+            if archives.is_archive(rel_path):
+                pages.extend(archive_pages(self.todo_dir, rel_path))
+            else:
+                pages.append(rel_path)
+        gone = set()
+        for rel_path in removed:
+            if archives.is_archive(rel_path):
+                archives.close(os.path.join(self.todo_dir, rel_path))
+                # Members sort together, right after "<archive>/"
+                lo = bisect.bisect_left(self.files, rel_path + os.sep)
+                hi = bisect.bisect_left(self.files, rel_path + chr(ord(os.sep) + 1))
+                gone.update(self.files[lo:hi])
+            else:
+                gone.add(rel_path)
+        return pages, gone
+
+    def _is_pending(self, rel_path):
+        """The page is still waiting in todo (for archive members: not in the sidecar)."""
+        path = os.path.join(self.todo_dir, rel_path)
+        archive, member = archives.split_path(path)
+        if archive is None:
+            return os.path.exists(path)
+        return member not in archives.processed_members(archive)
+
+    def _claim_from(self, start, step):
+        """
+        Index of the first page from `start` (walking by `step`, wrapping) that
+        this instance could claim, or -1. Pages already moved by another
+        operator are dropped from the list on the way.
+        """
+        i = start
+        tried = 0
+        while self.files and tried < len(self.files):
+            i %= len(self.files)
+            rel_path = self.files[i]
+            if self.claims.try_claim(rel_path):
+                if self._is_pending(rel_path):
+                    return i
+                # Processed by someone else between our scan and the claim
+                self.claims.release(rel_path)
+                self.files.pop(i)
+                if step < 0:
+                    i -= 1
+                continue
+            i += step
+            tried += 1
+        return -1
+
+    def _release_current(self):
+        rel_path = self.current_rel_path()
+        if rel_path:
+            self.claims.release(rel_path)
+
+    def claimed_by_others(self):
+        """Pages in the list currently held by other operators."""
+        return sum(1 for f in self.files if f not in self.claims.held and self.claims.owner_of(f))
+
     def current_path(self):
         if 0 <= self.current_index < len(self.files):
             return os.path.join(self.todo_dir, self.files[self.current_index])
         return None
 
+    def current_rel_path(self):
+        if 0 <= self.current_index < len(self.files):
+            return self.files[self.current_index]
+        return None
+
     def next_image(self):
         if not self.files:
             return None
         
-        self.current_index = (self.current_index + 1) % len(self.files)
+        self._release_current()
+        self.current_index = self._claim_from(self.current_index + 1, 1)
         return self.current_path()
     
     def prev_image(self):
         if not self.files:
             return None
-        self.current_index = (self.current_index - 1) % len(self.files)
+        self._release_current()
+        self.current_index = self._claim_from(self.current_index - 1, -1)
         return self.current_path()
 
     def mark_current_processed(self):
         path = self.current_path()
-        if path and os.path.exists(path):
+        if path and self._is_pending(self.files[self.current_index]):
             # Use the relative path stored in self.files to preserve structure
             rel_path = self.files[self.current_index]
             dest = os.path.join(self.done_dir, rel_path)
             
-            # Ensure destination directory exists
-            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if not self.claims.holds(rel_path):
+                # Our lease lapsed: re-claim unless another operator took the page over
+                self.claims.release(rel_path) # Only forgets it if the file isn't ours
+                if not self.claims.try_claim(rel_path):
+                    print(f"Claim on {rel_path} lost to {self.claims.owner_of(rel_path)}; not moving it")
+                    self.files.pop(self.current_index)
+                    self.current_index = self._claim_from(self.current_index, 1)
+                    return False
             
+            archive, member = archives.split_path(path)
             try:
-                shutil.move(path, dest)
+                if archive is None:
+                    self._move(rel_path, path, dest)
+                else:
+                    # Members can't be moved: record them in the sidecar, and move
+                    # the archive itself once none of its pages is left
+                    done = archives.mark_processed(archive, member)
+                    if not set(archives.members(archive, IMAGE_EXTENSIONS)) - done:
+                        try:
+                            self._move_archive(archive)
+                        except Exception as e: # The page itself is recorded; another operator may have moved it
+                            print(f"Error moving archive: {e}")
+                # Release only after the move, so nobody can claim a page that is still in todo
+                self.claims.release(rel_path)
                 # Remove from list
                 self.files.pop(self.current_index)
-                # Adjust index
-                if self.current_index >= len(self.files):
-                    self.current_index = 0 if self.files else -1
+                # Adjust index: next page this instance can claim
+                self.current_index = self._claim_from(self.current_index, 1)
                 return True
             except Exception as e:
                 print(f"Error moving file: {e}")
                 return False
         return False
+
+    def return_page(self, rel_path):
+        """
+        Puts a processed page back in todo (its crop failed to save after it was
+        moved) and lists it again. Returns True if it was returned.
+        """
+        try:
+            returned = return_page(rel_path, self.todo_dir, self.done_dir, set())
+        except (OSError, TimeoutError) as e:
+            print(f"Error returning {rel_path} to todo: {e}")
+            return False
+        if returned:
+            self.apply_changes([rel_path], [])
+        return returned
+
+    def _move(self, rel_path, path, dest):
+        # Ensure destination directory exists
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        
+        # Intent on disk first (this also covers every save intent before it),
+        # so a crash mid-move is finished or undone on the next start
+        txn = self.journal.begin("move", source=rel_path)
+        self.journal.sync()
+        try:
+            shutil.move(path, dest)
+        except Exception as e:
+            self.journal.commit(txn, error=str(e)) # Nothing for recovery to redo
+            raise
+        self.journal.commit(txn)
+
+    def _move_archive(self, archive):
+        """Moves a finished archive (and its sidecar, as the record of its pages) to _processed."""
+        rel_path = os.path.relpath(archive, self.todo_dir)
+        archives.close(archive)
+        self._move(rel_path, archive, os.path.join(self.done_dir, rel_path))
+        sidecar = archives.sidecar_path(archive)
+        if os.path.exists(sidecar):
+            shutil.move(sidecar, archives.sidecar_path(os.path.join(self.done_dir, rel_path)))
+
+    def close(self):
+        """Releases this instance's claims and closes the journal (call when closing the batch)."""
+        self.journal.close()
+        self.claims.close()
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+CLAIMS_DIR = "_claims"
+DEFAULT_LEASE = 120.0 # Seconds a claim stays valid without a heartbeat
+
+def pid_alive(pid):
+    """False only if no process `pid` runs on this host; True when unsure."""
+    if not isinstance(pid, int) or pid <= 0:
+        return True # Unknown pid: leave it to lease expiry
+    if os.name == "nt":
+        return _pid_alive_windows(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True # Exists but belongs to someone else (or can't tell)
+    return True
+
+def _pid_alive_windows(pid):
+    # os.kill(pid, 0) sends CTRL_C_EVENT on Windows; ask the process table instead
+    import ctypes
+    from ctypes import wintypes
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    STILL_ACTIVE = 259
+    ERROR_INVALID_PARAMETER = 87 # No such process
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.GetExitCodeProcess.argtypes = (wintypes.HANDLE, ctypes.POINTER(wintypes.DWORD))
+    kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return ctypes.get_last_error() != ERROR_INVALID_PARAMETER # Access denied: exists
+    try:
+        code = wintypes.DWORD()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+            return True
+        return code.value == STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+class ClaimStore:
+    """
+    Lease-based page claims shared by every operator of one batch folder.
+
+    A claim is a small JSON file in <root>/_claims, created with
+    O_CREAT | O_EXCL so exactly one instance wins it. The holder rewrites it
+    (heartbeat) before `lease` runs out; an expired claim, or one left by a
+    dead process on this host, may be taken over by anyone. Expiry uses wall
+    clock time, so workstations are expected to be NTP-synced.
+    """
+    def __init__(self, root_dir, owner=None, lease=DEFAULT_LEASE):
+        self.dir = os.path.join(root_dir, CLAIMS_DIR)
+        os.makedirs(self.dir, exist_ok=True)
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        # Unique per instance unless configured (a fixed owner lets a restarted
+        # workstation resume its own claims)
+        self.owner = owner or f"{self.host}:{self.pid}:{uuid.uuid4().hex[:6]}"
+        self.lease = lease
+        self.held = {} # rel_path -> claim file path
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _claim_path(self, rel_path):
+        # Flat directory; hashed names avoid nested folders and odd characters
+        key = hashlib.sha1(rel_path.replace(os.sep, "/").encode("utf-8")).hexdigest()
+        return os.path.join(self.dir, key + ".claim")
+
+    def _record(self, rel_path):
+        now = time.time()
+        return {"source": rel_path, "owner": self.owner, "host": self.host, "pid": self.pid,
+                "claimed": now, "expires": now + self.lease}
+
+    def _read(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_stale(self, path, info):
+        if info is None:
+            # Unreadable (half-written or corrupt): judge by age instead
+            try:
+                return time.time() - os.path.getmtime(path) > self.lease
+            except OSError:
+                return False
+        if info.get("expires", 0) < time.time():
+            return True
+        # Crashed instance on this workstation: no need to wait for expiry
+        pid = info.get("pid")
+        return info.get("host") == self.host and pid is not None and pid != self.pid and not pid_alive(pid)
+
+    def _create(self, path, rel_path):
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._record(rel_path), f)
+
+    def try_claim(self, rel_path):
+        """Claims a page. True if this instance now holds it."""
+        path = self._claim_path(rel_path)
+        with self._lock:
+            if rel_path in self.held:
+                return True
+            try:
+                self._create(path, rel_path)
+                self.held[rel_path] = path
+                return True
+            except FileExistsError:
+                pass
+            info = self._read(path)
+            if info and info.get("owner") == self.owner:
+                self.held[rel_path] = path # Our own claim from before a rescan
+                return True
+            if not self._is_stale(path, info):
+                return False
+            if self._take_over(path, rel_path):
+                self.held[rel_path] = path
+                return True
+            return False
+
+    def _take_over(self, path, rel_path):
+        """Replaces a stale claim; a second O_EXCL file makes takeovers one at a time."""
+        lock = path + ".takeover"
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > self.lease:
+                    os.remove(lock) # Left by a crash mid-takeover
+            except OSError:
+                pass
+            return False
+        try:
+            # Re-check under the lock: another instance may have taken it over already
+            if os.path.exists(path) and not self._is_stale(path, self._read(path)):
+                return False
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._create(path, rel_path) # Still O_EXCL: a plain claim made meanwhile wins
+            return True
+        except OSError:
+            return False
+        finally:
+            try:
+                os.remove(lock)
+            except OSError:
+                pass
+
+    def owner_of(self, rel_path):
+        """Current holder of a page's claim (None if unclaimed or stale)."""
+        path = self._claim_path(rel_path)
+        info = self._read(path)
+        if info is None or self._is_stale(path, info):
+            return None
+        return info.get("owner")
+
+    def live_owners(self):
+        """Owners holding at least one unexpired claim in this batch."""
+        owners = set()
+        for name in os.listdir(self.dir):
+            if not name.endswith(".claim"):
+                continue
+            path = os.path.join(self.dir, name)
+            info = self._read(path)
+            if info is not None and not self._is_stale(path, info):
+                owners.add(info.get("owner"))
+        return owners
+
+    def holds(self, rel_path):
+        """
+        True if the claim file is still ours. A lapsed lease that nobody took
+        over still counts; one taken over by another operator doesn't.
+        """
+        if rel_path not in self.held:
+            return False
+        info = self._read(self._claim_path(rel_path))
+        return info is not None and info.get("owner") == self.owner
+
+    def renew(self):
+        """Heartbeat: extends every held claim. Claims taken over by others are dropped."""
+        with self._lock:
+            for rel_path, path in list(self.held.items()):
+                info = self._read(path)
+                if info is not None and info.get("owner") != self.owner:
+                    print(f"Lost claim on {rel_path} to {info.get('owner')}")
+                    del self.held[rel_path]
+                    continue
+                tmp = f"{path}.{self.pid}.tmp"
+                try:
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        json.dump(self._record(rel_path), f)
+                    os.replace(tmp, path) # Atomic: readers never see a partial claim
+                except OSError as e:
+                    print(f"Error renewing claim on {rel_path}: {e}")
+
+    def release(self, rel_path):
+        with self._lock:
+            path = self.held.pop(rel_path, None)
+            if path is None:
+                return
+            info = self._read(path)
+            if info is not None and info.get("owner") != self.owner:
+                return # Already taken over; not ours to delete
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error releasing claim on {rel_path}: {e}")
+
+    def release_all(self):
+        for rel_path in list(self.held):
+            self.release(rel_path)
+
+    def start_heartbeat(self, interval=None):
+        """Renews claims from a background thread every `interval` (default lease / 3)."""
+        if self._heartbeat:
+            return
+        interval = interval or self.lease / 3
+
+        def run():
+            while not self._stop.wait(interval):
+                self.renew()
+
+        self._heartbeat = threading.Thread(target=run, name="claims-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def close(self):
+        self._stop.set()
+        self.release_all()
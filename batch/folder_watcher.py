@@ -0,0 +1,176 @@
+import os
+import time
+import zipfile
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from core.archives import is_archive
+from core.utils import IMAGE_EXTENSIONS
+
+DEBOUNCE_MS = 300 # Scanners write in bursts: collect a burst into one update
+MAX_DELAY_MS = 2000 # ... but a scanner that never pauses still shows up this often
+ARCHIVE_RECHECK_MS = 2000 # Archives still being copied are looked at again this often
+
+class FolderWatcher(QObject):
+    """
+    Watches the input tree and reports added/removed images (paths relative
+    to the root, like BatchManager.files) without rescanning it.
+
+    Every directory is watched; a change notification only marks that
+    directory dirty. After DEBOUNCE_MS of quiet, each dirty directory is
+    listed once and diffed against its last listing, so the cost follows the
+    directories that changed, not the size of the batch. Renames arrive as a
+    removal plus an addition.
+
+    CBZ/ZIP archives are reported as single entries (BatchManager expands
+    them into pages). One still being copied in has no central directory
+    yet: it is left out and kept as pending, and its folder is listed again
+    every ARCHIVE_RECHECK_MS until the archive reads as a zip (writing into
+    a file doesn't notify its directory).
+    """
+    changed = pyqtSignal(list, list) # added, removed (sorted relative paths)
+
+    def __init__(self, root_dir, parent=None, extensions=IMAGE_EXTENSIONS, debounce_ms=DEBOUNCE_MS, listing=None):
+        super().__init__(parent)
+        self.root_dir = os.path.normpath(root_dir)
+        self.extensions = extensions
+        self.dirs = {} # Absolute dir -> (set of image names, set of subdir names)
+        self.pending_archives = {} # Absolute dir -> archive names not readable yet
+        self._dirty = set()
+        self._dirty_since = None
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self.flush)
+        self._recheck = QTimer(self)
+        self._recheck.setSingleShot(True)
+        self._recheck.setInterval(ARCHIVE_RECHECK_MS)
+        self._recheck.timeout.connect(self._recheck_archives)
+
+        if listing:
+            self._seed(listing)
+        else:
+            self._add_tree(self.root_dir, None)
+
+    def _list(self, path):
+        images, subdirs, unreadable = set(), set(), set()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.add(entry.name)
+                        elif entry.name.lower().endswith(self.extensions):
+                            images.add(entry.name)
+                        elif is_archive(entry.name):
+                            if zipfile.is_zipfile(entry.path):
+                                images.add(entry.name)
+                            else:
+                                unreadable.add(entry.name)
+                    except OSError:
+                        pass # Vanished while listing
+        except OSError:
+            return None
+        return images, subdirs, unreadable
+
+    def _store(self, path, listing):
+        images, subdirs, unreadable = listing
+        self.dirs[path] = (images, subdirs)
+        if unreadable:
+            self.pending_archives[path] = unreadable
+        else:
+            self.pending_archives.pop(path, None)
+
+    def _rel_paths(self, path, names):
+        # relpath once per directory, not per file (it dominates large listings)
+        rel_dir = os.path.relpath(path, self.root_dir)
+        if rel_dir == ".":
+            return list(names)
+        prefix = rel_dir + os.sep
+        return [prefix + name for name in names]
+
+    def _add_tree(self, path, added):
+        """Lists and watches a new directory and everything below it (`added` may be None)."""
+        listing = self._list(path)
+        if listing is None:
+            return
+        self._store(path, listing)
+        self._watcher.addPath(path)
+        images, subdirs, _ = listing
+        if added is not None:
+            added.extend(self._rel_paths(path, images))
+        for name in subdirs:
+            self._add_tree(os.path.join(path, name), added)
+
+    def _seed(self, listing):
+        """
+        Takes the listings of a scan that just walked the tree (see
+        get_files_in_folder) instead of listing every directory again.
+        """
+        for path, (images, subdirs, unreadable) in listing.items():
+            # os.walk lists symlinked dirs without entering them; _list treats them as files
+            self._store(path, (set(images), {d for d in subdirs if os.path.join(path, d) in listing},
+                               set(unreadable)))
+        self._watcher.addPaths(list(self.dirs))
+        if self.pending_archives:
+            self._recheck.start()
+
+    def _remove_tree(self, path, removed):
+        listing = self.dirs.pop(path, None)
+        if listing is None:
+            return
+        self.pending_archives.pop(path, None)
+        self._watcher.removePath(path)
+        images, subdirs = listing
+        removed.extend(self._rel_paths(path, images))
+        for name in subdirs:
+            self._remove_tree(os.path.join(path, name), removed)
+
+    def _on_directory_changed(self, path):
+        if not self._dirty:
+            self._dirty_since = time.monotonic()
+        self._dirty.add(os.path.normpath(path))
+        if (time.monotonic() - self._dirty_since) * 1000 < MAX_DELAY_MS:
+            self._timer.start() # Restart: wait for the burst to settle
+
+    def flush(self):
+        """Applies pending changes now and emits them (also the debounce timeout)."""
+        self._timer.stop()
+        dirty, self._dirty = self._dirty, set()
+        added, removed = [], []
+        for path in sorted(dirty):
+            old = self.dirs.get(path)
+            if old is None:
+                continue # Already dropped with a removed parent
+            new = self._list(path)
+            if new is None:
+                self._remove_tree(path, removed) # The directory itself is gone
+                continue
+            old_images, old_subdirs = old
+            new_images, new_subdirs, _ = new
+            self._store(path, new)
+            added.extend(self._rel_paths(path, new_images - old_images))
+            removed.extend(self._rel_paths(path, old_images - new_images))
+            for name in new_subdirs - old_subdirs:
+                self._add_tree(os.path.join(path, name), added)
+            for name in old_subdirs - new_subdirs:
+                self._remove_tree(os.path.join(path, name), removed)
+        if self.pending_archives and not self._recheck.isActive():
+            self._recheck.start()
+        if added or removed:
+            self.changed.emit(sorted(added), sorted(removed))
+
+    def _recheck_archives(self):
+        self._dirty.update(self.pending_archives)
+        self.flush()
+
+    def stop(self):
+        self._timer.stop()
+        self._recheck.stop()
+        self._dirty.clear()
+        self.pending_archives.clear()
+        if self._watcher.directories():
+            self._watcher.removePaths(self._watcher.directories())
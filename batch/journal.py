@@ -0,0 +1,386 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import socket
+import threading
+import time
+import uuid
+
+from batch.claims import DEFAULT_LEASE, pid_alive
+from core import archives, packfile
+from core.fanout import MAX_VARIANTS, PART_SUFFIX, next_variant
+
+JOURNAL_DIR = "_journal"
+COMMIT_INTERVAL = 0.25 # Seconds a commit may wait for others to share its sync
+COMMIT_BATCH = 16      # ... or until this many are queued
+COMPACT_BYTES = 1024 * 1024 # Truncate an idle journal past this size
+
+def _journal_name(owner):
+    return re.sub(r"[^A-Za-z0-9._-]", "_", owner) + ".jsonl"
+
+def _fsync(path, flags=os.O_RDWR, quiet=False):
+    # Files need a write handle: on Windows fsync is FlushFileBuffers
+    try:
+        fd = os.open(path, flags | getattr(os, "O_BINARY", 0))
+    except OSError:
+        return # Gone (moved/replaced) or a directory on Windows
+    try:
+        os.fsync(fd)
+    except OSError as e:
+        if not quiet:
+            print(f"Error syncing {path}: {e}")
+    finally:
+        os.close(fd)
+
+def _sync_paths(paths):
+    """
+    Makes written files durable: fsyncs each file of the group (a pack once),
+    then each parent directory once so the new names survive too. Unlike a
+    global os.sync() this doesn't wait for unrelated dirty data.
+    """
+    files = set(packfile.split_path(p)[0] or p for p in paths)
+    for path in files:
+        _fsync(path)
+    if os.name == "nt":
+        return # Directories can't be opened there; NTFS journals the names itself
+    for folder in set(os.path.dirname(p) or "." for p in files):
+        _fsync(folder, os.O_RDONLY, quiet=True) # Not supported everywhere (e.g. some network shares)
+
+class Journal:
+    """
+    Write-ahead journal for one instance working on a batch folder.
+
+    Each save and each page move is a transaction: an intent record is
+    appended before the work starts and a commit record once it is done.
+    Commits are grouped: a background thread waits up to COMMIT_INTERVAL (or
+    COMMIT_BATCH commits), syncs the written files once for the whole group,
+    then appends the commit records and fsyncs the journal. Incomplete
+    transactions left by a crash are repaired by recover() on the next open.
+
+    The same thread touches the journal every `lease` / 3 seconds as a
+    heartbeat, so other hosts can tell a crashed instance from an idle one.
+    """
+    def __init__(self, root_dir, owner, interval=COMMIT_INTERVAL, batch=COMMIT_BATCH, lease=DEFAULT_LEASE):
+        self.dir = os.path.join(root_dir, JOURNAL_DIR)
+        os.makedirs(self.dir, exist_ok=True)
+        self.path = os.path.join(self.dir, _journal_name(owner))
+        self.owner = owner
+        self.interval = interval
+        self.batch = batch
+        self.heartbeat = lease / 3
+        self._next_beat = time.monotonic() + self.heartbeat
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        # Ids stay unique when a fixed owner reopens a journal left by an earlier run
+        self._session = uuid.uuid4().hex[:6]
+        self._next_txn = 1
+        self._open = set()   # Transactions begun but not committed
+        self._pending = []   # (commit record, paths to sync) waiting for the next group
+        self._first_pending = None
+        self._closed = False
+        self.groups = 0      # Group commits done (for benchmarks/metrics)
+
+        # Header: lets recover() tell whether this instance is still running
+        self._header = {"op": "open", "owner": owner, "host": socket.gethostname(),
+                        "pid": os.getpid(), "t": time.time(), "lease": lease}
+        self._append(self._header)
+        self._thread = threading.Thread(target=self._run, name="journal-commit", daemon=True)
+        self._thread.start()
+
+    def _append(self, record):
+        # Caller holds the lock (or no other thread runs yet)
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush() # Into the OS: survives a process crash, not a power loss
+
+    def begin(self, op, **fields):
+        """Appends an intent record and returns its transaction id."""
+        with self._lock:
+            if self._closed:
+                return None
+            txn = f"{self._session}:{self._next_txn}"
+            self._next_txn += 1
+            self._append(dict(op=op, txn=txn, t=time.time(), **fields))
+            self._open.add(txn)
+            return txn
+
+    def commit(self, txn, paths=(), **fields):
+        """
+        Queues the commit record of `txn`; it is written once `paths` (files the
+        transaction wrote) are synced together with the rest of the group.
+        """
+        if txn is None:
+            return
+        with self._lock:
+            if self._closed:
+                return # Left incomplete: the next recover() checks it
+            if not self._pending:
+                self._first_pending = time.monotonic()
+            self._pending.append((dict(op="commit", txn=txn, **fields), list(paths)))
+            self._wake.notify()
+
+    def sync(self):
+        """Makes every intent appended so far durable (one fsync, no data files)."""
+        with self._lock:
+            if self._closed:
+                return
+            os.fsync(self._file.fileno())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._closed:
+                    now = time.monotonic()
+                    if now >= self._next_beat:
+                        self._beat(now)
+                    if self._pending:
+                        due = self._first_pending + self.interval
+                        if len(self._pending) >= self.batch or now >= due:
+                            break
+                        self._wake.wait(min(due, self._next_beat) - now)
+                    else:
+                        self._wake.wait(self._next_beat - now)
+                group = self._pending
+                self._pending = []
+                if not group and self._closed:
+                    return
+            self._commit_group(group)
+
+    def _beat(self, now):
+        # Caller holds the lock; the journal's mtime is the heartbeat recover() checks
+        self._next_beat = now + self.heartbeat
+        try:
+            os.utime(self.path)
+        except OSError as e:
+            print(f"Error touching journal {self.path}: {e}")
+
+    def _commit_group(self, group):
+        if not group:
+            return
+        _sync_paths([p for _, paths in group for p in paths])
+        with self._lock:
+            for record, _ in group:
+                self._append(record)
+                self._open.discard(record["txn"])
+            os.fsync(self._file.fileno())
+            self.groups += 1
+            if not self._open and not self._pending and self._file.tell() > COMPACT_BYTES:
+                # Nothing in flight: earlier records are no longer needed
+                self._file.seek(0)
+                self._file.truncate()
+                self._append(self._header)
+
+    def close(self):
+        """Commits what is queued; removes the journal if nothing is left in flight."""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._thread.join()
+        with self._lock:
+            self._file.close()
+            if not self._open:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+# -----------------------------
+# Recovery
+# -----------------------------
+def _read_records(path):
+    records = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break # Torn last line from a crash
+    except OSError as e:
+        print(f"Error reading journal {path}: {e}")
+    return records
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _should_replay(header, path, live_owners, stale_after):
+    """
+    A journal is replayed once its instance is gone: a dead pid on this host;
+    on another host, no live claims and a heartbeat older than its lease.
+    """
+    if not header:
+        return True
+    pid = header.get("pid")
+    if header.get("host") == socket.gethostname() and pid is not None:
+        # Our own pid: a journal an earlier BatchManager in this process left with
+        # writes still in flight; a later start replays it
+        return pid != os.getpid() and not pid_alive(pid)
+    if header.get("owner") in live_owners:
+        return False
+    try:
+        # The journal's mtime is its owner's heartbeat (see Journal._beat)
+        return time.time() - os.path.getmtime(path) > header.get("lease", stale_after)
+    except OSError:
+        return False
+
+def _saved_sha256(path):
+    """Hash of a crop (loose file or pack member), or None if there is none."""
+    if packfile.split_path(path)[0]:
+        data = packfile.read(path)
+        return hashlib.sha256(data).hexdigest() if data is not None else None
+    try:
+        return _file_sha256(path)
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        print(f"Error checking {path}: {e}")
+        return None
+
+def _find_saved(target, sha256):
+    """
+    Looks for a crop with `sha256` at `target` and its variants, up to the
+    first free name. Returns (path found or None, names tried).
+    """
+    tried = []
+    path = target
+    for _ in range(MAX_VARIANTS):
+        tried.append(path)
+        digest = _saved_sha256(path)
+        if digest is None:
+            return None, tried
+        if digest == sha256:
+            return path, tried
+        path = next_variant(path)
+    return None, tried
+
+def replay(path, todo_dir, done_dir):
+    """
+    Repairs the incomplete transactions of one journal, then deletes it.
+
+    save: each target is looked up with its variants (the writer moves on to
+          the next free name when one is taken), by the recorded hash. A file
+          that doesn't match is never removed: it may be another operator's
+          crop. Only this instance's temp files are. If a crop is lost and
+          its page was already moved (or marked in its archive's sidecar),
+          the page goes back to todo to be cropped again.
+    move: an interrupted move is completed (or undone if its page went back).
+    """
+    report = {"saves_verified": 0, "crops_lost": [], "moves_completed": 0, "pages_returned": []}
+    records = _read_records(path)
+    committed = {r.get("txn") for r in records if r.get("op") == "commit"}
+    pending = [r for r in records if r.get("txn") is not None and r.get("op") != "commit"
+               and r["txn"] not in committed]
+
+    header = records[0] if records and records[0].get("op") == "open" else {}
+    pid = header.get("pid")
+    returned = set()
+    for rec in pending:
+        if rec["op"] != "save":
+            continue
+        lost = False
+        for target in rec.get("targets", []):
+            found, tried = _find_saved(target, rec.get("sha256"))
+            if pid is not None:
+                for name in tried:
+                    if packfile.split_path(name)[0]:
+                        continue # Pack records are written in place; torn ones are skipped by readers
+                    for part in glob.glob(glob.escape(name) + f".{pid}-*" + PART_SUFFIX):
+                        try:
+                            os.remove(part)
+                        except OSError:
+                            pass
+            if found:
+                continue
+            report["crops_lost"].append(target)
+            lost = True
+        if not lost:
+            report["saves_verified"] += 1
+            continue
+        source = rec.get("source")
+        if source and source not in returned:
+            try:
+                if return_page(source, todo_dir, done_dir, returned):
+                    report["pages_returned"].append(source)
+            except (OSError, TimeoutError) as e:
+                print(f"Error returning {source} to todo: {e}")
+            returned.add(source)
+
+    for rec in pending:
+        if rec["op"] != "move" or rec.get("source") in returned:
+            continue
+        src = os.path.join(todo_dir, rec["source"])
+        dest = os.path.join(done_dir, rec["source"])
+        try:
+            if os.path.exists(src):
+                if os.path.exists(dest):
+                    if os.path.getsize(dest) == os.path.getsize(src):
+                        os.remove(src) # Cross-volume move copied but didn't unlink
+                        report["moves_completed"] += 1
+                        continue
+                    os.remove(dest) # Partial copy
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                shutil.move(src, dest)
+                report["moves_completed"] += 1
+        except OSError as e:
+            print(f"Error completing move of {rec['source']}: {e}")
+
+    try:
+        os.remove(path)
+    except OSError as e:
+        print(f"Error removing journal {path}: {e}")
+    return report
+
+def return_page(source, todo_dir, done_dir, returned):
+    """Puts a processed page back in todo; True if it had been processed."""
+    src = os.path.join(todo_dir, source)
+    done = os.path.join(done_dir, source)
+    archive, member = archives.split_path(src)
+    if archive is None:
+        done_archive, member = archives.split_path(done)
+        if done_archive is None:
+            if os.path.exists(done) and not os.path.exists(src):
+                os.makedirs(os.path.dirname(src), exist_ok=True)
+                shutil.move(done, src)
+                return True
+            return False
+        # The whole archive was finished and moved: bring it (and its sidecar) back
+        rel_archive = os.path.relpath(done_archive, done_dir)
+        archive = os.path.join(todo_dir, rel_archive)
+        os.makedirs(os.path.dirname(archive), exist_ok=True)
+        shutil.move(done_archive, archive)
+        if os.path.exists(archives.sidecar_path(done_archive)):
+            shutil.move(archives.sidecar_path(done_archive), archives.sidecar_path(archive))
+        returned.add(rel_archive) # Its interrupted move, if any, must not be redone
+    if member not in archives.processed_members(archive):
+        return False
+    archives.unmark_processed(archive, member)
+    return True
+
+def recover(root_dir, todo_dir, done_dir, live_owners=(), stale_after=120.0):
+    """Replays the journals of instances that are gone. Returns the merged report."""
+    total = {"saves_verified": 0, "crops_lost": [], "moves_completed": 0, "pages_returned": []}
+    journal_dir = os.path.join(root_dir, JOURNAL_DIR)
+    if not os.path.isdir(journal_dir):
+        return total
+    for name in sorted(os.listdir(journal_dir)):
+        if not name.endswith(".jsonl"):
+            continue
+        path = os.path.join(journal_dir, name)
+        records = _read_records(path)
+        header = records[0] if records and records[0].get("op") == "open" else None
+        if not _should_replay(header, path, live_owners, stale_after):
+            continue
+        report = replay(path, todo_dir, done_dir)
+        total["saves_verified"] += report["saves_verified"]
+        total["crops_lost"] += report["crops_lost"]
+        total["moves_completed"] += report["moves_completed"]
+        total["pages_returned"] += report["pages_returned"]
+    return total
@@ -0,0 +1,109 @@
+"""
+Benchmark: several operators sharing one batch folder through page claims.
+
+Starts N worker processes on the same temporary batch. Each runs the
+BatchManager loop (claim page -> "crop" for --work seconds -> move to
+_processed) until nothing is left, like one SerialCropper instance per
+workstation. Reports throughput per operator count and checks that:
+
+  - every page ends up in _processed exactly once
+  - no worker hit a failed move (two operators on one page)
+  - no claim files are left behind
+
+A crash run kills one worker mid-page (os._exit while holding a claim); the
+others must still finish the batch once its lease (2 s here) expires.
+
+Run from the repo root:
+    python benchmarks/bench_claims.py [pages work_seconds]
+"""
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def make_batch(root, pages):
+    todo = os.path.join(root, "_para_procesar", "Artist", "Work")
+    os.makedirs(todo)
+    for i in range(pages):
+        with open(os.path.join(todo, f"{i:04d}.png"), "wb") as f:
+            f.write(b"\x89PNG page %d" % i)
+
+def worker(root, work, results, crash_after=None):
+    from batch.batch_manager import BatchManager
+    bm = BatchManager(root, lease=2.0)
+    bm.scan()
+    done, failed = [], 0
+    while bm.files:
+        if not bm.current_path():
+            time.sleep(0.1) # Everything left is claimed by others: wait for releases/expiry
+            bm.scan()
+            continue
+        rel = bm.current_rel_path()
+        time.sleep(work) # Operator cropping the page
+        if crash_after is not None and len(done) >= crash_after:
+            os._exit(1) # Dies holding the claim on `rel`
+        if bm.mark_current_processed():
+            done.append(rel)
+        elif bm.current_rel_path() == rel:
+            failed += 1 # Move failed for a page we still hold
+            bm.next_image()
+    bm.close()
+    results.put((os.getpid(), done, failed))
+
+def run(operators, pages, work, crash=False):
+    root = tempfile.mkdtemp()
+    try:
+        make_batch(root, pages)
+        results = mp.Queue()
+        procs = []
+        for i in range(operators):
+            crash_after = 2 if crash and i == 0 else None
+            p = mp.Process(target=worker, args=(root, work, results, crash_after))
+            procs.append(p)
+        t = time.perf_counter()
+        for p in procs:
+            p.start()
+        outcomes = [results.get() for p in procs if not (crash and p is procs[0])]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - t
+
+        done = [rel for _, pages_done, _ in outcomes for rel in pages_done]
+        failed = sum(f for _, _, f in outcomes)
+        processed = sum(len(fs) for _, _, fs in os.walk(os.path.join(root, "_processed")))
+        left = sum(len(fs) for _, _, fs in os.walk(os.path.join(root, "_para_procesar")))
+        claims = os.listdir(os.path.join(root, "_claims"))
+        # The crashed worker's first pages were moved by it, not reported
+        ok = (len(done) == len(set(done)) and failed == 0 and left == 0
+              and processed == pages and not claims)
+        return elapsed, len(done), processed, failed, left, claims, ok
+    finally:
+        shutil.rmtree(root)
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    work = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    all_ok = True
+    base = None
+    print(f"{pages} pages, {work * 1000:.0f} ms per page")
+    print(f"{'operators':>9} {'seconds':>8} {'pages/s':>8} {'speedup':>8}  checks")
+    for n in (1, 2, 3, 5):
+        elapsed, _, processed, failed, left, claims, ok = run(n, pages, work)
+        base = base or elapsed
+        all_ok &= ok
+        print(f"{n:>9} {elapsed:>8.2f} {processed / elapsed:>8.1f} {base / elapsed:>7.2f}x  "
+              f"{'ok' if ok else f'FAIL (failed={failed}, left={left}, claims={len(claims)})'}")
+
+    elapsed, _, processed, failed, left, claims, ok = run(3, pages, work, crash=True)
+    all_ok &= ok
+    print(f"crash run: 3 operators, one killed mid-page -> processed {processed}/{pages}, "
+          f"failed moves {failed}, stale claims {len(claims)}: {'ok' if ok else 'FAIL'}")
+    return 0 if all_ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Benchmark: per-crop allocations and peak RSS of the crop -> encode path.
+
+  legacy: QPixmap source -> pixmap.copy() -> toImage() -> setText -> encode
+  view:   QImage source (SOURCE_FORMAT) -> buffer view -> encode
+
+Each path runs in its own process so peak RSS (ru_maxrss) is not shared.
+Python-level allocations are counted with tracemalloc; the pixel buffers
+themselves are C++ allocations and show up in the RSS numbers.
+
+Run from the repo root:
+    python benchmarks/bench_crop_memory.py [width height crops]
+"""
+import os
+import sys
+import time
+import resource
+import subprocess
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def rss_kb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+def run(path_name, width, height, crops):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtGui import QImage, QPixmap, QColor
+    from PyQt5.QtCore import QRectF
+    from core.cropper import Cropper
+    from core.image_buffer import to_source_format
+
+    app = QApplication(sys.argv[:1])
+    src = QImage(width, height, QImage.Format_RGB32)
+    src.fill(QColor(90, 120, 200))
+    rect = QRectF(width * 0.1, height * 0.1, width * 0.8, height * 0.8)
+    text = {"Artist": "A", "Work": "W", "Page": "001", "Software": "bench"}
+
+    if path_name == "legacy":
+        pixmap = QPixmap.fromImage(src)
+        del src
+        def one():
+            crop = pixmap.copy(int(rect.left()), int(rect.top()), int(rect.width()), int(rect.height()))
+            image = crop.toImage()
+            for k, v in text.items():
+                image.setText(k, v)
+            return Cropper.encode_png(image)
+    else:
+        image_src = to_source_format(src)
+        del src
+        def one():
+            crop = Cropper.crop(image_src, rect, 0.0, "rect", opaque=True)
+            return Cropper.encode_png(crop, text)
+
+    one() # Warm up codecs
+    base_rss = rss_kb()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for _ in range(crops):
+        data = one()
+    elapsed = time.perf_counter() - t0
+    snap = tracemalloc.take_snapshot()
+    blocks = sum(s.count for s in snap.statistics("filename"))
+    tracemalloc.stop()
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{path_name}\t{elapsed / crops * 1000:.1f}\t{blocks / crops:.1f}\t{peak_kb - base_rss}\t{len(data)}")
+
+def main():
+    args = sys.argv[1:] or ["4000", "3000", "10"]
+    width, height, crops = int(args[0]), int(args[1]), int(args[2])
+    print(f"source {width}x{height}, crop 80% x 80%, {crops} crops per path")
+    print("path\tms/crop\tpy_blocks/crop\tpeak_rss_over_baseline_kb\tpng_bytes")
+    for name in ("legacy", "view"):
+        out = subprocess.run([sys.executable, __file__, "--child", name, str(width), str(height), str(crops)],
+                             capture_output=True, text=True)
+        print(out.stdout.strip() or out.stderr.strip())
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        run(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5]))
+    else:
+        main()
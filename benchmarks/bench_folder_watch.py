@@ -0,0 +1,86 @@
+"""
+Benchmark: picking up new scans with FolderWatcher vs a full rescan.
+
+Builds a todo tree of --files empty images spread over works of 200 pages,
+then drops a burst of new pages into one work. Reports the cost of the
+incremental update (dirty directory listing + diff + BatchManager.apply_changes)
+against a full get_files_in_folder() walk, and checks that both give the
+same list and that the cursor stays on the current page.
+
+Run from the repo root:
+    python benchmarks/bench_folder_watch.py [files burst]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt5.QtCore import QCoreApplication
+
+from batch.batch_manager import BatchManager
+from batch.folder_watcher import FolderWatcher
+from core.utils import get_files_in_folder
+
+def make_tree(todo, files, per_work=200):
+    for i in range(files):
+        work = os.path.join(todo, f"Artist{i // (per_work * 10)}", f"Work{i // per_work}")
+        if i % per_work == 0:
+            os.makedirs(work, exist_ok=True)
+        open(os.path.join(work, f"{i % per_work:04d}.jpg"), "wb").close()
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    burst = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    app = QCoreApplication(sys.argv)
+    root = tempfile.mkdtemp()
+    try:
+        bm = BatchManager(root)
+        make_tree(bm.todo_dir, files)
+        start = time.perf_counter()
+        bm.scan()
+        scan_time = time.perf_counter() - start
+        bm.next_image()
+        bm.next_image()
+        current = bm.current_rel_path()
+
+        start = time.perf_counter()
+        watcher = FolderWatcher(bm.todo_dir)
+        watch_time = time.perf_counter() - start
+        results = []
+        watcher.changed.connect(lambda a, r: results.append(bm.apply_changes(a, r)))
+
+        work = os.path.dirname(os.path.join(bm.todo_dir, bm.files[len(bm.files) // 2]))
+        for i in range(burst):
+            open(os.path.join(work, f"new{i:04d}.jpg"), "wb").close()
+        deadline = time.time() + 5
+        while not watcher._dirty and time.time() < deadline:
+            app.processEvents() # Collect the notifications
+            time.sleep(0.01)
+        start = time.perf_counter()
+        watcher.flush()
+        update_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        full = get_files_in_folder(bm.todo_dir)
+        rescan_time = time.perf_counter() - start
+
+        print(f"files: {files}, burst: {burst}")
+        print(f"initial scan        {scan_time * 1000:8.1f} ms")
+        print(f"watcher setup       {watch_time * 1000:8.1f} ms ({len(watcher.dirs)} directories)")
+        print(f"incremental update  {update_time * 1000:8.2f} ms")
+        print(f"full rescan         {rescan_time * 1000:8.1f} ms")
+        ok = results == [(burst, 0, False)] and bm.files == full and bm.current_rel_path() == current
+        print("check:", "OK" if ok else f"FAILED {results}")
+        watcher.stop()
+        bm.close()
+        sys.exit(0 if ok else 1)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
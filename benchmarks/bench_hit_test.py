@@ -0,0 +1,82 @@
+"""
+Benchmark: Selection.hit_test (SelectionGeometry's cached local frame:
+center, cos/sin and half size, rebuilt only when the geometry changes) vs
+the original per-call implementation (import math + QPointF temporaries + trig).
+
+Run from the repo root:
+    python benchmarks/bench_hit_test.py
+"""
+import os
+import sys
+import math
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QPointF
+from core.selection import Selection, HitTest
+
+def legacy_hit_test(sel, pos_img, scale, handle_radius_screen=8.0):
+    # Verbatim copy of the pre-cache implementation, kept for comparison
+    if not sel.has_selection():
+        return HitTest.NONE
+    r = sel.get_rect()
+    tol = handle_radius_screen / scale
+    center = r.center()
+    import math
+    rad = math.radians(-sel.angle)
+    dx = pos_img.x() - center.x()
+    dy = pos_img.y() - center.y()
+    local_x = center.x() + dx * math.cos(rad) - dy * math.sin(rad)
+    local_y = center.y() + dx * math.sin(rad) + dy * math.cos(rad)
+    local_pos = QPointF(local_x, local_y)
+
+    def near(p1, p2):
+        return (p1.x() - p2.x())**2 + (p1.y() - p2.y())**2 <= tol**2
+
+    rotate_handle_pos = QPointF(center.x(), r.top() - (20 / scale))
+    if near(local_pos, rotate_handle_pos): return HitTest.ROTATE
+    if near(local_pos, r.topLeft()): return HitTest.TOP_LEFT
+    if near(local_pos, r.topRight()): return HitTest.TOP_RIGHT
+    if near(local_pos, r.bottomLeft()): return HitTest.BOTTOM_LEFT
+    if near(local_pos, r.bottomRight()): return HitTest.BOTTOM_RIGHT
+    if abs(local_pos.y() - r.top()) <= tol and r.left() <= local_pos.x() <= r.right(): return HitTest.TOP
+    if abs(local_pos.y() - r.bottom()) <= tol and r.left() <= local_pos.x() <= r.right(): return HitTest.BOTTOM
+    if abs(local_pos.x() - r.left()) <= tol and r.top() <= local_pos.y() <= r.bottom(): return HitTest.LEFT
+    if abs(local_pos.x() - r.right()) <= tol and r.top() <= local_pos.y() <= r.bottom(): return HitTest.RIGHT
+    if r.contains(local_pos):
+        return HitTest.INSIDE
+    return HitTest.NONE
+
+def main(n=200_000):
+    random.seed(1)
+    sel = Selection()
+    sel.start(QPointF(200, 150))
+    sel.update(QPointF(600, 450))
+    sel.finish()
+    sel.angle = 17.5
+    scale = 0.8
+
+    # Hover positions clustered around the selection, like real mouse moves
+    points = [QPointF(random.uniform(150, 650), random.uniform(80, 500)) for _ in range(1000)]
+
+    mismatches = sum(
+        1 for p in points
+        if sel.hit_test(p, scale) != legacy_hit_test(sel, p, scale)
+    )
+
+    reps = max(1, n // len(points))
+    t_legacy = timeit.timeit(lambda: [legacy_hit_test(sel, p, scale) for p in points], number=reps)
+    t_cached = timeit.timeit(lambda: [sel.hit_test(p, scale) for p in points], number=reps)
+    calls = reps * len(points)
+
+    print(f"calls:       {calls}")
+    print(f"mismatches:  {mismatches}")
+    print(f"legacy:      {t_legacy / calls * 1e6:.2f} us/call")
+    print(f"cached:      {t_cached / calls * 1e6:.2f} us/call")
+    print(f"speedup:     {t_legacy / t_cached:.1f}x")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Benchmark: durable crop saves, one fsync per file vs journal group commit.
+
+Part 1 writes --saves crops of ~200 KB each:
+  fsync     temp file + fsync + rename for every save (one sync per file)
+  journal   temp file + rename, save intent/commit in the batch journal,
+            syncs grouped by the commit thread (see batch/journal.py)
+
+Part 2 is a crash test: a child process runs the real save path
+(IOScheduler + Journal) and BatchManager moves, and is SIGKILLed at a
+random point. After recovery (a fresh BatchManager on the folder):
+
+  - no temp (.part) files are left in _output
+  - every crop in _output has the content that was submitted for it
+  - every page in _processed has all the crops submitted for it
+
+Run from the repo root:
+    python benchmarks/bench_journal.py [saves crash_runs]
+"""
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batch.batch_manager import BatchManager
+from batch.journal import Journal
+from core.fanout import PART_SUFFIX
+from core.io_scheduler import IOScheduler
+
+CROP_BYTES = 200 * 1024
+
+def crop_data(name):
+    # Deterministic per name, so the crash check can verify content
+    seed = hashlib.sha256(name.encode()).digest()
+    return seed * (CROP_BYTES // len(seed))
+
+def make_batch(root, pages):
+    todo = os.path.join(root, "_para_procesar", "Artist", "Work")
+    os.makedirs(todo)
+    for i in range(pages):
+        with open(os.path.join(todo, f"{i:04d}.png"), "wb") as f:
+            f.write(b"\x89PNG page %d" % i)
+
+def bench_fsync(out_dir, saves):
+    start = time.perf_counter()
+    for i in range(saves):
+        path = os.path.join(out_dir, f"crop{i}.png")
+        tmp = path + PART_SUFFIX
+        with open(tmp, "wb") as f:
+            f.write(crop_data(path))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    return time.perf_counter() - start
+
+def bench_journal(root, out_dir, saves):
+    journal = Journal(root, "bench")
+    io = IOScheduler()
+    start = time.perf_counter()
+    for i in range(saves):
+        path = os.path.join(out_dir, f"crop{i}.png")
+        data = crop_data(path)
+        txn = journal.begin("save", source=None, targets=[path], sha256=hashlib.sha256(data).hexdigest())
+        io.submit_write(data, [path], lambda results, txn=txn: journal.commit(
+            txn, paths=[r["path"] for r in results if r["ok"]]))
+    io.close(timeout=60)
+    groups_before = journal.groups
+    journal.close() # Waits for the last group commit
+    elapsed = time.perf_counter() - start
+    return elapsed, max(groups_before, journal.groups)
+
+def crash_child(root, ledger_path):
+    bm = BatchManager(root, owner="crasher", lease=2.0)
+    bm.scan()
+    io = IOScheduler()
+    ledger = open(ledger_path, "a")
+    while bm.current_path():
+        rel = bm.current_rel_path()
+        for k in range(random.randint(1, 3)):
+            path = os.path.join(bm.output_dir, f"{rel.replace(os.sep, '_')}_{k}.png")
+            data = crop_data(path)
+            sha = hashlib.sha256(data).hexdigest()
+            ledger.write(json.dumps({"source": rel, "path": path}) + "\n")
+            ledger.flush()
+            txn = bm.journal.begin("save", source=rel, targets=[path], sha256=sha)
+            io.submit_write(data, [path], lambda results, txn=txn: bm.journal.commit(
+                txn, paths=[r["path"] for r in results if r["ok"]]))
+        time.sleep(0.005) # Operator moving on to the next page
+        bm.mark_current_processed()
+
+def check_after_crash(root, ledger_path):
+    bm = BatchManager(root, owner="checker", lease=2.0)
+    report = bm.recovery
+    bm.close()
+    out_dir = os.path.join(root, "_output")
+    done_dir = os.path.join(root, "_processed")
+    errors = []
+    parts = [f for f in os.listdir(out_dir) if f.endswith(PART_SUFFIX)]
+    if parts:
+        errors.append(f"{len(parts)} temp files left")
+    for name in os.listdir(out_dir):
+        path = os.path.join(out_dir, name)
+        if not name.endswith(PART_SUFFIX):
+            with open(path, "rb") as f:
+                if f.read() != crop_data(path):
+                    errors.append(f"corrupt crop {name}")
+    with open(ledger_path) as f:
+        submitted = [json.loads(line) for line in f if line.strip()]
+    for entry in submitted:
+        if os.path.exists(os.path.join(done_dir, entry["source"])) and not os.path.exists(entry["path"]):
+            errors.append(f"{entry['source']} processed but {os.path.basename(entry['path'])} missing")
+    return report, errors
+
+def crash_run(pages):
+    root = tempfile.mkdtemp()
+    try:
+        make_batch(root, pages)
+        ledger = os.path.join(root, "ledger.jsonl")
+        p = mp.Process(target=crash_child, args=(root, ledger))
+        p.start()
+        time.sleep(random.uniform(0.1, 0.5))
+        os.kill(p.pid, signal.SIGKILL)
+        p.join()
+        if not os.path.exists(ledger):
+            return None, []
+        return check_after_crash(root, ledger)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main():
+    saves = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    crash_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    for label in ("fsync", "journal"):
+        root = tempfile.mkdtemp()
+        out_dir = os.path.join(root, "_output")
+        os.makedirs(out_dir)
+        try:
+            if label == "fsync":
+                elapsed = bench_fsync(out_dir, saves)
+                syncs = saves
+            else:
+                elapsed, syncs = bench_journal(root, out_dir, saves)
+            print(f"{label:8s} {saves} saves: {elapsed * 1000:8.1f} ms  "
+                  f"{saves / elapsed:7.1f} saves/s  sync rounds: {syncs}")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    failures = 0
+    totals = {"moves_completed": 0, "crops_lost": 0, "pages_returned": 0}
+    for i in range(crash_runs):
+        report, errors = crash_run(pages=80)
+        if report:
+            totals["moves_completed"] += report["moves_completed"]
+            totals["crops_lost"] += len(report["crops_lost"])
+            totals["pages_returned"] += len(report["pages_returned"])
+        for e in errors:
+            print(f"crash run {i}: {e}")
+        failures += bool(errors)
+    print(f"crash runs: {crash_runs}, failed checks: {failures}, recovered: {totals}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark: one PNG file per crop vs appending crops to a per-work packfile.
+
+Part 1 writes --crops crops of ~40 KB spread over --works artist/works:
+  files   temp file + rename per crop (core.fanout.write_bytes), as today
+  pack    one record appended per crop to <Artist_W>.pack (core.packfile)
+Both end with one os.sync(), as the journal's group commit would. Then the
+whole output is read back (list + read every crop) and copied to another
+folder, as a backup or bulk transfer would.
+
+Part 2 is a crash test: a child process appends crops to packs from several
+threads and is SIGKILLed at a random point; a torn record is then appended
+by hand (a write cut short), and a new writer appends after it. On reopen
+every byte of every pack must be either a listed crop that reads back
+intact or part of a skipped torn record.
+
+Run from the repo root:
+    python benchmarks/bench_packfile.py [--crops 5000] [--works 20] [--crash-runs 10]
+"""
+import argparse
+import hashlib
+import multiprocessing as mp
+import os
+import random
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core import packfile
+from core.fanout import write_bytes
+
+CROP_BYTES = 40 * 1024
+
+def crop_data(name):
+    # Deterministic per name, so reads and the crash check can verify content
+    seed = hashlib.sha256(name.encode()).digest()
+    return seed * (CROP_BYTES // len(seed))
+
+def crop_names(crops, works):
+    return [(f"Artist{i % works}_W", f"Artist{i % works}_W_{i:05d}(1).png") for i in range(crops)]
+
+def write_all(out_dir, names, mode):
+    start = time.perf_counter()
+    for work, name in names:
+        if mode == "pack":
+            path = os.path.join(out_dir, work + packfile.PACK_SUFFIX, name)
+        else:
+            path = os.path.join(out_dir, name)
+        write_bytes(path, crop_data(name))
+    packfile.close_all()
+    os.sync()
+    return time.perf_counter() - start
+
+def read_all(out_dir):
+    """Lists the output and reads every crop (verified); returns (seconds, crops)."""
+    start = time.perf_counter()
+    crops = 0
+    with os.scandir(out_dir) as it:
+        entries = list(it)
+    for entry in entries:
+        if entry.name.endswith(packfile.PACK_SUFFIX):
+            pack = packfile.PackFile(entry.path)
+            for name in pack.entries:
+                assert pack.read(name) == crop_data(name)
+                crops += 1
+            pack.close()
+        elif entry.name.endswith(".png"):
+            with open(entry.path, "rb") as f:
+                assert f.read() == crop_data(entry.name)
+            crops += 1
+    return time.perf_counter() - start, crops
+
+def copy_all(out_dir, dest):
+    start = time.perf_counter()
+    shutil.copytree(out_dir, dest)
+    os.sync()
+    return time.perf_counter() - start
+
+def crash_child(out_dir, threads):
+    def worker(t):
+        i = 0
+        while True:
+            name = f"T{t}_{i:06d}.png"
+            write_bytes(os.path.join(out_dir, f"Work{i % 3}{packfile.PACK_SUFFIX}", name), crop_data(name))
+            i += 1
+    for t in range(threads):
+        threading.Thread(target=worker, args=(t,), daemon=True).start()
+    while True:
+        time.sleep(1)
+
+def crash_run(threads=3):
+    root = tempfile.mkdtemp()
+    try:
+        p = mp.Process(target=crash_child, args=(root, threads))
+        p.start()
+        time.sleep(random.uniform(0.2, 0.6))
+        os.kill(p.pid, signal.SIGKILL)
+        p.join()
+
+        errors = []
+        pack_path = os.path.join(root, "Work0" + packfile.PACK_SUFFIX)
+        # A write cut short, then another writer appending after it
+        record = packfile.HEADER.pack(packfile.MAGIC, 5, CROP_BYTES, 0) + b"torn." + b"x" * 100
+        with open(pack_path, "ab") as f:
+            f.write(record)
+        after = packfile.PackFile(pack_path)
+        after.append("after.png", crop_data("after.png"))
+        after.close()
+
+        crops = 0
+        for name in sorted(os.listdir(root)):
+            if not name.endswith(packfile.PACK_SUFFIX):
+                continue
+            pack = packfile.PackFile(os.path.join(root, name))
+            on_disk = os.path.getsize(pack.path)
+            listed = sum(packfile.HEADER.size + n + l for _, n, l, _ in pack.entries.values())
+            if listed + pack.skipped != on_disk:
+                errors.append(f"{name}: {on_disk - listed - pack.skipped} bytes neither listed nor skipped")
+            for member in pack.entries:
+                if pack.read(member) != crop_data(member):
+                    errors.append(f"{name}: {member} corrupt")
+            crops += len(pack.entries)
+            pack.close()
+        if "after.png" not in packfile.PackFile(pack_path).entries:
+            errors.append("record appended after the torn one is missing")
+        return crops, errors
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--crops", type=int, default=5000)
+    parser.add_argument("--works", type=int, default=20)
+    parser.add_argument("--crash-runs", type=int, default=10)
+    args = parser.parse_args()
+
+    names = crop_names(args.crops, args.works)
+    for mode in ("files", "pack"):
+        root = tempfile.mkdtemp()
+        out_dir = os.path.join(root, "_output")
+        os.makedirs(out_dir)
+        try:
+            write_s = write_all(out_dir, names, mode)
+            read_s, crops = read_all(out_dir)
+            copy_s = copy_all(out_dir, os.path.join(root, "copy"))
+            assert crops == args.crops
+            inodes = len(os.listdir(out_dir))
+            print(f"{mode:6s} {args.crops} crops: write {write_s * 1000:8.1f} ms ({args.crops / write_s:7.0f}/s)  "
+                  f"read {read_s * 1000:7.1f} ms  copy {copy_s * 1000:7.1f} ms  files in _output: {inodes}")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    failures = 0
+    total = 0
+    for i in range(args.crash_runs):
+        crops, errors = crash_run()
+        total += crops
+        for e in errors:
+            print(f"crash run {i}: {e}")
+        failures += bool(errors)
+    print(f"crash runs: {args.crash_runs}, failed checks: {failures}, crops recovered: {total}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
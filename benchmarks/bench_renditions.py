@@ -0,0 +1,75 @@
+"""
+Benchmark: full + web (2048) + thumb (256) renditions of one crop.
+
+  separate job   encode the full PNG, then decode it again and scale each
+                 size from the full image, encoding one after another
+                 (the old post-processing resize pass)
+  single pass    encode_renditions(): sizes derived progressively from the
+                 in-memory crop, PNG encodes in parallel
+
+Run from the repo root:
+    python benchmarks/bench_renditions.py [width height repeats]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QGuiApplication, QImage, QPainter
+
+from core.cropper import Cropper
+from core.image_buffer import SOURCE_FORMAT
+from core.renditions import encode_renditions, parse_spec
+
+SPEC = [{"name": "full"}, {"name": "web", "max_side": 2048}, {"name": "thumb", "max_side": 256}]
+
+def make_crop(w, h):
+    image = QImage(w, h, SOURCE_FORMAT)
+    image.fill(QColor(235, 228, 210))
+    p = QPainter(image)
+    p.setPen(QColor(30, 30, 30))
+    for y in range(0, h, 24):
+        p.drawText(10, y, "Lorem ipsum dolor sit amet " * (w // 180))
+    p.end()
+    return image
+
+def separate_job(image):
+    full = Cropper.encode_png(image)
+    decoded = QImage.fromData(full, "PNG")
+    out = [full]
+    for side in (2048, 256):
+        scaled = decoded.scaled(side, side, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        out.append(Cropper.encode_png(scaled))
+    return out
+
+def single_pass(image, spec):
+    return [data for _, _, data in encode_renditions(image, spec)]
+
+def best_of(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    w = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    h = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    app = QGuiApplication(sys.argv)
+    image = make_crop(w, h)
+    spec = parse_spec(SPEC)
+
+    t_sep, sep = best_of(lambda: separate_job(image), repeats)
+    t_one, one = best_of(lambda: single_pass(image, spec), repeats)
+    print(f"crop {w}x{h}, renditions: {[r['name'] for r in spec]}")
+    print(f"separate job  {t_sep * 1000:8.1f} ms  sizes {[len(d) for d in sep]}")
+    print(f"single pass   {t_one * 1000:8.1f} ms  sizes {[len(d) for d in one]}  ({t_sep / t_one:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: cold start (imports, window construction, first frame, session restore).
+
+Each run is a fresh interpreter (offscreen Qt) that follows main.py's startup
+sequence and reports the core.startup marks once the deferred settings load
+has finished:
+
+  imports          core.startup -> viewer imported
+  window           ImageViewer() constructed
+  first_paint      canvas painted for the first time
+  settings_loaded  settings.json applied and the last folder opened
+
+`process` is the wall time of the whole child, interpreter start included.
+Runs with a settings.json whose last_folder is a small generated batch, so
+the session-restore decode is included.
+
+Run from the repo root:
+    python benchmarks/bench_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import os, sys, json
+sys.path.insert(0, {root!r})
+os.chdir({workdir!r})
+from core import startup
+from PyQt5.QtWidgets import QApplication
+from viewer import ImageViewer
+startup.mark("imports")
+app = QApplication(sys.argv[:1])
+w = ImageViewer()
+startup.mark("window")
+w.show()
+while not w.settings_loaded:
+    app.processEvents()
+heavy = [m for m in ("numpy", "PIL", "http.server") if m in sys.modules]
+print(json.dumps({{"marks": startup.marks(), "modules_after_start": heavy}}))
+w.close()
+"""
+
+def make_batch(root):
+    from PyQt5.QtGui import QImage, QColor
+    todo = os.path.join(root, "batch", "_para_procesar", "Artist", "Work")
+    os.makedirs(todo)
+    for i in range(3):
+        img = QImage(2400, 3400, QImage.Format_RGB32)
+        img.fill(QColor(30 * i, 90, 160))
+        img.save(os.path.join(todo, f"{i:03d}.jpg"))
+    with open(os.path.join(root, "settings.json"), "w") as f:
+        json.dump({"last_folder": os.path.join(root, "batch")}, f)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        make_batch(workdir)
+        code = CHILD.format(root=ROOT, workdir=workdir)
+
+        samples = {}
+        modules = None
+        for _ in range(runs):
+            t = time.perf_counter()
+            out = subprocess.run([sys.executable, "-c", code], env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            elapsed = time.perf_counter() - t
+            result = json.loads(out.strip().splitlines()[-1])
+            modules = result["modules_after_start"]
+            for name, value in result["marks"].items():
+                samples.setdefault(name, []).append(value)
+            samples.setdefault("process", []).append(elapsed)
+
+    print(f"Cold start, median of {runs} runs (ms)")
+    for name, values in samples.items():
+        print(f"  {name:<16} {statistics.median(values) * 1000:8.1f}")
+    print(f"  heavy modules loaded by then: {', '.join(modules) or 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Parity check: headless CropManager (Pillow) vs Qt Cropper.
+
+Both backends crop the same synthetic page (gradients, hard edges, a
+transparent corner) for rect, ellipse and rotated selections. Outputs are
+compared as premultiplied RGBA so fully transparent pixels don't count.
+
+Tolerance (0-255 scale, per channel):
+  rect crops          exact (max diff 0)
+  resampled crops     mean diff <= MEAN_TOL and 99th percentile <= P99_TOL
+  core.resample modes max diff <= 1 (same NumPy warp; Qt and Pillow only
+                      round the source premultiply differently)
+Edge pixels differ slightly because QPainter and Pillow antialias
+differently; the interior must match.
+
+Run from the repo root (exits 1 on any failure):
+    python benchmarks/crop_parity.py
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PIL import Image
+
+MEAN_TOL = 1.0
+P99_TOL = 12
+
+# (x, y, w, h, angle, mode)
+CASES = [
+    (40.0, 30.0, 200.0, 150.0, 0.0, "rect"),
+    (-20.5, 10.25, 120.0, 90.0, 0.0, "rect"),       # Clipped at the left edge
+    (300.0, 200.0, 150.0, 150.0, 0.0, "rect"),     # Clipped at the bottom-right
+    (50.0, 40.0, 180.0, 120.0, 0.0, "ellipse"),
+    (60.0, 50.0, 160.0, 100.0, 30.0, "ellipse"),
+    (80.0, 60.0, 140.0, 100.0, 15.0, "rect"),
+    (100.0, 80.0, 120.0, 120.0, 45.0, "rect"),
+    (90.0, 70.0, 150.0, 90.0, 90.0, "rect"),
+    (70.0, 50.0, 130.0, 110.0, -120.0, "rect"),
+    (-30.0, -20.0, 160.0, 140.0, 20.0, "rect"),    # Rotated past the page edge
+]
+
+RESAMPLE_MODES = ("nearest", "bilinear", "bicubic", "lanczos")
+
+def make_page(w=400, h=300):
+    yy, xx = np.mgrid[0:h, 0:w]
+    rgba = np.empty((h, w, 4), dtype=np.uint8)
+    rgba[..., 0] = (xx * 255 // (w - 1))
+    rgba[..., 1] = (yy * 255 // (h - 1))
+    rgba[..., 2] = np.where((xx // 25 + yy // 25) % 2, 220, 30)
+    rgba[..., 3] = 255
+    rgba[h - 60:, w - 80:, 3] = 0 # Transparent corner
+    rgba[h - 60:, w - 80:, :3] = 0
+    return rgba
+
+def qt_to_premul_rgba(image):
+    from PyQt5.QtGui import QImage
+    from core.image_buffer import qimage_view
+    image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    bgra = qimage_view(image)
+    return bgra[..., [2, 1, 0, 3]].astype(np.int16)
+
+def pil_to_premul_rgba(image):
+    return np.asarray(image.convert("RGBA").convert("RGBa")).astype(np.int16)
+
+def main():
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtGui import QImage
+    from PyQt5.QtCore import QRectF
+    from core.cropper import Cropper
+    from core.image_buffer import to_source_format
+    from crop_manager import CropManager
+
+    app = QApplication(sys.argv[:1])
+    rgba = make_page()
+    h, w = rgba.shape[:2]
+    pil_page = Image.fromarray(rgba, "RGBA")
+    qt_page = to_source_format(QImage(rgba.tobytes(), w, h, w * 4, QImage.Format_RGBA8888).copy())
+
+    failures = 0
+    print(f"{'case':<58} {'size':>9} {'max':>5} {'mean':>6} {'p99':>5}  result")
+    runs = [case + ("painter",) for case in CASES]
+    runs += [case + (r,) for case in CASES if case[4] or case[5] == "ellipse" for r in RESAMPLE_MODES]
+    for x, y, cw, ch, angle, mode, resample in runs:
+        qt_img = Cropper.crop(qt_page, QRectF(x, y, cw, ch), angle, mode, resample=resample)
+        pil_img = CropManager.crop(pil_page, (x, y, cw, ch), angle, mode, resample=resample)
+        label = f"{mode} ({x}, {y}, {cw}x{ch}) @ {angle}"
+        if resample != "painter":
+            label += f" [{resample}]"
+
+        a = qt_to_premul_rgba(qt_img)
+        b = pil_to_premul_rgba(pil_img)
+        if a.shape != b.shape:
+            print(f"{label:<58} shape mismatch {a.shape} vs {b.shape}  FAIL")
+            failures += 1
+            continue
+
+        diff = np.abs(a - b)
+        max_d, mean_d, p99 = int(diff.max()), float(diff.mean()), float(np.percentile(diff, 99))
+        if angle == 0 and mode == "rect":
+            ok = max_d == 0
+        elif resample != "painter":
+            ok = max_d <= 1
+        else:
+            ok = mean_d <= MEAN_TOL and p99 <= P99_TOL
+        failures += not ok
+        size = f"{a.shape[1]}x{a.shape[0]}"
+        print(f"{label:<58} {size:>9} {max_d:>5} {mean_d:>6.2f} {p99:>5.0f}  {'ok' if ok else 'FAIL'}")
+
+    print(f"\n{len(runs) - failures}/{len(runs)} cases within tolerance")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
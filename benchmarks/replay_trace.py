@@ -0,0 +1,227 @@
+"""
+Replays an interaction trace into an offscreen CanvasWidget and reports
+frame times and CPU time.
+
+Record a trace by running the app with SERIALCROPPER_TRACE set:
+    SERIALCROPPER_TRACE=session.jsonl python main.py
+
+Then replay it (pages are synthetic images of the recorded size unless
+--image is given):
+    python benchmarks/replay_trace.py session.jsonl
+    python benchmarks/replay_trace.py --synthetic            # built-in workflow
+    python benchmarks/replay_trace.py session.jsonl --speed 0 --json
+
+--speed 1 (default) keeps the recorded timing, so input coalescing and the
+settle timer behave as they did live; --speed 0 sends events back to back.
+Reported:
+  frames     paintEvent count and duration percentiles (p50/p90/p99/max)
+  over       frames longer than the recorded frame interval
+  dispatch   time to handle each input event (excluding paints)
+  cpu        process CPU time for the whole replay, and wall time
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt5.QtCore import QPoint, QPointF, Qt, QEvent
+from PyQt5.QtGui import QColor, QImage, QKeyEvent, QMouseEvent, QPainter, QWheelEvent
+from PyQt5.QtWidgets import QApplication
+
+from widgets.canvas import CanvasWidget
+
+class TimedCanvas(CanvasWidget):
+    def __init__(self):
+        super().__init__()
+        self.frame_times = []
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        super().paintEvent(event)
+        self.frame_times.append(time.perf_counter() - start)
+
+def synthetic_page(w, h):
+    """Text-like page so the pyramid and smooth pass have real content to filter."""
+    image = QImage(w, h, QImage.Format_RGB32)
+    image.fill(QColor(238, 232, 218))
+    p = QPainter(image)
+    p.setPen(QColor(40, 40, 40))
+    for y in range(40, h, 36):
+        p.drawText(40, y, "The quick brown fox jumps over the lazy dog " * (w // 300 + 1))
+    p.end()
+    return image
+
+def synthetic_trace(view=(1200, 800), page=(4000, 3000), hz=120):
+    """Create, resize, rotate, zoom in, pan and zoom out: one typical page."""
+    records = [{"type": "header", "version": 1, "canvas": list(view), "frame_ms": 16}]
+    t = 0.0
+    dt = 1.0 / hz
+    left, mid = int(Qt.LeftButton), int(Qt.MiddleButton)
+    records.append({"t": t, "type": "page", "w": page[0], "h": page[1]})
+
+    def drag(x0, y0, x1, y1, seconds, button):
+        nonlocal t
+        records.append({"t": t, "type": "press", "x": x0, "y": y0, "button": button, "buttons": button, "mods": 0})
+        steps = max(1, int(seconds * hz))
+        for i in range(1, steps + 1):
+            t += dt
+            f = i / steps
+            records.append({"t": t, "type": "move", "x": x0 + (x1 - x0) * f, "y": y0 + (y1 - y0) * f,
+                            "button": 0, "buttons": button, "mods": 0})
+        t += dt
+        records.append({"t": t, "type": "release", "x": x1, "y": y1, "button": button, "buttons": 0, "mods": 0})
+        t += 0.3
+
+    def hover(x0, y0, x1, y1, seconds):
+        nonlocal t
+        steps = max(1, int(seconds * hz))
+        for i in range(1, steps + 1):
+            t += dt
+            f = i / steps
+            records.append({"t": t, "type": "move", "x": x0 + (x1 - x0) * f, "y": y0 + (y1 - y0) * f,
+                            "button": 0, "buttons": 0, "mods": 0})
+
+    def wheel(x, y, notches, dy):
+        nonlocal t
+        for _ in range(notches):
+            records.append({"t": t, "type": "wheel", "x": x, "y": y, "dx": 0, "dy": dy, "buttons": 0, "mods": 0})
+            t += 0.04
+        t += 0.3
+
+    hover(100, 100, 300, 200, 0.3)
+    drag(300, 200, 800, 550, 0.6, left)             # Create
+    hover(800, 550, 800, 550, 0.1)
+    drag(800, 550, 880, 620, 0.4, left)             # Resize from the bottom-right handle
+    hover(880, 620, 590, 180, 0.3)
+    drag(590, 180, 700, 200, 0.5, left)             # Rotate from the handle above the top edge
+    wheel(600, 400, 8, 120)                         # Zoom in
+    drag(600, 400, 300, 250, 0.8, mid)              # Pan
+    wheel(600, 400, 8, -120)                        # Zoom out
+    hover(600, 400, 200, 700, 0.5)
+    return records
+
+def load_trace(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+def make_event(rec):
+    kind = rec["type"]
+    pos = QPointF(rec.get("x", 0), rec.get("y", 0))
+    mods = Qt.KeyboardModifiers(rec.get("mods", 0))
+    buttons = Qt.MouseButtons(rec.get("buttons", 0))
+    if kind in ("press", "release", "move"):
+        etype = {"press": QEvent.MouseButtonPress, "release": QEvent.MouseButtonRelease,
+                 "move": QEvent.MouseMove}[kind]
+        return QMouseEvent(etype, pos, Qt.MouseButton(rec.get("button", 0)), buttons, mods)
+    if kind == "wheel":
+        return QWheelEvent(pos, pos, QPoint(0, 0), QPoint(rec.get("dx", 0), rec.get("dy", 0)),
+                           buttons, mods, Qt.NoScrollPhase, False)
+    if kind in ("key_press", "key_release"):
+        etype = QEvent.KeyPress if kind == "key_press" else QEvent.KeyRelease
+        return QKeyEvent(etype, rec["key"], mods, "", rec.get("auto", False))
+    return None
+
+def replay(records, image_path=None, speed=1.0):
+    app = QApplication.instance() or QApplication(sys.argv)
+    header = records[0] if records and records[0].get("type") == "header" else {}
+    canvas = TimedCanvas()
+    view = header.get("canvas", [1200, 800])
+    canvas.resize(*view)
+    canvas.show()
+    app.processEvents()
+    canvas.frame_times.clear()
+
+    pages = {}
+    dispatch = []
+    events = 0
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for rec in records[1:] if header else records:
+        if speed > 0 and "t" in rec:
+            target = wall_start + rec["t"] / speed
+            while True:
+                app.processEvents() # Let coalescing/settle timers fire as they did live
+                remaining = target - time.perf_counter()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, 0.001))
+        kind = rec["type"]
+        if kind == "page":
+            size = (rec["w"], rec["h"])
+            if size not in pages:
+                pages[size] = QImage(image_path) if image_path else synthetic_page(*size)
+            canvas.set_image(pages[size])
+            if "scale" in rec:
+                canvas.viewport.scale = rec["scale"]
+                canvas.viewport.offset = QPointF(rec["ox"], rec["oy"])
+        elif kind == "resize":
+            canvas.resize(rec["w"], rec["h"])
+        else:
+            event = make_event(rec)
+            if event is None:
+                continue
+            start = time.perf_counter()
+            app.sendEvent(canvas, event)
+            dispatch.append(time.perf_counter() - start)
+            events += 1
+        if speed <= 0:
+            app.processEvents()
+
+    # Let the last coalesced input and the smooth (settled) pass paint
+    deadline = time.perf_counter() + 0.5
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+
+    frames = canvas.frame_times
+    budget = header.get("frame_ms", 16) / 1000
+    return {
+        "events": events,
+        "frames": len(frames),
+        "frame_ms": {q: round(percentile(frames, int(q[1:])) * 1000, 3) for q in ("p50", "p90", "p99")},
+        "frame_max_ms": round(max(frames, default=0) * 1000, 3),
+        "frame_mean_ms": round(sum(frames) / len(frames) * 1000, 3) if frames else 0.0,
+        "frames_over_budget": sum(1 for f in frames if f > budget),
+        "dispatch_ms": {q: round(percentile(dispatch, int(q[1:])) * 1000, 3) for q in ("p50", "p99")},
+        "cpu_s": round(time.process_time() - cpu_start, 3),
+        "wall_s": round(time.perf_counter() - wall_start, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("trace", nargs="?", help="trace file recorded with SERIALCROPPER_TRACE")
+    parser.add_argument("--synthetic", action="store_true", help="replay the built-in workflow")
+    parser.add_argument("--image", help="page image to use instead of synthetic pages")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = recorded timing, 0 = no waiting")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    if not args.trace and not args.synthetic:
+        parser.error("give a trace file or --synthetic")
+
+    records = synthetic_trace() if args.synthetic else load_trace(args.trace)
+    report = replay(records, args.image, args.speed)
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"events {report['events']}, frames {report['frames']} "
+          f"({report['frames_over_budget']} over the frame interval)")
+    print(f"frame ms   p50 {report['frame_ms']['p50']:.2f}  p90 {report['frame_ms']['p90']:.2f}  "
+          f"p99 {report['frame_ms']['p99']:.2f}  max {report['frame_max_ms']:.2f}  "
+          f"mean {report['frame_mean_ms']:.2f}")
+    print(f"dispatch   p50 {report['dispatch_ms']['p50']:.3f} ms  p99 {report['dispatch_ms']['p99']:.3f} ms")
+    print(f"cpu {report['cpu_s']:.2f} s, wall {report['wall_s']:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Soak test: runs the full viewer offscreen over many pages and checks that
+memory stays flat.
+
+Each page: draw a selection, Save & Next (encode, write, move, load the next
+page) and rebuild the custom buttons panel (as editing a button does).
+MemoryMonitor checks every --every pages; the first check is the baseline.
+Exits 1 if any later check flags a leak (Python heap growth above
+--threshold-kb per interval, or Qt objects piling up).
+
+Run from the repo root:
+    python benchmarks/soak_memory.py [--pages 600] [--every 100] [--report memory.jsonl]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt5.QtCore import QCoreApplication, QEvent
+from PyQt5.QtGui import QColor, QImage, QPainter
+from PyQt5.QtWidgets import QApplication
+
+def make_batch(root, pages):
+    todo = os.path.join(root, "_para_procesar", "Artist", "Work")
+    os.makedirs(todo)
+    for i in range(pages):
+        image = QImage(480, 360, QImage.Format_RGB32)
+        image.fill(QColor(200, 190, 170))
+        p = QPainter(image)
+        p.drawText(20, 40, f"Page {i}")
+        p.end()
+        image.save(os.path.join(todo, f"{i:04d}.jpg"))
+
+def pump(app):
+    app.processEvents()
+    # deleteLater() objects are only freed once control is back in an event loop
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=600)
+    parser.add_argument("--every", type=int, default=100)
+    parser.add_argument("--threshold-kb", type=int, default=512)
+    parser.add_argument("--report", help="JSONL report path")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    root = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        make_batch(root, args.pages + 1)
+        os.chdir(root) # settings.json / custom_buttons.json of the run stay in the temp dir
+
+        from core.geometry import SelectionGeometry
+        from core.memory_monitor import MemoryMonitor
+        from viewer import ImageViewer
+
+        w = ImageViewer()
+        w.show()
+        w.custom_panel.buttons_data = [{"name": "Keep A", "paths": [os.path.join(root, "a")], "shortcut": "F5"}]
+        w.open_folder(root)
+        pump(app)
+        w.memory = MemoryMonitor(w, every=args.every, threshold_kb=args.threshold_kb, report_path=args.report)
+
+        start = time.perf_counter()
+        for i in range(args.pages):
+            w._wait_for_full_image()
+            size = w.canvas.image_size
+            w.canvas.selection.set_geometry(SelectionGeometry(size.width() / 2, size.height() / 2,
+                                                              size.width() / 3, size.height() / 4, i % 30))
+            w.custom_panel.refresh_ui()
+            w.save_crop(keep=False)
+            pump(app)
+            if w.io.total_depth() > 8:
+                w.io.wait_idle(10)
+        w.io.wait_idle(30)
+        pump(app)
+        elapsed = time.perf_counter() - start
+
+        for report in w.memory.checks:
+            rss = f"{report['rss'] / 2**20:7.1f} MB" if report["rss"] else "    n/a"
+            flag = "  LEAK: " + "; ".join(report["reasons"]) if report["leak"] else ""
+            print(f"pages {report['pages']:5d}  rss {rss}  heap {report['traced'] / 2**20:6.2f} MB  "
+                  f"growth {report['growth'] / 1024:+8.1f} KB{flag}")
+        leaks = [r for r in w.memory.checks if r["leak"]]
+        if leaks and leaks[0]["top"]:
+            print("top growth sites at the first flagged check:")
+            for site in leaks[0]["top"][:5]:
+                print(f"  {site['size_diff'] / 1024:+8.1f} KB  {site['count_diff']:+6d}  {site['site']}")
+        print(f"{args.pages} pages in {elapsed:.1f} s: {'LEAK' if leaks else 'flat'}")
+        w.memory.stop()
+        w.close()
+        pump(app)
+        sys.exit(1 if leaks else 0)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
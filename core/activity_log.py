@@ -1,12 +1,66 @@
+import json
+import logging
+from collections import deque
+from datetime import datetime
+from logging.handlers import MemoryHandler, RotatingFileHandler
+
+class _JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps({
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }, ensure_ascii=False)
+
 class ActivityLog:
+    """
+    Bounded in-memory log (ring buffer) with an optional rotating JSONL file.
+    """
     def __init__(self, max_entries=50):
-        self.entries = []
+        self.entries = deque(maxlen=max_entries) # Oldest -> newest, O(1) append/evict
         self.max_entries = max_entries
+        self._file_logger = None
+        self._file_handlers = []
 
     def add(self, message: str):
-        self.entries.insert(0, message)
-        if len(self.entries) > self.max_entries:
-            self.entries.pop()
+        self.entries.append(message)
+        if self._file_logger:
+            self._file_logger.info(message)
     
     def get_entries(self):
-        return self.entries
+        """Newest first."""
+        return list(reversed(self.entries))
+
+    def enable_file_log(self, path, max_bytes=5 * 1024 * 1024, backup_count=3, buffer_size=50):
+        """
+        Mirrors entries to a rotating JSON-lines file. Writes are buffered and
+        flushed every `buffer_size` entries, on errors, and on flush()/close().
+        """
+        self.close()
+        
+        file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                           encoding="utf-8", delay=True)
+        file_handler.setFormatter(_JsonLineFormatter())
+        buffer = MemoryHandler(buffer_size, flushLevel=logging.ERROR, target=file_handler)
+        
+        logger = logging.getLogger(f"serialcropper.activity.{id(self)}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(buffer)
+        
+        self._file_logger = logger
+        self._file_handlers = [buffer, file_handler]
+
+    def flush(self):
+        for handler in self._file_handlers:
+            handler.flush()
+
+    def close(self):
+        if not self._file_logger:
+            return
+        for handler in self._file_handlers:
+            handler.flush()
+            handler.close()
+            self._file_logger.removeHandler(handler)
+        self._file_logger = None
+        self._file_handlers = []
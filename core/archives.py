@@ -0,0 +1,161 @@
+"""
+CBZ/ZIP archives as virtual folders of the input tree.
+
+A page inside an archive has the virtual path <archive>/<member>, e.g.
+_para_procesar/Artist/Work.cbz/001.jpg, so artist/work/page come from the
+path exactly as for extracted folders. The central directory is read once
+per archive (ZipFile objects are cached) and members are decoded straight
+from their bytes. Members can't be moved out of an archive, so processed
+pages are listed in a sidecar (<archive>.processed.json) and the archive
+itself is moved once all of its pages are done.
+"""
+import json
+import os
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+
+ARCHIVE_EXTENSIONS = (".cbz", ".zip")
+SIDECAR_SUFFIX = ".processed.json"
+MAX_OPEN = 8          # Archives kept open (central directory parsed)
+LOCK_TIMEOUT = 5.0    # Seconds to wait for another instance's sidecar update
+STALE_LOCK = 30.0     # A lock older than this was left by a crash
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+def strip_archive_ext(name):
+    """'Work.cbz' -> 'Work' (names from virtual paths)."""
+    return os.path.splitext(name)[0] if is_archive(name) else name
+
+def split_path(path):
+    """
+    (archive path, member name with '/' separators) for a virtual path inside
+    an archive, or (None, path) for a regular file.
+    """
+    parts = path.split(os.sep)
+    for i in range(len(parts) - 1):
+        if is_archive(parts[i]):
+            archive = os.sep.join(parts[:i + 1])
+            if os.path.isfile(archive):
+                return archive, "/".join(parts[i + 1:])
+    return None, path
+
+class _Archive:
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.zip = zipfile.ZipFile(path)
+        self.lock = threading.Lock() # One member read at a time (shared file position)
+
+_open = OrderedDict() # path -> _Archive, least recently used first
+_open_lock = threading.Lock()
+
+def _get(path):
+    with _open_lock:
+        archive = _open.get(path)
+        if archive is not None and archive.mtime != os.path.getmtime(path):
+            _close(archive) # Replaced on disk: re-read the central directory
+            archive = None
+        if archive is None:
+            archive = _Archive(path)
+            _open[path] = archive
+            while len(_open) > MAX_OPEN:
+                _, old = _open.popitem(last=False)
+                _close(old)
+        _open.move_to_end(path)
+        return archive
+
+def _close(archive):
+    # Waits for a member read in progress on another thread (the loader)
+    with archive.lock:
+        archive.zip.close()
+
+def members(path, extensions):
+    """Image members (sorted, '/' separators) of an archive."""
+    archive = _get(path)
+    return sorted(info.filename for info in archive.zip.infolist()
+                  if not info.is_dir() and info.filename.lower().endswith(extensions)
+                  and not os.path.basename(info.filename).startswith("."))
+
+def read_member(path, member):
+    while True:
+        archive = _get(path)
+        with archive.lock:
+            if archive.zip.fp is not None: # Else evicted between _get and the lock: reopen
+                return archive.zip.read(member)
+
+def read_bytes(virtual_path):
+    """Bytes of a page inside an archive, or None if the path is a regular file."""
+    archive, member = split_path(virtual_path)
+    if archive is None:
+        return None
+    return read_member(archive, member)
+
+def close(path=None):
+    """Closes one cached archive (before moving it) or all of them."""
+    with _open_lock:
+        for key in ([path] if path else list(_open)):
+            archive = _open.pop(key, None)
+            if archive:
+                _close(archive)
+
+# -----------------------------
+# Processed-pages sidecar
+# -----------------------------
+def sidecar_path(path):
+    return path + SIDECAR_SUFFIX
+
+def processed_members(path):
+    try:
+        with open(sidecar_path(path), "r", encoding="utf-8") as f:
+            return set(json.load(f).get("processed", []))
+    except FileNotFoundError:
+        return set()
+    except (OSError, ValueError) as e:
+        print(f"Error reading {sidecar_path(path)}: {e}")
+        return set()
+
+def pending_members(path, extensions):
+    done = processed_members(path)
+    return [m for m in members(path, extensions) if m not in done]
+
+def _update_sidecar(path, change):
+    """Read-modify-write of the sidecar under an O_EXCL lock file (operators may share the batch)."""
+    lock = sidecar_path(path) + ".lock"
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > STALE_LOCK:
+                    os.remove(lock)
+                    continue
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"sidecar of {os.path.basename(path)} is locked")
+            time.sleep(0.01)
+    try:
+        done = processed_members(path)
+        change(done)
+        tmp = f"{sidecar_path(path)}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"processed": sorted(done)}, f, indent=1)
+        os.replace(tmp, sidecar_path(path)) # Atomic: readers never see a partial list
+        return done
+    finally:
+        try:
+            os.remove(lock)
+        except OSError:
+            pass
+
+def mark_processed(path, member):
+    """Adds a member to the sidecar; returns the processed set."""
+    return _update_sidecar(path, lambda done: done.add(member))
+
+def unmark_processed(path, member):
+    return _update_sidecar(path, lambda done: done.discard(member))
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source      TEXT PRIMARY KEY,   -- Path relative to _para_procesar
+    artist      TEXT,
+    work        TEXT,
+    page        TEXT,
+    first_seen  REAL
+);
+CREATE TABLE IF NOT EXISTS crops (
+    id          INTEGER PRIMARY KEY,
+    created     REAL NOT NULL,
+    artist      TEXT,
+    work        TEXT,
+    page        TEXT,
+    source      TEXT,
+    cx REAL, cy REAL, w REAL, h REAL, angle REAL,
+    mode        TEXT,
+    destination TEXT NOT NULL,      -- Full output path
+    size        INTEGER,
+    sha256      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_crops_work ON crops (artist, work, page);
+CREATE INDEX IF NOT EXISTS idx_crops_source ON crops (source);
+CREATE INDEX IF NOT EXISTS idx_crops_sha ON crops (sha256);
+CREATE INDEX IF NOT EXISTS idx_sources_work ON sources (artist, work, page);
+"""
+
+class CropCatalog:
+    """
+    Local SQLite index of every saved crop, so counts, gaps and re-exports are
+    indexed queries instead of directory walks.
+
+    Inserts are buffered and committed in one transaction every `batch_size`
+    rows or `batch_interval` seconds (and on flush()/close()).
+    """
+    def __init__(self, db_path, batch_size=50, batch_interval=5.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._crops = []
+        self._sources = []
+        self._last_commit = time.monotonic()
+
+    # -----------------------------
+    # Writes (batched)
+    # -----------------------------
+    def add_source(self, source, artist, work, page):
+        self._sources.append((source, artist, work, page, time.time()))
+        self._maybe_flush()
+
+    def add_sources(self, rows):
+        """Registers many pages at once, (source, artist, work, page) each (e.g. a whole scan)."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO sources (source, artist, work, page, first_seen) "
+                "VALUES (?, ?, ?, ?, ?)", ((*row, now) for row in rows))
+
+    def add_crop(self, destination, artist, work, page, source, geometry, size=None, sha256=None):
+        """geometry: SelectionGeometry (or anything with cx, cy, w, h, angle, mode)."""
+        self._crops.append((
+            time.time(), artist, work, page, source,
+            geometry.cx, geometry.cy, geometry.w, geometry.h, geometry.angle, geometry.mode,
+            destination, size, sha256
+        ))
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        pending = len(self._crops) + len(self._sources)
+        if pending >= self.batch_size or time.monotonic() - self._last_commit >= self.batch_interval:
+            self.flush()
+
+    def flush(self):
+        if not self._crops and not self._sources:
+            return
+        with self.conn: # One transaction per batch
+            if self._sources:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO sources (source, artist, work, page, first_seen) "
+                    "VALUES (?, ?, ?, ?, ?)", self._sources)
+            if self._crops:
+                self.conn.executemany(
+                    "INSERT INTO crops (created, artist, work, page, source, cx, cy, w, h, angle, "
+                    "mode, destination, size, sha256) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._crops)
+        self._crops = []
+        self._sources = []
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def count_crops(self, artist, work=None, page=None):
+        self.flush()
+        sql = "SELECT COUNT(*) FROM crops WHERE artist = ?"
+        args = [artist]
+        if work is not None:
+            sql += " AND work = ?"
+            args.append(work)
+        if page is not None:
+            sql += " AND page = ?"
+            args.append(page)
+        return self.conn.execute(sql, args).fetchone()[0]
+
+    def sources_without_crops(self, artist=None, work=None):
+        self.flush()
+        sql = ("SELECT s.source FROM sources s "
+               "WHERE NOT EXISTS (SELECT 1 FROM crops c WHERE c.source = s.source)")
+        args = []
+        if artist is not None:
+            sql += " AND s.artist = ?"
+            args.append(artist)
+        if work is not None:
+            sql += " AND s.work = ?"
+            args.append(work)
+        return [row[0] for row in self.conn.execute(sql + " ORDER BY s.source", args)]
+
+    def crops_for(self, artist=None, work=None, page=None, source=None):
+        """Crop rows (as dicts) matching the filters, e.g. to re-export a selection."""
+        self.flush()
+        clauses = []
+        args = []
+        for column, value in (("artist", artist), ("work", work), ("page", page), ("source", source)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        sql = "SELECT * FROM crops"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        cursor = self.conn.execute(sql + " ORDER BY id", args)
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+def catalog_path(root_dir):
+    return os.path.join(root_dir, "_catalog.sqlite3")
@@ -1,21 +1,37 @@
-from PyQt5.QtGui import QPixmap, QPainter, QPainterPath, QColor
-from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QPixmap, QPainter, QColor, QImage, QImageWriter
+from PyQt5.QtCore import Qt, QRectF, QBuffer, QIODevice
+
+from core.image_buffer import SOURCE_FORMAT, to_source_format, crop_view, qimage_view, qimage_from_view
+from core.resample import rotated_crop
+from core.startup import lazy_import
+
+_masks = lazy_import("core.masks") # NumPy at import: loaded on the first rotated crop
 
 class Cropper:
     @staticmethod
-    def crop(pixmap: QPixmap, rect: QRectF, angle: float = 0.0, mode: str = "rect") -> QPixmap:
+    def crop(image: QImage, rect: QRectF, angle: float = 0.0, mode: str = "rect", opaque: bool = False,
+             resample: str = "painter") -> QImage:
+        """
+        Crops a source QImage (SOURCE_FORMAT). Axis-aligned rect crops are
+        views over the source buffer; only the encoder touches their pixels.
+        opaque: the source has no transparency (rect crops are encoded as RGB).
+        resample: filter for rotated/ellipse crops (see core.resample.MODES).
+        """
+        if isinstance(image, QPixmap):
+            image = to_source_format(image.toImage())
+            
         if angle != 0 or mode == "ellipse":
-            return Cropper.crop_rotated(pixmap, rect, angle, mode)
+            return Cropper.crop_rotated(image, rect, angle, mode, resample=resample)
             
-        if not pixmap or rect.isEmpty():
+        if not image or image.isNull() or rect.isEmpty():
             return None
 
         # Normalize and integerize
         r = rect.normalized()
         left = int(max(0, r.left()))
         top = int(max(0, r.top()))
-        right = int(min(pixmap.width(), r.right()))
-        bottom = int(min(pixmap.height(), r.bottom()))
+        right = int(min(image.width(), r.right()))
+        bottom = int(min(image.height(), r.bottom()))
         w = right - left
         h = bottom - top
 
@@ -23,33 +39,41 @@ class Cropper:
             return None
 
         if mode == "rect":
-            return pixmap.copy(left, top, w, h)
+            return crop_view(image, left, top, w, h, opaque)
         
         return None
 
     @staticmethod
-    def crop_rotated(pixmap: QPixmap, rect: QRectF, angle: float, mode: str = "rect") -> QPixmap:
-        if not pixmap or rect.isEmpty():
+    def crop_rotated(image: QImage, rect: QRectF, angle: float, mode: str = "rect", feather: float = 0.0,
+                     resample: str = "painter") -> QImage:
+        if not image or image.isNull() or rect.isEmpty():
             return None
             
-        # 1. Create a new transparent pixmap of the target size (selection size)
+        # 1. Create a new transparent image of the target size (selection size)
         # We use the full width/height of the selection
         w = int(rect.width())
         h = int(rect.height())
+        if w <= 0 or h <= 0:
+            return None
+        
+        masks = _masks()
+
+        if resample != "painter":
+            # NumPy warp over just the source region under the rotated rect
+            center = rect.center()
+            pixels = rotated_crop(qimage_view(to_source_format(image)), center.x(), center.y(),
+                                  w, h, angle, resample)
+            if mode == "ellipse":
+                masks.apply_mask(pixels, masks.ellipse_mask(w, h, feather))
+            return qimage_from_view(pixels, SOURCE_FORMAT)
         
-        result = QPixmap(w, h)
+        result = QImage(w, h, SOURCE_FORMAT)
         result.fill(Qt.transparent)
         
         painter = QPainter(result)
         painter.setRenderHint(QPainter.Antialiasing, True)
         painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
         
-        # Masking for Ellipse (Apply ClipPath BEFORE transforms)
-        if mode == "ellipse":
-            path = QPainterPath()
-            path.addEllipse(0, 0, w, h)
-            painter.setClipPath(path)
-        
         # 2. Setup the coordinate system to draw the source image into our result
         # We want the center of the selection to map to the center of our result
         
@@ -63,8 +87,25 @@ class Cropper:
         center_src = rect.center()
         painter.translate(-center_src.x(), -center_src.y())
         
-        # 3. Draw the source pixmap
-        painter.drawPixmap(0, 0, pixmap)
+        # 3. Draw the source image
+        painter.drawImage(0, 0, image)
             
         painter.end()
+
+        # Masking for Ellipse: cached coverage mask, multiplied into the
+        # premultiplied pixels (same mask as the headless backend)
+        if mode == "ellipse":
+            masks.apply_mask(qimage_view(result, writable=True), masks.ellipse_mask(w, h, feather))
         return result
+
+    @staticmethod
+    def encode_png(image: QImage, text: dict = None) -> bytes:
+        """Encodes once to in-memory PNG bytes, embedding text chunks."""
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        writer = QImageWriter(buffer, b"PNG")
+        for key, value in (text or {}).items():
+            writer.setText(key, value)
+        if not writer.write(image):
+            return None
+        return bytes(buffer.data())
@@ -0,0 +1,145 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core import packfile
+
+PART_SUFFIX = ".part"
+MAX_VARIANTS = 1000 # Names tried past a taken one before giving up
+_VARIANT = re.compile(r"^(.*)\((\d+)\)(\.[^.]*)$")
+
+def device_of(path: str):
+    """st_dev of the path, or of its nearest existing parent."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+def group_by_device(targets):
+    """Groups target file paths by the filesystem they will land on (order kept)."""
+    groups = {}
+    for target in targets:
+        groups.setdefault(device_of(os.path.dirname(target)), []).append(target)
+    return list(groups.values())
+
+def part_path(path: str):
+    """Temp name next to `path`; unique per thread so a timed-out attempt and its retry don't collide."""
+    return f"{path}.{os.getpid()}-{threading.get_ident()}{PART_SUFFIX}"
+
+def next_variant(path: str):
+    """'A_W_001(2).png' -> 'A_W_001(3).png' (or 'name(2).ext' without a variant)."""
+    folder, name = os.path.split(path)
+    m = _VARIANT.match(name)
+    if m:
+        name = f"{m.group(1)}({int(m.group(2)) + 1}){m.group(3)}"
+    else:
+        stem, ext = os.path.splitext(name)
+        name = f"{stem}(2){ext}"
+    return os.path.join(folder, name)
+
+def write_bytes(path: str, data: bytes):
+    """
+    Atomic write: temp file + link, so `path` is either absent or complete.
+    Never replaces an existing file (FileExistsError); the destination folder
+    is created here, on the I/O worker, if it is missing.
+    Virtual paths inside a .pack are appended as one record instead.
+    Not fsynced here; the batch journal syncs saves in groups.
+    """
+    if packfile.split_path(path)[0]:
+        packfile.write(path, data)
+        return
+    tmp = part_path(path)
+    try:
+        try:
+            f = open(tmp, "wb")
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(tmp, "wb")
+        with f:
+            f.write(data)
+        try:
+            os.link(tmp, path) # Fails if the name is taken, unlike a rename
+            os.remove(tmp)
+        except FileExistsError:
+            raise
+        except OSError: # No hardlinks on this filesystem
+            if os.path.exists(path):
+                raise FileExistsError(path)
+            os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def write_group(data: bytes, targets, writer=write_bytes):
+    """
+    Writes `data` to the first target and hardlinks the rest (same filesystem).
+    Falls back to a full write if linking is not supported. A name that is
+    already taken (an earlier session, another operator) is never overwritten:
+    the next free variant is used (the later targets start from the first
+    one's) and reported as "path".
+    Returns one result dict per target: {"target", "path", "ok", "method", "error"}.
+    """
+    results = []
+    first = None
+    for target in targets:
+        path = target
+        if first is not None and os.path.basename(target) == os.path.basename(targets[0]):
+            # Follow the first target's variant, so a crop keeps one name across folders
+            path = os.path.join(os.path.dirname(target), os.path.basename(first))
+        try:
+            for _ in range(MAX_VARIANTS):
+                try:
+                    method = _write_one(data, path, first, writer)
+                    break
+                except FileExistsError:
+                    path = next_variant(path)
+            else:
+                raise FileExistsError(f"no free variant after {MAX_VARIANTS} names")
+            if first is None:
+                first = path
+            results.append({"target": target, "path": path, "ok": True, "method": method, "error": None})
+        except OSError as e:
+            results.append({"target": target, "path": path, "ok": False, "method": None, "error": str(e)})
+    return results
+
+def _write_one(data, path, first, writer):
+    if first is None or packfile.split_path(first)[0] or packfile.split_path(path)[0]:
+        writer(path, data) # Pack members can't be hardlinked
+        return "write"
+    try:
+        os.link(first, path)
+        return "link"
+    except FileExistsError:
+        raise
+    except OSError:
+        writer(path, data)
+        return "write"
+
+def write_fanout(data: bytes, targets, max_workers=4, writer=write_bytes):
+    """
+    Fans already-encoded bytes out to several destinations.
+
+    Targets on the same filesystem share one write plus hardlinks (outputs are
+    write-once, so sharing an inode is safe); different filesystems are written
+    in parallel. Results are returned in the order of `targets`.
+    """
+    groups = group_by_device(targets)
+    if len(groups) == 1:
+        results = write_group(data, groups[0], writer)
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(groups))) as pool:
+            futures = [pool.submit(write_group, data, group, writer) for group in groups]
+            results = [r for f in futures for r in f.result()]
+
+    by_target = {r["target"]: r for r in results}
+    return [by_target[t] for t in targets]
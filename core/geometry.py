@@ -0,0 +1,291 @@
+"""
+Qt-free selection geometry.
+
+A selection is stored as plain floats (center, size, angle, mode) so it can
+be used by headless tools and worker processes without importing PyQt.
+The Qt adapters live in core/selection.py.
+"""
+import math
+from enum import Enum, auto
+
+from core.startup import numpy as _np # NumPy on first use (headless tools never pay for it)
+
+class HitTest(Enum):
+    NONE = auto()
+    INSIDE = auto()
+    TOP_LEFT = auto()
+    TOP = auto()
+    TOP_RIGHT = auto()
+    LEFT = auto()
+    RIGHT = auto()
+    BOTTOM_LEFT = auto()
+    BOTTOM = auto()
+    BOTTOM_RIGHT = auto()
+    ROTATE = auto()
+
+# Direction of each resize handle from the center, in local (unrotated) units
+HANDLE_DIRECTIONS = {
+    HitTest.TOP_LEFT: (-1, -1),
+    HitTest.TOP: (0, -1),
+    HitTest.TOP_RIGHT: (1, -1),
+    HitTest.LEFT: (-1, 0),
+    HitTest.RIGHT: (1, 0),
+    HitTest.BOTTOM_LEFT: (-1, 1),
+    HitTest.BOTTOM: (0, 1),
+    HitTest.BOTTOM_RIGHT: (1, 1),
+}
+
+class SelectionGeometry:
+    """
+    Rotated rectangle/ellipse in image coordinates.
+
+    cx, cy: center. w, h: size along the local (unrotated) axes.
+    angle: clockwise rotation in degrees (Qt convention, y axis down).
+    """
+    __slots__ = ("_cx", "_cy", "_w", "_h", "_angle", "mode", "_frame")
+
+    def __init__(self, cx=0.0, cy=0.0, w=0.0, h=0.0, angle=0.0, mode="rect"):
+        self._cx = cx
+        self._cy = cy
+        self._w = w
+        self._h = h
+        self._angle = angle
+        self.mode = mode
+        self._frame = None
+
+    # -----------------------------
+    # Geometry (setters invalidate the cached local frame)
+    # -----------------------------
+    @property
+    def cx(self):
+        return self._cx
+
+    @cx.setter
+    def cx(self, value):
+        self._cx = value
+        self._frame = None
+
+    @property
+    def cy(self):
+        return self._cy
+
+    @cy.setter
+    def cy(self, value):
+        self._cy = value
+        self._frame = None
+
+    @property
+    def w(self):
+        return self._w
+
+    @w.setter
+    def w(self, value):
+        self._w = value
+        self._frame = None
+
+    @property
+    def h(self):
+        return self._h
+
+    @h.setter
+    def h(self, value):
+        self._h = value
+        self._frame = None
+
+    @property
+    def angle(self):
+        return self._angle
+
+    @angle.setter
+    def angle(self, value):
+        self._angle = value
+        self._frame = None
+
+    def frame(self):
+        """
+        Cached local frame (cx, cy, cos, sin, hw, hh): center, rotation and
+        half size, so the corners are (+-hw, +-hh) and the edges lie on
+        lx = +-hw / ly = +-hh. Recomputed only after a geometry setter ran.
+        """
+        if self._frame is None:
+            rad = math.radians(self._angle)
+            self._frame = (self._cx, self._cy, math.cos(rad), math.sin(rad), self._w / 2, self._h / 2)
+        return self._frame
+
+    @classmethod
+    def from_corners(cls, x1, y1, x2, y2, angle=0.0, mode="rect"):
+        g = cls(angle=angle, mode=mode)
+        g.set_corners(x1, y1, x2, y2)
+        return g
+
+    def set_corners(self, x1, y1, x2, y2):
+        """Sets the unrotated rect from two opposite corners (any order)."""
+        self.cx = (x1 + x2) / 2
+        self.cy = (y1 + y2) / 2
+        self.w = abs(x2 - x1)
+        self.h = abs(y2 - y1)
+
+    def copy(self):
+        return SelectionGeometry(self.cx, self.cy, self.w, self.h, self.angle, self.mode)
+
+    def to_dict(self):
+        return {"cx": self.cx, "cy": self.cy, "w": self.w, "h": self.h,
+                "angle": self.angle, "mode": self.mode}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["cx"], data["cy"], data["w"], data["h"],
+                   data.get("angle", 0.0), data.get("mode", "rect"))
+
+    def __eq__(self, other):
+        if not isinstance(other, SelectionGeometry):
+            return NotImplemented
+        return (self.cx, self.cy, self.w, self.h, self.angle, self.mode) == \
+               (other.cx, other.cy, other.w, other.h, other.angle, other.mode)
+
+    def __repr__(self):
+        return (f"SelectionGeometry(cx={self.cx:.2f}, cy={self.cy:.2f}, w={self.w:.2f}, "
+                f"h={self.h:.2f}, angle={self.angle:.2f}, mode={self.mode!r})")
+
+    # -----------------------------
+    # Transforms
+    # -----------------------------
+    def trig(self):
+        """(cos, sin) of the angle, from the cached frame."""
+        frame = self.frame()
+        return frame[2], frame[3]
+
+    def bounds(self):
+        """Unrotated (left, top, right, bottom)."""
+        hw = self.w / 2
+        hh = self.h / 2
+        return self.cx - hw, self.cy - hh, self.cx + hw, self.cy + hh
+
+    def is_empty(self):
+        return self.w <= 0 or self.h <= 0
+
+    def to_local(self, x, y):
+        """Image point -> local offset from the center along the rotated axes."""
+        cos_a, sin_a = self.trig()
+        dx = x - self.cx
+        dy = y - self.cy
+        return dx * cos_a + dy * sin_a, -dx * sin_a + dy * cos_a
+
+    def to_global(self, lx, ly):
+        """Local offset from the center -> image point."""
+        cos_a, sin_a = self.trig()
+        return self.cx + lx * cos_a - ly * sin_a, self.cy + lx * sin_a + ly * cos_a
+
+    def corners(self):
+        """Rotated corners in image coords: TL, TR, BR, BL."""
+        hw = self.w / 2
+        hh = self.h / 2
+        return [self.to_global(lx, ly) for lx, ly in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh))]
+
+    def rotated_bounds(self):
+        """Axis-aligned (left, top, right, bottom) enclosing the rotated shape."""
+        cos_a, sin_a = self.trig()
+        ex = (abs(self.w * cos_a) + abs(self.h * sin_a)) / 2
+        ey = (abs(self.w * sin_a) + abs(self.h * cos_a)) / 2
+        return self.cx - ex, self.cy - ey, self.cx + ex, self.cy + ey
+
+    def local_to_global_array(self, points):
+        """Vectorized to_global for an (N, 2) array of local offsets."""
+        np = _np()
+        cos_a, sin_a = self.trig()
+        rot = np.array([[cos_a, sin_a], [-sin_a, cos_a]])
+        return np.asarray(points, dtype=float) @ rot + (self.cx, self.cy)
+
+    def global_to_local_array(self, points):
+        """Vectorized to_local for an (N, 2) array of image points."""
+        np = _np()
+        cos_a, sin_a = self.trig()
+        rot = np.array([[cos_a, -sin_a], [sin_a, cos_a]])
+        return (np.asarray(points, dtype=float) - (self.cx, self.cy)) @ rot
+
+    # -----------------------------
+    # Interaction
+    # -----------------------------
+    def contains(self, x, y):
+        lx, ly = self.to_local(x, y)
+        hw = self.w / 2
+        hh = self.h / 2
+        if self.mode == "ellipse":
+            if hw <= 0 or hh <= 0:
+                return False
+            return (lx / hw) ** 2 + (ly / hh) ** 2 <= 1.0
+        return -hw <= lx <= hw and -hh <= ly <= hh
+
+    def hit_test(self, x, y, tol, knob_offset) -> HitTest:
+        """
+        Classifies an image point against handles, edges and body.
+        tol and knob_offset are in image units (screen pixels / scale).
+        """
+        cx, cy, cos_a, sin_a, hw, hh = self.frame()
+        dx = x - cx
+        dy = y - cy
+        lx = dx * cos_a + dy * sin_a
+        ly = -dx * sin_a + dy * cos_a
+        tol2 = tol * tol
+
+        # Rotation knob above the top edge (its offset follows the view scale)
+        ky = -hh - knob_offset
+        if lx * lx + (ly - ky) ** 2 <= tol2: return HitTest.ROTATE
+
+        # Corners
+        dl2 = (lx + hw) ** 2
+        dr2 = (lx - hw) ** 2
+        dt2 = (ly + hh) ** 2
+        db2 = (ly - hh) ** 2
+        if dl2 + dt2 <= tol2: return HitTest.TOP_LEFT
+        if dr2 + dt2 <= tol2: return HitTest.TOP_RIGHT
+        if dl2 + db2 <= tol2: return HitTest.BOTTOM_LEFT
+        if dr2 + db2 <= tol2: return HitTest.BOTTOM_RIGHT
+
+        # Edges
+        in_x = -hw <= lx <= hw
+        in_y = -hh <= ly <= hh
+        if in_x and abs(ly + hh) <= tol: return HitTest.TOP
+        if in_x and abs(ly - hh) <= tol: return HitTest.BOTTOM
+        if in_y and abs(lx + hw) <= tol: return HitTest.LEFT
+        if in_y and abs(lx - hw) <= tol: return HitTest.RIGHT
+
+        # Inside (bounding rect, also for ellipses so the body is easy to grab)
+        if in_x and in_y:
+            return HitTest.INSIDE
+
+        return HitTest.NONE
+
+    def rotate_towards(self, x, y):
+        """Points the rotation knob (local top) at (x, y)."""
+        # 0 is Right, -90 is Up; the knob sits at local -90
+        self.angle = math.degrees(math.atan2(y - self.cy, x - self.cx)) + 90
+
+    def resize_from(self, initial, handle: HitTest, x, y, min_size=1.0):
+        """
+        Resizes `initial` by dragging `handle` to (x, y), keeping the opposite
+        side/corner anchored in image space. Stores the result in self.
+        """
+        sx, sy = HANDLE_DIRECTIONS[handle]
+        cos_a, sin_a = initial.trig()
+
+        # Anchor: opposite corner/edge of the initial shape
+        ax, ay = initial.to_global(-sx * initial.w / 2, -sy * initial.h / 2)
+
+        # Project anchor -> mouse onto the rotated axes
+        vx = x - ax
+        vy = y - ay
+        proj_x = vx * cos_a + vy * sin_a
+        proj_y = -vx * sin_a + vy * cos_a
+
+        new_w = max(min_size, proj_x * sx if sx else initial.w)
+        new_h = max(min_size, proj_y * sy if sy else initial.h)
+
+        # New center: anchor + half size towards the handle, rotated to global
+        ox = new_w / 2 * sx
+        oy = new_h / 2 * sy
+        self.cx = ax + ox * cos_a - oy * sin_a
+        self.cy = ay + ox * sin_a + oy * cos_a
+        self.w = new_w
+        self.h = new_h
+        self.angle = initial.angle
@@ -0,0 +1,59 @@
+"""
+Zero-copy helpers between QImage and NumPy.
+
+Source pages are kept as a QImage in one fixed premultiplied format so the
+canvas can draw it directly and crops can be taken as views over its buffer.
+"""
+from PyQt5 import sip
+from PyQt5.QtGui import QImage
+
+from core.startup import numpy as _np # Page loading (to_source_format) doesn't need NumPy
+
+SOURCE_FORMAT = QImage.Format_ARGB32_Premultiplied
+
+def to_source_format(image: QImage) -> QImage:
+    """Converts to SOURCE_FORMAT, in place when Qt can (same depth)."""
+    if image.isNull() or image.format() == SOURCE_FORMAT:
+        return image
+    if hasattr(image, "convertTo"): # Qt >= 5.13
+        image.convertTo(SOURCE_FORMAT)
+        return image
+    return image.convertToFormat(SOURCE_FORMAT)
+
+def qimage_view(image: QImage, writable=False) -> "np.ndarray":
+    """
+    (h, w, 4) uint8 view over a 32-bit QImage's pixels (BGRA byte order on
+    little-endian). No copy: the image must outlive the view. Read-only
+    unless writable=True (which detaches the image if it is shared).
+    """
+    np = _np()
+    ptr = image.bits() if writable else image.constBits() # const access never detaches
+    ptr.setsize(image.sizeInBytes())
+    rows = np.frombuffer(ptr, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+
+def qimage_from_view(view: "np.ndarray", fmt=SOURCE_FORMAT, owner=None) -> QImage:
+    """
+    Wraps a (h, w, 4) uint8 array (e.g. a slice of qimage_view) in a QImage
+    sharing the same memory. `owner` (the source QImage or array) is kept
+    alive by the returned image.
+    """
+    np = _np()
+    h, w = view.shape[:2]
+    if view.strides[1] != 4 or view.strides[2] != 1:
+        view = np.ascontiguousarray(view) # Only non-contiguous pixels need a copy
+        owner = view
+    address = view.__array_interface__["data"][0]
+    image = QImage(sip.voidptr(address), w, h, view.strides[0], fmt)
+    image._buffer_owner = owner if owner is not None else view
+    return image
+
+def crop_view(image: QImage, left: int, top: int, width: int, height: int, opaque=False) -> QImage:
+    """
+    Rect crop as a QImage sharing the source buffer (no pixel copy).
+    opaque=True relabels the pixels as RGB32 (same memory layout when every
+    alpha is 0xff) so the encoder writes RGB instead of RGBA.
+    """
+    view = qimage_view(image)[top:top + height, left:left + width]
+    fmt = QImage.Format_RGB32 if opaque else image.format()
+    return qimage_from_view(view, fmt, owner=image)
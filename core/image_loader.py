@@ -0,0 +1,97 @@
+import math
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QSize, QBuffer, QByteArray, QIODevice, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+from core.archives import read_bytes
+from core.image_buffer import to_source_format
+
+# Formats whose decoder can skip work for a scaled read (libjpeg DCT scaling
+# decodes 1/2, 1/4, 1/8 directly). Others would decode fully and then scale.
+FAST_SCALED_FORMATS = {b"jpeg", b"jpg"}
+MAX_PREVIEW_SHIFT = 3 # 1/8: smallest DCT scale
+
+def load_image(path):
+    """QImage of a page file, or of a page inside a CBZ/ZIP (decoded from the member bytes)."""
+    data = read_bytes(path)
+    if data is None:
+        return QImage(path)
+    return QImage.fromData(data)
+
+def _open_reader(path):
+    """QImageReader for a page; the buffer returned with it must outlive the reader."""
+    data = read_bytes(path)
+    if data is None:
+        return QImageReader(path), None
+    buffer = QBuffer()
+    buffer.setData(QByteArray(data))
+    buffer.open(QIODevice.ReadOnly)
+    return QImageReader(buffer), buffer
+
+def read_preview(path, view_size: QSize):
+    """
+    Fast reduced decode for a first frame. Returns (preview QImage, full QSize),
+    or (None, full QSize) when a preview wouldn't be faster than the full decode.
+    The preview is 1/2, 1/4 or 1/8 of the page, at least as large as the page
+    will appear when fitted to `view_size`.
+    """
+    reader, _buffer = _open_reader(path)
+    full = reader.size()
+    if not full.isValid() or bytes(reader.format()).lower() not in FAST_SCALED_FORMATS:
+        return None, full
+
+    fit = min(view_size.width() / full.width(), view_size.height() / full.height())
+    if fit <= 0 or fit >= 0.5:
+        return None, full
+    shift = min(MAX_PREVIEW_SHIFT, int(math.floor(math.log2(1.0 / fit))))
+    reader.setScaledSize(QSize(max(1, full.width() >> shift), max(1, full.height() >> shift)))
+    preview = reader.read()
+    if preview.isNull():
+        return None, full
+    return preview, full
+
+class _DecodeTask(QRunnable):
+    def __init__(self, loader, token, path):
+        super().__init__()
+        self.loader = loader
+        self.token = token
+        self.path = path
+
+    def run(self):
+        start = time.perf_counter()
+        image = load_image(self.path)
+        if not image.isNull():
+            # Convert off the GUI thread too (the canvas keeps SOURCE_FORMAT)
+            opaque = not image.hasAlphaChannel()
+            image = to_source_format(image)
+        else:
+            opaque = True
+        self.loader.loaded.emit(self.token, self.path, image, opaque, time.perf_counter() - start)
+
+class ImageLoader(QObject):
+    """
+    Full-resolution decodes on a worker thread. Each request gets a token;
+    results arrive on the GUI thread through `loaded` and the caller drops
+    any whose token is no longer current (the operator moved on).
+    """
+    loaded = pyqtSignal(int, str, QImage, bool, float) # token, path, image, opaque, seconds
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1) # One page at a time; newer requests queue behind
+        self.token = 0
+
+    def request(self, path):
+        self.token += 1
+        self.pool.start(_DecodeTask(self, self.token, path))
+        return self.token
+
+    def cancel(self):
+        """Invalidates outstanding requests (their results will be ignored)."""
+        self.token += 1
+        self.pool.clear() # Drops queued tasks that haven't started
+
+    def wait(self, timeout_ms=-1):
+        return self.pool.waitForDone(timeout_ms)
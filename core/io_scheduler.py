@@ -0,0 +1,367 @@
+import os
+import queue
+import threading
+import time
+
+from core import packfile
+from core.fanout import MAX_VARIANTS, device_of, next_variant, write_group
+
+DEFAULT_LIMITS = {
+    "concurrency": 2,       # Parallel writes on this volume
+    "bytes_per_sec": 0,     # 0 = unlimited
+    "timeout": 30.0,        # Seconds per attempt before it is abandoned
+    "retries": 3,           # Extra attempts after the first one
+    "backoff": 0.5,         # First retry delay, doubled on each retry
+}
+PROBE_TIMEOUT = 2.0 # Seconds the dispatcher waits on a folder's stat/exists before skipping it
+
+class _WriteJob:
+    """Bytes to write to several targets on the same volume."""
+    def __init__(self, data, targets, done):
+        self.data = data
+        self.targets = targets
+        self.done = done # Called once with the list of result dicts
+
+class _PendingSave:
+    """Collects the per-volume job results of one submit_write() call."""
+    def __init__(self, targets, callback):
+        self.order = list(targets)
+        self.callback = callback
+        self.results = {}
+        self.remaining = 0 # Volume jobs still running
+        self.lock = threading.Lock()
+
+    def job_done(self, results):
+        with self.lock:
+            for r in results:
+                self.results[r["target"]] = r
+            self.remaining -= 1
+            finished = self.remaining == 0
+        if finished and self.callback:
+            self.callback([self.results[t] for t in self.order])
+
+class VolumeQueue:
+    """One FIFO + worker pool per destination volume, with rate limit and retries."""
+    def __init__(self, name, limits):
+        self.name = name
+        self.limits = limits
+        self.jobs = queue.Queue()
+        self.depth = 0 # Queued + in flight
+        self._lock = threading.Lock()
+        self._available_at = 0.0
+        # One slot per write in flight, held until the write thread really ends:
+        # an attempt abandoned on timeout keeps its slot, so a stalled share
+        # can't end up with more concurrent writes than the limit
+        self._slots = threading.Semaphore(max(1, int(limits["concurrency"])))
+        self._workers = []
+        for i in range(max(1, int(limits["concurrency"]))):
+            t = threading.Thread(target=self._run, name=f"io-{name}-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def put(self, job):
+        with self._lock:
+            self.depth += 1
+        self.jobs.put(job)
+
+    def _throttle(self, nbytes):
+        rate = self.limits["bytes_per_sec"]
+        if not rate:
+            return
+        # Token bucket: reserve the next free slot on the volume, then wait for it
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._available_at)
+            self._available_at = start + nbytes / rate
+        if start > now:
+            time.sleep(start - now)
+
+    def _attempt(self, job, targets):
+        """Runs one write attempt in a disposable thread so a stalled share can time out."""
+        if not self._slots.acquire(timeout=self.limits["timeout"]):
+            err = "volume busy: earlier writes still stalled"
+            return [{"target": p, "path": p, "ok": False, "method": None, "error": err} for p in targets]
+        outcome = {}
+
+        def work():
+            try:
+                outcome["results"] = write_group(job.data, targets)
+            finally:
+                self._slots.release()
+
+        t = threading.Thread(target=work, daemon=True)
+        t.start()
+        t.join(self.limits["timeout"])
+        if t.is_alive():
+            err = f"timed out after {self.limits['timeout']:.0f}s"
+            return [{"target": p, "path": p, "ok": False, "method": None, "error": err} for p in targets]
+        return outcome["results"]
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            results = {}
+            remaining = list(job.targets)
+            delay = self.limits["backoff"]
+            for attempt in range(int(self.limits["retries"]) + 1):
+                if attempt:
+                    time.sleep(delay)
+                    delay *= 2
+                self._throttle(len(job.data))
+                for r in self._attempt(job, remaining):
+                    r["attempts"] = attempt + 1
+                    results[r["target"]] = r
+                remaining = [p for p in remaining if not results[p]["ok"]]
+                if not remaining:
+                    break
+            with self._lock:
+                self.depth -= 1
+            try:
+                job.done([results[p] for p in job.targets])
+            except Exception as e:
+                print(f"Error in I/O callback: {e}")
+
+    def stop(self):
+        for _ in self._workers:
+            self.jobs.put(None)
+
+class IOScheduler:
+    """
+    Routes writes to per-volume queues so a slow or stalled destination
+    (e.g. a network share) never blocks writes to other volumes or the UI.
+
+    Submitting only reserves the target names (in memory). A dispatcher
+    thread then does the filesystem work: it finds each folder's volume and
+    moves the whole save to the first variant free in every target folder,
+    so all copies of one crop share a filename. Its calls run on a probe
+    thread; a folder that doesn't answer within PROBE_TIMEOUT is skipped until
+    it does (the write itself still never overwrites), and a fresh probe
+    thread takes over meanwhile.
+
+    limits: {"default": {...}, "<path prefix>": {...}} overriding DEFAULT_LIMITS;
+    the longest matching prefix of a destination picks its volume's limits.
+    """
+    def __init__(self, limits=None):
+        self.limits = limits or {}
+        self.volumes = {} # st_dev -> VolumeQueue
+        self._dir_volumes = {} # Destination folder -> VolumeQueue (stat once per folder)
+        self.reserved = {} # Target path queued but not written yet -> token of its save
+        self._stalled = set() # Folders whose last probe hasn't returned
+        self._dispatching = 0 # Saves submitted but not routed to their volumes yet
+        self._lock = threading.Lock()
+        self._dispatch = queue.Queue()
+        self._probes = queue.Queue()
+        self._start_prober()
+        self._dispatcher = threading.Thread(target=self._run_dispatch, name="io-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def _limits_for(self, path):
+        merged = dict(DEFAULT_LIMITS)
+        merged.update(self.limits.get("default", {}))
+        path = os.path.abspath(path)
+        best_len, best_cfg = -1, None
+        for prefix, cfg in self.limits.items():
+            if prefix == "default":
+                continue
+            p = os.path.abspath(prefix).rstrip(os.sep)
+            if (path == p or path.startswith(p + os.sep)) and len(p) > best_len:
+                best_len, best_cfg = len(p), cfg
+        if best_cfg:
+            merged.update(best_cfg)
+        return merged
+
+    # -----------------------------
+    # Dispatcher (filesystem calls off the UI thread)
+    # -----------------------------
+    def _probe(self, calls):
+        """
+        Runs [(folder, fn)] on a probe thread and returns their results; None
+        where a call failed, its folder is still stalled, or the calls didn't
+        finish within PROBE_TIMEOUT.
+        """
+        task = {"calls": calls, "results": [None] * len(calls), "done": threading.Event(), "abandoned": False}
+        self._probes.put(task)
+        if not task["done"].wait(PROBE_TIMEOUT):
+            with self._lock:
+                if not task["done"].is_set():
+                    # Its prober is stuck on a stalled folder: don't queue behind it
+                    task["abandoned"] = True
+                    self._start_prober()
+        return list(task["results"])
+
+    def _start_prober(self):
+        threading.Thread(target=self._run_probes, name="io-probe", daemon=True).start()
+
+    def _run_probes(self):
+        while True:
+            task = self._probes.get()
+            if task is None:
+                return
+            for i, (folder, fn) in enumerate(task["calls"]):
+                with self._lock:
+                    if folder in self._stalled:
+                        continue
+                    self._stalled.add(folder) # Until the call returns
+                try:
+                    task["results"][i] = fn()
+                except OSError:
+                    pass
+                finally:
+                    with self._lock:
+                        self._stalled.discard(folder)
+            with self._lock:
+                task["done"].set()
+                if task["abandoned"]:
+                    return # A replacement took over while this call was stalled
+
+    def _volumes_for(self, paths):
+        """Destination folder -> VolumeQueue for the folders of `paths` (stat once per folder)."""
+        folders = list(dict.fromkeys(os.path.dirname(p) for p in paths))
+        with self._lock:
+            unknown = [f for f in folders if f not in self._dir_volumes]
+        devices = self._probe([(f, lambda f=f: device_of(f)) for f in unknown]) if unknown else []
+        with self._lock:
+            found = {}
+            for folder, dev in zip(unknown, devices):
+                # Stalled or unreadable: a queue of its own for now, asked again next time
+                key = dev if dev is not None else ("unresolved", folder)
+                vol = self.volumes.get(key)
+                if vol is None:
+                    # Label the queue by the destination folder that created it
+                    vol = VolumeQueue(folder or ".", self._limits_for(folder))
+                    self.volumes[key] = vol
+                if dev is not None:
+                    self._dir_volumes[folder] = vol
+                found[folder] = vol
+            return {f: found.get(f) or self._dir_volumes[f] for f in folders}
+
+    def _resolve_names(self, token, targets):
+        """
+        First variant free (on disk and among other queued saves) in every
+        target folder at once; reserves it for `token`. Returns target -> path.
+        """
+        candidates = list(targets)
+        for _ in range(MAX_VARIANTS):
+            taken = self._probe([(os.path.dirname(p), lambda p=p: _exists(p)) for p in candidates])
+            with self._lock:
+                if not any(taken) and all(self.reserved.get(p, token) is token for p in candidates):
+                    for t in targets:
+                        if self.reserved.get(t) is token:
+                            del self.reserved[t]
+                    for p in candidates:
+                        self.reserved[p] = token
+                    return dict(zip(targets, candidates))
+            candidates = [next_variant(p) for p in candidates]
+        return {t: t for t in targets} # Left to the writers' own variant search
+
+    def _run_dispatch(self):
+        while True:
+            item = self._dispatch.get()
+            if item is None:
+                break
+            token, saves = item
+            try:
+                self._route(token, saves)
+            except Exception as e:
+                print(f"Error dispatching write: {e}")
+                self._fail(token, saves, str(e))
+            finally:
+                with self._lock:
+                    self._dispatching -= 1
+
+    def _fail(self, token, saves, error):
+        with self._lock:
+            for path, owner in list(self.reserved.items()):
+                if owner is token:
+                    del self.reserved[path]
+        for data, targets, callback in saves:
+            if callback:
+                callback([{"target": t, "path": t, "ok": False, "method": None, "error": error} for t in targets])
+
+    def _route(self, token, saves):
+        names = self._resolve_names(token, [t for _, targets, _ in saves for t in targets])
+        volumes = self._volumes_for(list(names.values()))
+        for data, targets, callback in saves:
+            paths = [names[t] for t in targets]
+            groups = {}
+            for path in paths:
+                groups.setdefault(volumes[os.path.dirname(path)], []).append(path)
+
+            def finished(results, targets=targets, paths=paths, callback=callback):
+                with self._lock:
+                    for path in paths:
+                        if self.reserved.get(path) is token:
+                            del self.reserved[path]
+                for r, target in zip(results, targets):
+                    r["target"] = target # As submitted; "path" is where it was written
+                if callback:
+                    callback(results)
+
+            pending = _PendingSave(paths, finished)
+            pending.remaining = len(groups)
+            for vol, group in groups.items():
+                vol.put(_WriteJob(data, group, pending.job_done))
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def submit_write(self, data: bytes, targets, callback=None):
+        """
+        Queues `data` for every target. Targets on the same volume become one
+        job (one write + hardlinks); callback(results) fires once all are done,
+        from a worker thread.
+        """
+        self.submit_writes([(data, targets, callback)])
+
+    def submit_writes(self, saves):
+        """
+        Queues several (data, targets, callback) that must share a filename,
+        e.g. the renditions of one crop: if the name is taken in any of their
+        folders, all of them move to the same next variant.
+        """
+        saves = [(data, list(targets), callback) for data, targets, callback in saves]
+        token = object()
+        with self._lock:
+            for _, targets, _ in saves:
+                for target in targets:
+                    self.reserved.setdefault(target, token)
+            self._dispatching += 1
+        self._dispatch.put((token, saves))
+
+    def is_reserved(self, path):
+        with self._lock:
+            return path in self.reserved
+
+    def queue_depths(self):
+        with self._lock:
+            return {vol.name: vol.depth for vol in self.volumes.values()}
+
+    def total_depth(self):
+        with self._lock:
+            dispatching = self._dispatching
+        return dispatching + sum(self.queue_depths().values())
+
+    def wait_idle(self, timeout=None):
+        """Blocks until all queues are drained (or timeout). Returns True if idle."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.total_depth():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout=10.0):
+        idle = self.wait_idle(timeout)
+        self._dispatch.put(None)
+        self._probes.put(None)
+        with self._lock:
+            for vol in self.volumes.values():
+                vol.stop()
+        return idle
+
+def _exists(path):
+    if packfile.split_path(path)[0]:
+        return packfile.contains(path)
+    return os.path.exists(path)
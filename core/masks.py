@@ -0,0 +1,68 @@
+"""
+Anti-aliased ellipse alpha masks (NumPy, no Qt import).
+
+Masks are cached by (w, h, feather) so repeated same-size ellipse crops
+(avatars, stickers) reuse one array; cached arrays are read-only.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+SUPERSAMPLE = 4 # Sub-rows per pixel; horizontal coverage is computed exactly
+CACHE_SIZE = 32
+
+@lru_cache(maxsize=CACHE_SIZE)
+def ellipse_mask(w: int, h: int, feather: float = 0.0) -> np.ndarray:
+    """
+    (h, w) uint8 coverage of the ellipse inscribed in a w x h box.
+    feather > 0 fades the edge to transparent over that many pixels inwards.
+    """
+    if feather > 0:
+        mask = _feathered(w, h, feather)
+    else:
+        mask = _coverage(w, h)
+    mask.setflags(write=False)
+    return mask
+
+def _coverage(w, h):
+    a, b = w / 2.0, h / 2.0
+    px = np.arange(w, dtype=np.float64)
+    acc = np.zeros((h, w), dtype=np.float64)
+    for i in range(SUPERSAMPLE):
+        # Each sub-row crosses the ellipse over one span; per-pixel coverage of
+        # that span is its overlap with [px, px + 1].
+        y = np.arange(h, dtype=np.float64) + (i + 0.5) / SUPERSAMPLE
+        t = 1.0 - ((y - b) / b) ** 2
+        half = a * np.sqrt(np.clip(t, 0.0, None))
+        x0 = (a - half)[:, None]
+        x1 = (a + half)[:, None]
+        acc += np.clip(np.minimum(x1, px + 1.0) - np.maximum(x0, px), 0.0, 1.0)
+    return np.rint(acc * (255.0 / SUPERSAMPLE)).astype(np.uint8)
+
+def _feathered(w, h, feather):
+    a, b = w / 2.0, h / 2.0
+    dx = (np.arange(w, dtype=np.float64) + 0.5 - a)[None, :]
+    dy = (np.arange(h, dtype=np.float64) + 0.5 - b)[:, None]
+    r = np.sqrt((dx / a) ** 2 + (dy / b) ** 2)
+    # First-order distance to the edge: (r - 1) / |grad r|
+    grad = np.sqrt((dx / a ** 2) ** 2 + (dy / b ** 2) ** 2) / np.maximum(r, 1e-12)
+    dist = (1.0 - r) / np.maximum(grad, 1e-12) # > 0 inside
+    return np.rint(np.clip(dist / feather, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+def apply_mask(pixels: np.ndarray, mask: np.ndarray, premultiplied=True, alpha_channel=3):
+    """
+    Multiplies an (h, w, 4) uint8 array by a mask in place. Premultiplied
+    pixels scale every channel; straight alpha only scales the alpha channel.
+    """
+    m = mask.astype(np.uint16)
+    if premultiplied:
+        target = pixels
+        m = m[..., None]
+    else:
+        target = pixels[..., alpha_channel]
+    x = target * m + 128 # Exact round(x / 255) for x <= 255 * 255
+    target[...] = ((x + (x >> 8)) >> 8).astype(np.uint8)
+    return pixels
+
+def cache_info():
+    return ellipse_mask.cache_info()
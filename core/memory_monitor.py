@@ -0,0 +1,115 @@
+import json
+import os
+import time
+import tracemalloc
+from collections import Counter
+
+from PyQt5.QtCore import QObject
+
+DEFAULT_EVERY = 100        # Pages between checks
+DEFAULT_THRESHOLD_KB = 1024 # Python heap growth per interval that counts as a leak
+DEFAULT_QT_THRESHOLD = 20  # Extra live objects of one Qt class since the baseline
+TOP_SITES = 15
+
+# Allocation sites that are bookkeeping, not the application
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__), # Wrappers created while counting Qt objects
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+def rss_bytes():
+    """Resident set size, or None where it can't be read cheaply."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def qt_object_counts(root):
+    """Live QObjects under `root` by class name."""
+    return Counter(type(obj).__name__ for obj in root.findChildren(QObject))
+
+class MemoryMonitor:
+    """
+    Optional long-session leak check. Every `every` pages it takes a
+    tracemalloc snapshot and counts the Qt objects under `root`, diffs both
+    against the previous check (and the Qt counts against the first one),
+    and appends a JSON line with the top growth sites to `report_path`.
+
+    A check is flagged as a leak when the traced Python heap grew more than
+    `threshold_kb` since the previous check, or a Qt class has more than
+    `qt_threshold` extra live objects since the baseline. tracemalloc slows
+    allocations down, so this is meant for soak runs and diagnosis.
+    """
+    def __init__(self, root=None, every=DEFAULT_EVERY, threshold_kb=DEFAULT_THRESHOLD_KB,
+                 qt_threshold=DEFAULT_QT_THRESHOLD, report_path=None, frames=10):
+        self.root = root
+        self.every = max(1, int(every))
+        self.threshold = threshold_kb * 1024
+        self.qt_threshold = qt_threshold
+        self.report_path = report_path
+        self.pages = 0
+        self.checks = []           # Reports, oldest first
+        self._snapshot = None
+        self._previous_traced = 0
+        self._qt_baseline = None
+        self._started_tracing = False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._started_tracing = True
+
+    def page_loaded(self):
+        """Counts a page; returns the report when this page triggered a check, else None."""
+        self.pages += 1
+        if self.pages % self.every:
+            return None
+        return self.check()
+
+    def check(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        traced = sum(stat.size for stat in snapshot.statistics("filename"))
+        qt_counts = qt_object_counts(self.root) if self.root is not None else Counter()
+
+        report = {"t": time.time(), "pages": self.pages, "rss": rss_bytes(), "traced": traced,
+                  "growth": 0, "top": [], "qt": {}, "leak": False, "reasons": []}
+        if self._snapshot is None:
+            self._qt_baseline = qt_counts # First check is the baseline (after warm-up)
+        else:
+            diffs = snapshot.compare_to(self._snapshot, "lineno")
+            report["growth"] = traced - self._previous_traced
+            report["top"] = [{"site": f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+                              "size_diff": d.size_diff, "count_diff": d.count_diff}
+                             for d in diffs[:TOP_SITES] if d.size_diff > 0]
+            qt_growth = {name: qt_counts[name] - self._qt_baseline.get(name, 0) for name in qt_counts}
+            report["qt"] = {name: n for name, n in sorted(qt_growth.items(), key=lambda kv: -kv[1]) if n > 0}
+
+            if report["growth"] > self.threshold:
+                site = report["top"][0]["site"] if report["top"] else "?"
+                report["reasons"].append(f"heap +{report['growth'] // 1024} KB in {self.every} pages (top: {site})")
+            for name, n in report["qt"].items():
+                if n > self.qt_threshold:
+                    report["reasons"].append(f"{name} +{n} objects")
+            report["leak"] = bool(report["reasons"])
+
+        self._snapshot = snapshot
+        self._previous_traced = traced
+        self.checks.append(report)
+        self._write(report)
+        return report
+
+    def _write(self, report):
+        if not self.report_path:
+            return
+        try:
+            with open(self.report_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report) + "\n")
+        except OSError as e:
+            print(f"Error writing memory report: {e}")
+
+    def stop(self):
+        self._snapshot = None
+        if self._started_tracing:
+            tracemalloc.stop()
@@ -0,0 +1,193 @@
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+# Event name -> counter it increments
+EVENT_COUNTERS = {
+    "image_loaded": "images_loaded",
+    "crop_saved": "crops_saved",
+    "page_skipped": "pages_skipped",
+    "page_moved": "pages_moved",
+}
+
+class SessionMetrics:
+    """
+    Throughput counters and per-stage timings for one operator session.
+
+    Events are buffered and appended to a JSONL file in batches; the current
+    totals can be exported as a Prometheus text file and/or served over a
+    local HTTP endpoint (/metrics, /metrics.json).
+    """
+    def __init__(self, workstation=None):
+        self.workstation = workstation or socket.gethostname()
+        self.started = time.time()
+        self.counters = {name: 0 for name in EVENT_COUNTERS.values()}
+        self.timings = {} # stage -> [count, total_seconds, max_seconds]
+
+        self.jsonl_path = None
+        self.prom_path = None
+        self.flush_every = 20
+        self.flush_interval = 10.0
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._server = None
+
+    def configure(self, jsonl_path=None, prom_path=None, http_port=None,
+                  flush_every=20, flush_interval=10.0):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        if http_port:
+            self.serve_http(http_port)
+
+    # -----------------------------
+    # Recording
+    # -----------------------------
+    def record(self, event: str, **fields):
+        with self._lock:
+            counter = EVENT_COUNTERS.get(event)
+            if counter:
+                self.counters[counter] += 1
+            self._buffer.append({"ts": time.time(), "event": event,
+                                 "workstation": self.workstation, **fields})
+        self._maybe_flush()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            t = self.timings.setdefault(stage, [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += seconds
+            t[2] = max(t[2], seconds)
+
+    @contextmanager
+    def timed(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    # -----------------------------
+    # Derived values
+    # -----------------------------
+    def snapshot(self):
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            pages = self.counters["pages_moved"]
+            return {
+                "workstation": self.workstation,
+                "session_start": self.started,
+                "elapsed_seconds": elapsed,
+                "counters": dict(self.counters),
+                "pages_per_hour": pages * 3600.0 / elapsed,
+                "crops_per_page": self.counters["crops_saved"] / pages if pages else 0.0,
+                "timings": {stage: {"count": c, "sum": s, "max": m}
+                            for stage, (c, s, m) in self.timings.items()},
+            }
+
+    def to_prometheus(self):
+        snap = self.snapshot()
+        label = f'workstation="{_escape_label(snap["workstation"])}"'
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP serialcropper_{name} {help_text}")
+            lines.append(f"# TYPE serialcropper_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"serialcropper_{name}{{{labels}}} {value}")
+
+        for counter, value in snap["counters"].items():
+            metric(f"{counter}_total", "counter", counter.replace("_", " ").capitalize() + ".",
+                   [(label, value)])
+        metric("pages_per_hour", "gauge", "Pages moved to _processed per hour this session.",
+               [(label, f'{snap["pages_per_hour"]:.3f}')])
+        metric("crops_per_page", "gauge", "Crops saved per processed page this session.",
+               [(label, f'{snap["crops_per_page"]:.3f}')])
+        metric("session_start_time_seconds", "gauge", "Session start (unix time).",
+               [(label, f'{snap["session_start"]:.0f}')])
+
+        timings = snap["timings"]
+        if timings:
+            for suffix, key, kind in (("sum", "sum", "counter"), ("count", "count", "counter"),
+                                      ("max", "max", "gauge")):
+                metric(f"stage_seconds_{suffix}", kind, f"Per-stage duration ({suffix}).",
+                       [(f'{label},stage="{_escape_label(stage)}"',
+                         f'{t[key]:.6f}' if key != "count" else t[key])
+                        for stage, t in sorted(timings.items())])
+        return "\n".join(lines) + "\n"
+
+    # -----------------------------
+    # Output
+    # -----------------------------
+    def _maybe_flush(self):
+        due = (len(self._buffer) >= self.flush_every or
+               time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            events, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        try:
+            if self.jsonl_path and events:
+                # One append per batch
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events))
+            if self.prom_path:
+                # Atomic replace so collectors never read a partial file
+                tmp = self.prom_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(self.to_prometheus())
+                os.replace(tmp, self.prom_path)
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+
+    def serve_http(self, port, host="127.0.0.1"):
+        if self._server:
+            return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer # Only when enabled
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = metrics.to_prometheus().encode("utf-8")
+                    ctype = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(metrics.snapshot()).encode("utf-8")
+                    ctype = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Keep scrapes out of stdout
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"Error starting metrics endpoint: {e}")
+            return
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.flush()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
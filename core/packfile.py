@@ -0,0 +1,413 @@
+"""
+Packfile output: crops appended to one container per artist/work instead of
+one file each (hundreds of thousands of small PNGs are hard on inodes,
+directory listings and backups).
+
+A crop in a pack has the virtual path <dir>/<Artist_W>.pack/<filename>, so
+the rest of the pipeline (journal, catalog, variant numbering) keeps using
+paths. Layout of a .pack file: records, each
+
+    magic "SCP1" | name length (u16) | data length (u32) | crc32 (u32) | name | data
+
+appended with a single O_APPEND write, so several writers (threads or
+operators) can share a pack. Appends hold an exclusive lockf() lock on the
+pack, which serializes writers on network shares too (NFS/SMB don't make
+O_APPEND atomic across clients); where fcntl is missing (Windows) only local
+sharing is safe. A name already in the pack is never appended again
+(FileExistsError, so the caller moves on to the next variant). <pack>.idx
+lists the records as JSON lines and is flushed periodically; records the
+index misses (a crash before the flush, another writer) are found by
+scanning only the bytes no index entry covers, on open and whenever the
+pack has grown past what this process knows. A torn record is skipped, never
+truncated away, since another writer may already have appended after it.
+
+At most MAX_OPEN packs keep file descriptors open per process (least
+recently used closed first), and a pack left idle for IDLE_CLOSE_SECS
+flushes its index and closes them; entries stay cached either way.
+
+    python -m core.packfile list Artist_W.pack
+    python -m core.packfile verify Artist_W.pack
+    python -m core.packfile extract Artist_W.pack [-o folder]
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+OUTPUT_MODES = ("files", "pack") # settings "output_mode"
+PACK_SUFFIX = ".pack"
+INDEX_SUFFIX = ".idx"
+MAGIC = b"SCP1"
+HEADER = struct.Struct("<4sHII") # magic, name length, data length, crc32(name + data)
+INDEX_FLUSH_RECORDS = 64 # Index lines buffered before they are appended
+INDEX_FLUSH_SECS = 2.0   # ... or this old
+SCAN_CHUNK = 1 << 20
+MAX_OPEN = 16          # Packs kept open per process (least recently used closed first)
+IDLE_CLOSE_SECS = 30.0 # An unused pack closes its file descriptors after this long
+
+def split_path(path):
+    """(pack path, member name) for a virtual path inside a pack, or (None, path)."""
+    parent = os.path.dirname(path)
+    if parent.lower().endswith(PACK_SUFFIX):
+        return parent, os.path.basename(path)
+    return None, path
+
+def index_path(pack_path):
+    return pack_path + INDEX_SUFFIX
+
+class PackFile:
+    """
+    One open pack. `entries` maps member name -> (record offset, name length,
+    data length, crc); a name written twice (by an older version, or without
+    lockf) resolves to the last record. File descriptors are opened on use
+    and released by close(); the object stays usable after it.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._pending_index = [] # Index lines not appended yet
+        self._flushed_at = time.monotonic()
+        self._fd = None
+        self._read_fd = None # pread() handle: no seek, shared by threads
+        self._known = 0 # Bytes known: up to the end of the last record seen
+        self.last_used = time.monotonic()
+        self.recovered = 0 # Records found by scanning on open
+        self.skipped = 0   # Bytes of torn/invalid records skipped
+        self._load()
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+    def _load(self):
+        indexed = []
+        try:
+            with open(index_path(self.path), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                        indexed.append((e["offset"], e["name"], e["size"], e["crc"]))
+                    except (ValueError, KeyError):
+                        continue # Torn last line
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error reading {index_path(self.path)}: {e}")
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+
+        records = {}
+        for offset, name, length, crc in indexed:
+            name_len = len(name.encode("utf-8"))
+            if offset + HEADER.size + name_len + length <= size:
+                records[offset] = (name, name_len, length, crc)
+
+        # Scan what no index entry covers (unflushed or foreign records, torn tails)
+        found = []
+        if size:
+            with open(self.path, "rb") as f:
+                pos = 0
+                for offset in sorted(records):
+                    if offset > pos:
+                        found += self._scan(f, pos, offset)
+                    name, name_len, length, _ = records[offset]
+                    pos = max(pos, offset + HEADER.size + name_len + length)
+                if pos < size:
+                    found += self._scan(f, pos, size)
+        for offset, name, name_len, length, crc in found:
+            records[offset] = (name, name_len, length, crc)
+        for offset in sorted(records):
+            name, name_len, length, crc = records[offset]
+            self.entries[name] = (offset, name_len, length, crc)
+            self._known = max(self._known, offset + HEADER.size + name_len + length)
+        if found:
+            self.recovered = len(found)
+            self._pending_index += [self._index_line(o, n, l, c) for o, n, _, l, c in found]
+
+    def _scan(self, f, start, end):
+        """Valid records in [start, end); invalid bytes are skipped up to the next valid header."""
+        found = []
+        pos = start
+        while pos + HEADER.size <= end:
+            f.seek(pos)
+            magic, name_len, length, crc = HEADER.unpack(f.read(HEADER.size))
+            total = HEADER.size + name_len + length
+            if magic == MAGIC and pos + total <= end:
+                body = f.read(name_len + length)
+                if len(body) == name_len + length and zlib.crc32(body) == crc:
+                    try:
+                        name = body[:name_len].decode("utf-8")
+                    except UnicodeDecodeError:
+                        name = None
+                    if name:
+                        found.append((pos, name, name_len, length, crc))
+                        pos += total
+                        continue
+            nxt = self._find_magic(f, pos + 1, end)
+            self.skipped += nxt - pos
+            pos = nxt
+        return found
+
+    @staticmethod
+    def _find_magic(f, start, end):
+        pos = start
+        while pos < end:
+            f.seek(pos)
+            chunk = f.read(min(SCAN_CHUNK, end - pos) + len(MAGIC) - 1)
+            i = chunk.find(MAGIC)
+            if i >= 0:
+                return min(pos + i, end)
+            pos += SCAN_CHUNK
+        return end
+
+    def _refresh(self, size):
+        """Picks up records appended past the known end by other writers (caller holds the lock)."""
+        if size <= self._known:
+            return
+        skipped = self.skipped
+        # Through our own descriptor: closing another one would drop this process's lockf() lock
+        with open(self._reader(), "rb", closefd=False) as f:
+            found = self._scan(f, self._known, size)
+        start = end = self._known
+        listed = 0
+        for offset, name, name_len, length, crc in found:
+            self.entries[name] = (offset, name_len, length, crc)
+            self._pending_index.append(self._index_line(offset, name, length, crc))
+            end = offset + HEADER.size + name_len + length
+            listed += HEADER.size + name_len + length
+        # Bytes after the last valid record may be a record still being written: looked at again next time
+        self.skipped = skipped + (end - start - listed)
+        self._known = end
+
+    def _reader(self):
+        # Caller holds the lock
+        if self._read_fd is None:
+            self._read_fd = os.open(self.path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        return self._read_fd
+
+    def contains(self, name):
+        with self._lock:
+            self.last_used = time.monotonic()
+            if name in self.entries:
+                return True
+            try:
+                self._refresh(os.path.getsize(self.path))
+            except OSError:
+                return False
+            return name in self.entries
+
+    def read(self, name):
+        """Member bytes (CRC checked), or None if missing or corrupt."""
+        with self._lock:
+            self.last_used = time.monotonic()
+            entry = self.entries.get(name)
+            if entry is None:
+                try:
+                    self._refresh(os.path.getsize(self.path))
+                except OSError:
+                    return None
+                entry = self.entries.get(name)
+            if entry is None:
+                return None
+            offset, name_len, length, crc = entry
+            # Under the lock: an idle close or eviction may close the descriptor
+            if hasattr(os, "pread"):
+                body = os.pread(self._reader(), name_len + length, offset + HEADER.size)
+            else:
+                with open(self._reader(), "rb", closefd=False) as f:
+                    f.seek(offset + HEADER.size)
+                    body = f.read(name_len + length)
+        if zlib.crc32(body) != crc:
+            return None
+        return body[name_len:]
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+    def append(self, name, data):
+        """Appends one record; FileExistsError if the pack already has `name`."""
+        raw_name = name.encode("utf-8")
+        body = raw_name + data
+        crc = zlib.crc32(body)
+        record = HEADER.pack(MAGIC, len(raw_name), len(data), crc) + body
+        with self._lock:
+            self.last_used = time.monotonic()
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+            if fcntl:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX) # Other processes/hosts; threads hold self._lock
+            try:
+                self._refresh(os.fstat(self._fd).st_size)
+                if name in self.entries:
+                    raise FileExistsError(f"{name} in {os.path.basename(self.path)}")
+                written = 0
+                view = memoryview(record)
+                while written < len(record):
+                    written += os.write(self._fd, view[written:])
+                # O_APPEND: our fd's position is the end of our own record, whatever others appended
+                offset = os.lseek(self._fd, 0, os.SEEK_CUR) - len(record)
+            finally:
+                if fcntl:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN)
+            if offset > self._known:
+                self._refresh(offset) # Appended by another writer in between (no lockf)
+            self._known = max(self._known, offset + len(record))
+            self.entries[name] = (offset, len(raw_name), len(data), crc)
+            self._pending_index.append(self._index_line(offset, name, len(data), crc))
+            if (len(self._pending_index) >= INDEX_FLUSH_RECORDS
+                    or time.monotonic() - self._flushed_at > INDEX_FLUSH_SECS):
+                self._flush_index()
+
+    @staticmethod
+    def _index_line(offset, name, length, crc):
+        return json.dumps({"name": name, "offset": offset, "size": length, "crc": crc}) + "\n"
+
+    def _flush_index(self):
+        self._flushed_at = time.monotonic()
+        if not self._pending_index:
+            return
+        lines = "".join(self._pending_index).encode("utf-8")
+        self._pending_index = []
+        try:
+            fd = os.open(index_path(self.path), os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+            try:
+                os.write(fd, lines)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"Error writing {index_path(self.path)}: {e}") # Rebuilt by scanning on next open
+
+    def flush_index(self):
+        with self._lock:
+            self._flush_index()
+
+    def close(self):
+        """Flushes the index and closes the file descriptors (reopened if used again)."""
+        with self._lock:
+            self._flush_index()
+            for fd in (self._fd, self._read_fd):
+                if fd is not None:
+                    os.close(fd)
+            self._fd = self._read_fd = None
+
+    def close_if_idle(self, idle_secs):
+        with self._lock:
+            if self._fd is None and self._read_fd is None and not self._pending_index:
+                return
+            if time.monotonic() - self.last_used < idle_secs:
+                return
+        self.close()
+
+_packs = {} # Absolute path -> PackFile known to this process (entries stay cached)
+_open = OrderedDict() # Packs that may hold descriptors, least recently used first
+_packs_lock = threading.Lock()
+_reaper = None
+
+def _get(pack_path):
+    global _reaper
+    key = os.path.abspath(pack_path)
+    evicted = []
+    with _packs_lock:
+        pack = _packs.get(key)
+        if pack is None:
+            pack = _packs[key] = PackFile(key)
+        _open[key] = pack
+        _open.move_to_end(key)
+        while len(_open) > MAX_OPEN:
+            evicted.append(_open.popitem(last=False)[1])
+        if _reaper is None:
+            _reaper = threading.Thread(target=_close_idle, name="packfile-idle", daemon=True)
+            _reaper.start()
+    for old in evicted:
+        old.close() # Outside the module lock: waits for an append in progress
+    return pack
+
+def _close_idle():
+    """Background: closes the descriptors of packs unused for IDLE_CLOSE_SECS."""
+    global _reaper
+    while True:
+        time.sleep(IDLE_CLOSE_SECS / 2)
+        with _packs_lock:
+            if not _packs:
+                _reaper = None
+                return
+            packs = list(_packs.values()) # Also evicted ones a straggling thread reopened
+        for pack in packs:
+            pack.close_if_idle(IDLE_CLOSE_SECS)
+
+def write(path, data):
+    """Appends `data` as the member named by a virtual pack path."""
+    pack_path, name = split_path(path)
+    os.makedirs(os.path.dirname(pack_path) or ".", exist_ok=True)
+    _get(pack_path).append(name, data)
+
+def contains(path):
+    pack_path, name = split_path(path)
+    if pack_path is None or not os.path.exists(pack_path):
+        return False
+    return _get(pack_path).contains(name)
+
+def read(path):
+    pack_path, name = split_path(path)
+    if pack_path is None or not os.path.exists(pack_path):
+        return None
+    return _get(pack_path).read(name)
+
+def close_all():
+    """Flushes the indexes of every pack open in this process."""
+    with _packs_lock:
+        packs = list(_packs.values())
+        _packs.clear()
+        _open.clear()
+    for pack in packs:
+        pack.close()
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="List, verify or extract SerialCropper packfiles.")
+    parser.add_argument("command", choices=("list", "verify", "extract"))
+    parser.add_argument("packs", nargs="+")
+    parser.add_argument("-o", "--output", help="extract into this folder (default: <pack name> next to the pack)")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for pack_path in args.packs:
+        pack = PackFile(pack_path)
+        if pack.recovered or pack.skipped:
+            print(f"{pack_path}: {pack.recovered} records not in the index, {pack.skipped} bytes skipped")
+        if args.command == "list":
+            for name, (offset, _, length, _) in sorted(pack.entries.items()):
+                print(f"{length:10d}  {offset:12d}  {name}")
+        elif args.command == "verify":
+            bad = [name for name in pack.entries if pack.read(name) is None]
+            failed += len(bad)
+            for name in bad:
+                print(f"{pack_path}: CRC mismatch in {name}")
+            print(f"{pack_path}: {len(pack.entries) - len(bad)}/{len(pack.entries)} OK")
+        else:
+            out_dir = args.output or os.path.splitext(pack_path)[0]
+            os.makedirs(out_dir, exist_ok=True)
+            for name in sorted(pack.entries):
+                data = pack.read(name)
+                if data is None:
+                    print(f"{pack_path}: CRC mismatch in {name}, not extracted")
+                    failed += 1
+                    continue
+                with open(os.path.join(out_dir, os.path.basename(name)), "wb") as f:
+                    f.write(data)
+            print(f"{pack_path}: {len(pack.entries)} files -> {out_dir}")
+        pack.close()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
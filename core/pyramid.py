@@ -0,0 +1,53 @@
+import math
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import Qt
+
+class ImagePyramid:
+    """
+    Mipmap-style stack of progressively halved images.
+
+    Level 0 is the full-resolution source image (shared, not copied). Level N
+    is half the size of level N-1. Levels are built lazily on first use and
+    cached until the source image changes.
+
+    Level 0 may also be a reduced preview of a larger page: `full_width` is
+    then the page's real width, and factors map to full-resolution pixels.
+    """
+    MIN_SIDE = 64 # Stop halving below this size
+
+    def __init__(self, image: QImage = None):
+        self.levels = []
+        self.full_width = 0
+        self.set_image(image)
+
+    def set_image(self, image: QImage, full_width: int = None):
+        self.levels = [image] if image is not None and not image.isNull() else []
+        self.full_width = full_width or (image.width() if self.levels else 0)
+
+    def level_for_scale(self, scale: float) -> int:
+        # Pick the smallest level that is still >= the on-screen size, so
+        # the smooth pass only ever downsamples by less than 2x.
+        if not self.levels:
+            return 0
+        scale *= self.full_width / self.levels[0].width() # Screen pixels per level-0 pixel
+        if scale >= 0.5:
+            return 0
+        return int(math.floor(math.log2(1.0 / scale)))
+
+    def get_level(self, level: int):
+        """Returns (image, factor) where factor maps level pixels to source pixels."""
+        if not self.levels:
+            return None, 1.0
+
+        while len(self.levels) <= level:
+            prev = self.levels[-1]
+            if min(prev.width(), prev.height()) // 2 < self.MIN_SIDE:
+                break
+            self.levels.append(prev.scaled(
+                prev.width() // 2, prev.height() // 2,
+                Qt.IgnoreAspectRatio, Qt.SmoothTransformation
+            ))
+
+        level = min(level, len(self.levels) - 1)
+        image = self.levels[level]
+        return image, self.full_width / image.width()
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import Qt
+
+from core.cropper import Cropper
+
+# Only the crop itself, in the output folder (the behaviour without a spec)
+DEFAULT_SPEC = [{"name": "full", "max_side": None, "folder": ""}]
+
+def parse_spec(spec):
+    """
+    Normalizes a rendition spec, e.g. from settings.json:
+        [{"name": "full"}, {"name": "web", "max_side": 2048}, {"name": "thumb", "max_side": 256}]
+    max_side: longest side in px (None/0 = crop size). folder: subfolder of each
+    output folder ("" = the folder itself; default: "" for full size, else the name).
+    Sorted largest first, the order renditions are derived in. Raises ValueError.
+    """
+    if not spec:
+        return list(DEFAULT_SPEC)
+    out = []
+    for entry in spec:
+        name = str(entry.get("name", "")).strip()
+        if not name:
+            raise ValueError("rendition without a name")
+        max_side = entry.get("max_side") or None
+        if max_side is not None and (not isinstance(max_side, int) or max_side <= 0):
+            raise ValueError(f"rendition '{name}': max_side must be a positive integer")
+        folder = entry.get("folder", "" if max_side is None else name)
+        out.append({"name": name, "max_side": max_side, "folder": folder})
+    if len({r["name"] for r in out}) != len(out):
+        raise ValueError("duplicate rendition names")
+    if len({r["folder"] for r in out}) != len(out):
+        raise ValueError("two renditions write to the same folder")
+    return sorted(out, key=lambda r: -(r["max_side"] or float("inf")))
+
+def _fit(image, max_side):
+    if max_side is None or max(image.width(), image.height()) <= max_side:
+        return image # Never upscaled
+    return image.scaled(max_side, max_side, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+def encode_renditions(image, spec, text=None):
+    """
+    Encodes every rendition of an in-memory crop. Each size is scaled from the
+    previous (larger) one instead of from the full crop, and each PNG encode
+    starts on a worker thread as soon as its image is ready.
+    Returns [(rendition, QImage, png bytes)] in spec order, or None if any
+    encode failed.
+    """
+    with ThreadPoolExecutor(max_workers=len(spec)) as pool:
+        jobs = []
+        current = image
+        for rendition in spec:
+            scaled = _fit(current, rendition["max_side"])
+            if jobs and scaled is current:
+                future = jobs[-1][2] # Crop already within this size: same bytes
+            else:
+                future = pool.submit(Cropper.encode_png, scaled, text)
+            jobs.append((rendition, scaled, future))
+            current = scaled
+        results = [(rendition, scaled, future.result()) for rendition, scaled, future in jobs]
+    if any(data is None for _, _, data in results):
+        return None
+    return results
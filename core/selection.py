@@ -1,341 +1,189 @@
+from collections import deque
+
 from PyQt5.QtCore import QPointF, QRectF
-from enum import Enum, auto
-
-class HitTest(Enum):
-    NONE = auto()
-    INSIDE = auto()
-    TOP_LEFT = auto()
-    TOP = auto()
-    TOP_RIGHT = auto()
-    LEFT = auto()
-    RIGHT = auto()
-    BOTTOM_LEFT = auto()
-    BOTTOM = auto()
-    BOTTOM_RIGHT = auto()
-    ROTATE = auto()
+
+from core.geometry import HitTest, SelectionGeometry
+
+HISTORY_SIZE = 20 # Selections kept for Restore (P)
+
+# -----------------------------
+# Qt adapters
+# -----------------------------
+def geometry_to_qrectf(geometry: SelectionGeometry) -> QRectF:
+    """Unrotated rect of the geometry as a QRectF."""
+    left, top, right, bottom = geometry.bounds()
+    return QRectF(left, top, right - left, bottom - top)
+
+def geometry_from_qrectf(rect: QRectF, angle: float = 0.0, mode: str = "rect") -> SelectionGeometry:
+    r = rect.normalized()
+    center = r.center()
+    return SelectionGeometry(center.x(), center.y(), r.width(), r.height(), angle, mode)
 
 class Selection:
+    """
+    Interactive selection state (create / move / resize / rotate).
+
+    The shape itself is a Qt-free SelectionGeometry; this class only adds the
+    drag state and QPointF/QRectF adapters used by the canvas.
+    """
     def __init__(self):
         self.is_dragging = False
-        self.start_img = None
-        self.end_img = None
+        self.geometry = None # SelectionGeometry or None
         self.mode = "rect"  # rect, ellipse
-        
+
+        # Creation anchor (x, y) while dragging out a new selection
+        self._anchor = None
+
         # For modification
         self.active_handle = HitTest.NONE
-        self.drag_start_pos = None
-        self.initial_rect = None
-        self.initial_rect = None
-        self.angle = 0.0
-        
-        self.previous_state = None
+        self.drag_start_pos = None # (x, y)
+        self.initial_geometry = None
+
+        # Cleared selections, newest last (SelectionGeometry copies)
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self._restored = None # Ring position of the last restore (0 = newest)
+
+    # -----------------------------
+    # Qt-facing properties
+    # -----------------------------
+    @property
+    def start_img(self):
+        if self.geometry is None:
+            return None
+        left, top, _, _ = self.geometry.bounds()
+        return QPointF(left, top)
+
+    @property
+    def end_img(self):
+        if self.geometry is None:
+            return None
+        _, _, right, bottom = self.geometry.bounds()
+        return QPointF(right, bottom)
+
+    @property
+    def angle(self):
+        return self.geometry.angle if self.geometry is not None else 0.0
+
+    @angle.setter
+    def angle(self, value):
+        if self.geometry is not None:
+            self.geometry.angle = value
 
     def set_mode(self, mode: str):
         if mode in ("rect", "ellipse"):
             self.mode = mode
+            if self.geometry is not None:
+                self.geometry.mode = mode
 
     def start(self, pos_img: QPointF):
         self.clear() # Save previous state if any
         self.is_dragging = True
-        self.start_img = pos_img
-        self.end_img = pos_img
-        self.angle = 0.0 # Reset angle on new selection
+        x, y = pos_img.x(), pos_img.y()
+        self._anchor = (x, y)
+        self.geometry = SelectionGeometry(x, y, 0.0, 0.0, 0.0, self.mode) # Reset angle on new selection
 
     def update(self, pos_img: QPointF, is_perfect: bool = False):
-        if is_perfect and self.start_img:
-            dx = pos_img.x() - self.start_img.x()
-            dy = pos_img.y() - self.start_img.y()
+        if not self._anchor or self.geometry is None:
+            return
+        ax, ay = self._anchor
+        x, y = pos_img.x(), pos_img.y()
+        if is_perfect:
+            dx = x - ax
+            dy = y - ay
             side = max(abs(dx), abs(dy))
-            dx_sign = 1 if dx >= 0 else -1
-            dy_sign = 1 if dy >= 0 else -1
-            self.end_img = QPointF(
-                self.start_img.x() + dx_sign * side,
-                self.start_img.y() + dy_sign * side
-            )
-        else:
-            self.end_img = pos_img
+            x = ax + (side if dx >= 0 else -side)
+            y = ay + (side if dy >= 0 else -side)
+        self.geometry.set_corners(ax, ay, x, y)
 
     def finish(self):
         self.is_dragging = False
         self.active_handle = HitTest.NONE
+        self._anchor = None
 
     def get_rect(self) -> QRectF:
-        if self.start_img and self.end_img:
-            return QRectF(self.start_img, self.end_img).normalized()
+        if self.geometry is not None:
+            return geometry_to_qrectf(self.geometry)
         return QRectF()
-    
+
+    @property
+    def previous_state(self):
+        return self.history[-1] if self.history else None
+
     def clear(self):
         if self.has_selection():
-            self.previous_state = {
-                "start_img": self.start_img,
-                "end_img": self.end_img,
-                "angle": self.angle,
-                "mode": self.mode
-            }
-            
+            if not self.history or self.history[-1] != self.geometry:
+                self.history.append(self.geometry.copy())
+            self._restored = None
+
         self.is_dragging = False
-        self.start_img = None
-        self.end_img = None
-        self.angle = 0.0
+        self.geometry = None
+        self._anchor = None
         self.active_handle = HitTest.NONE
-        
+
     def restore_previous(self):
-        if not self.previous_state:
+        """
+        Restores the newest cleared selection. Repeating it right away steps
+        further back through the history ring (wrapping).
+        """
+        if not self.history:
             return False
-            
-        state = self.previous_state
-        self.start_img = state["start_img"]
-        self.end_img = state["end_img"]
-        self.angle = state["angle"]
-        self.mode = state["mode"]
-        self.is_dragging = False
+
+        index = 0
+        if self._restored is not None and self.geometry == self.history[-1 - self._restored]:
+            index = (self._restored + 1) % len(self.history)
+        self._restored = index
+        self.set_geometry(self.history[-1 - index])
         return True
-    
+
+    def history_position(self):
+        """1 for the newest history entry, 2 for the one before, ... (0 if none restored)."""
+        return 0 if self._restored is None else self._restored + 1
+
+    def set_geometry(self, geometry: SelectionGeometry):
+        """Replaces the selection (e.g. restored or from a template); a copy is kept."""
+        self.geometry = geometry.copy()
+        self.mode = self.geometry.mode
+        self.is_dragging = False
+        self._anchor = None
+        self.active_handle = HitTest.NONE
+
     def has_selection(self):
-        # Debug
-        # print(f"DEBUG: has_selection: start={self.start_img}, end={self.end_img}")
-        return self.start_img is not None and self.end_img is not None
+        return self.geometry is not None
 
     # -----------------------------
     # Advanced Interaction
     # -----------------------------
     def hit_test(self, pos_img: QPointF, scale: float, handle_radius_screen: float = 8.0) -> HitTest:
-        if not self.has_selection():
+        if self.geometry is None:
             return HitTest.NONE
-            
-        r = self.get_rect()
-        tol = handle_radius_screen / scale
-        
-        # Transform point to local selection coordinates for hit testing
-        # Center of selection
-        center = r.center()
-        
-        # Rotate point around center by -angle to align with unrotated rect
-        import math
-        rad = math.radians(-self.angle)
-        dx = pos_img.x() - center.x()
-        dy = pos_img.y() - center.y()
-        
-        local_x = center.x() + dx * math.cos(rad) - dy * math.sin(rad)
-        local_y = center.y() + dx * math.sin(rad) + dy * math.cos(rad)
-        local_pos = QPointF(local_x, local_y)
-
-        # Helper for point distance
-        def near(p1, p2):
-            return (p1.x() - p2.x())**2 + (p1.y() - p2.y())**2 <= tol**2
-
-        # Rotation Handle (Top Center + Offset)
-        # In local coords, it's above the top edge
-        rotate_handle_pos = QPointF(center.x(), r.top() - (20 / scale))
-        if near(local_pos, rotate_handle_pos): return HitTest.ROTATE
-
-        # Corners
-        if near(local_pos, r.topLeft()): return HitTest.TOP_LEFT
-        if near(local_pos, r.topRight()): return HitTest.TOP_RIGHT
-        if near(local_pos, r.bottomLeft()): return HitTest.BOTTOM_LEFT
-        if near(local_pos, r.bottomRight()): return HitTest.BOTTOM_RIGHT
-        
-        # Edges
-        if abs(local_pos.y() - r.top()) <= tol and r.left() <= local_pos.x() <= r.right(): return HitTest.TOP
-        if abs(local_pos.y() - r.bottom()) <= tol and r.left() <= local_pos.x() <= r.right(): return HitTest.BOTTOM
-        if abs(local_pos.x() - r.left()) <= tol and r.top() <= local_pos.y() <= r.bottom(): return HitTest.LEFT
-        if abs(local_pos.x() - r.right()) <= tol and r.top() <= local_pos.y() <= r.bottom(): return HitTest.RIGHT
-        
-        # Inside
-        if r.contains(local_pos):
-            return HitTest.INSIDE
-            
-        return HitTest.NONE
+        # Rotation knob sits 20 screen px above the top edge
+        return self.geometry.hit_test(pos_img.x(), pos_img.y(), handle_radius_screen / scale, 20 / scale)
 
     def start_modification(self, pos_img: QPointF, handle: HitTest):
         self.active_handle = handle
-        self.drag_start_pos = pos_img
-        self.initial_rect = self.get_rect()
-        self.initial_angle = self.angle
+        self.drag_start_pos = (pos_img.x(), pos_img.y())
+        self.initial_geometry = self.geometry.copy() if self.geometry is not None else None
 
     def update_modification(self, pos_img: QPointF, is_perfect: bool = False):
-        if self.active_handle == HitTest.NONE or not self.initial_rect:
+        if self.active_handle == HitTest.NONE or self.initial_geometry is None:
             return
 
+        init = self.initial_geometry
+        x, y = pos_img.x(), pos_img.y()
+
         if self.active_handle == HitTest.ROTATE:
-            # Calculate angle from center to mouse
-            center = self.initial_rect.center()
-            import math
-            dx = pos_img.x() - center.x()
-            dy = pos_img.y() - center.y()
-            
-            # Angle in degrees. 0 is Right, -90 is Up.
-            # We want the handle (at local top) to track mouse.
-            current_angle = math.degrees(math.atan2(dy, dx))
-            self.angle = current_angle + 90
+            # Rotate around the initial center so the knob tracks the mouse
+            self.geometry.cx = init.cx
+            self.geometry.cy = init.cy
+            self.geometry.rotate_towards(x, y)
             return
 
         if self.active_handle == HitTest.INSIDE:
             # Move: Translate everything
-            delta = pos_img - self.drag_start_pos
-            r = QRectF(self.initial_rect)
-            r.translate(delta)
-            self.start_img = r.topLeft()
-            self.end_img = r.bottomRight()
+            sx, sy = self.drag_start_pos
+            self.geometry.cx = init.cx + (x - sx)
+            self.geometry.cy = init.cy + (y - sy)
             return
 
-        # Resizing with Rotation
-        # We need to anchor the opposite side/corner
-        
-        import math
-        rad = math.radians(self.angle)
-        cos_a = math.cos(rad)
-        sin_a = math.sin(rad)
-        
-        # Unit vectors for the rotated axes
-        u = QPointF(cos_a, sin_a)   # Local X
-        v = QPointF(-sin_a, cos_a)  # Local Y
-        
-        r_init = self.initial_rect
-        center_init = r_init.center()
-        
-        # Helper to get global pos of a local point (relative to initial center)
-        def to_global(local_p):
-            # Rotate local_p by angle then add to center_init
-            lx = local_p.x()
-            ly = local_p.y()
-            gx = center_init.x() + lx * cos_a - ly * sin_a
-            gy = center_init.y() + lx * sin_a + ly * cos_a
-            return QPointF(gx, gy)
-
-        # Determine Anchor Point (Global) and the "Moving Point" (Global) logic
-        # We define the rect by (min_x, min_y) to (max_x, max_y) in local space relative to center
-        w = r_init.width()
-        h = r_init.height()
-        half_w = w / 2
-        half_h = h / 2
-        
-        # Local coords of corners relative to center
-        # TL: (-hw, -hh), TR: (hw, -hh), BL: (-hw, hh), BR: (hw, hh)
-        
-        anchor_local = QPointF(0, 0)
-        moving_handle_local = QPointF(0, 0)
-        
-        # Constraints: 0 = free, 1 = fixed
-        constrain_x = False
-        constrain_y = False
-        
-        if self.active_handle == HitTest.TOP_LEFT:
-            anchor_local = QPointF(half_w, half_h)      # BR is anchor
-        elif self.active_handle == HitTest.TOP_RIGHT:
-            anchor_local = QPointF(-half_w, half_h)     # BL is anchor
-        elif self.active_handle == HitTest.BOTTOM_LEFT:
-            anchor_local = QPointF(half_w, -half_h)     # TR is anchor
-        elif self.active_handle == HitTest.BOTTOM_RIGHT:
-            anchor_local = QPointF(-half_w, -half_h)    # TL is anchor
-        elif self.active_handle == HitTest.TOP:
-            anchor_local = QPointF(0, half_h)           # Bottom Center is anchor (approx)
-            # Actually for edge, we just fix the opposite edge coordinate
-            constrain_x = True # Width doesn't change
-        elif self.active_handle == HitTest.BOTTOM:
-            anchor_local = QPointF(0, -half_h)          # Top Center
-            constrain_x = True
-        elif self.active_handle == HitTest.LEFT:
-            anchor_local = QPointF(half_w, 0)           # Right Center
-            constrain_y = True # Height doesn't change
-        elif self.active_handle == HitTest.RIGHT:
-            anchor_local = QPointF(-half_w, 0)          # Left Center
-            constrain_y = True
-
-        anchor_global = to_global(anchor_local)
-        
-        # Calculate vector from Anchor to Mouse
-        vec = pos_img - anchor_global
-        
-        # Project vec onto u and v to get new width/height components
-        # Dot product
-        proj_x = vec.x() * u.x() + vec.y() * u.y()
-        proj_y = vec.x() * v.x() + vec.y() * v.y()
-        
-        # Calculate new dimensions
-        # Note: The direction depends on which handle.
-        # e.g. if resizing Right (handle at +x), vector from Left (anchor) to Mouse should be positive X.
-        
-        new_w = w
-        new_h = h
-        
-        # Adjust projections based on handle direction to ensure positive width/height
-        # If handle is LEFT, anchor is RIGHT. Vector points Left (negative local X).
-        # So width is abs(proj_x).
-        
-        # Simplification: We calculate the new local bounds relative to the anchor.
-        # But simpler: Just use the absolute projection as the new size?
-        # We need to be careful about flipping.
-        
-        if constrain_x:
-            # Width unchanged
-            dx_local = 0
-        else:
-            # Check handle 'polarity'
-            if self.active_handle in (HitTest.LEFT, HitTest.TOP_LEFT, HitTest.BOTTOM_LEFT):
-                # Mouse is 'left' of anchor. proj_x should be negative.
-                # If proj_x is positive, we flipped.
-                pass
-            dx_local = proj_x
-
-        if constrain_y:
-            dy_local = 0
-        else:
-            dy_local = proj_y
-            
-        # Handle specific edge cases to get Size
-        if self.active_handle == HitTest.RIGHT:
-            new_w = dx_local # Anchor is Left. Mouse is Right. dx > 0.
-        elif self.active_handle == HitTest.LEFT:
-            new_w = -dx_local # Anchor is Right. Mouse is Left. dx < 0.
-        elif self.active_handle == HitTest.BOTTOM:
-            new_h = dy_local
-        elif self.active_handle == HitTest.TOP:
-            new_h = -dy_local
-        elif self.active_handle == HitTest.BOTTOM_RIGHT:
-            new_w = dx_local
-            new_h = dy_local
-        elif self.active_handle == HitTest.TOP_LEFT:
-            new_w = -dx_local
-            new_h = -dy_local
-        elif self.active_handle == HitTest.TOP_RIGHT:
-            new_w = dx_local
-            new_h = -dy_local
-        elif self.active_handle == HitTest.BOTTOM_LEFT:
-            new_w = -dx_local
-            new_h = dy_local
-
-        # Minimum size constraint
-        new_w = max(1.0, new_w)
-        new_h = max(1.0, new_h)
-        
-        # Calculate New Center
-        # The new center is: Anchor + (NewSize / 2) * DirectionFromAnchor
-        # DirectionFromAnchor depends on handle.
-        
-        dir_x = 0
-        dir_y = 0
-        
-        if self.active_handle in (HitTest.RIGHT, HitTest.TOP_RIGHT, HitTest.BOTTOM_RIGHT): dir_x = 1
-        if self.active_handle in (HitTest.LEFT, HitTest.TOP_LEFT, HitTest.BOTTOM_LEFT): dir_x = -1
-        
-        if self.active_handle in (HitTest.BOTTOM, HitTest.BOTTOM_LEFT, HitTest.BOTTOM_RIGHT): dir_y = 1
-        if self.active_handle in (HitTest.TOP, HitTest.TOP_LEFT, HitTest.TOP_RIGHT): dir_y = -1
-        
-        # Offset from Anchor to New Center in Local Space
-        offset_local_x = (new_w / 2) * dir_x
-        offset_local_y = (new_h / 2) * dir_y
-        
-        # Rotate this offset to global
-        offset_global_x = offset_local_x * cos_a - offset_local_y * sin_a
-        offset_global_y = offset_local_x * sin_a + offset_local_y * cos_a
-        
-        new_center = QPointF(
-            anchor_global.x() + offset_global_x,
-            anchor_global.y() + offset_global_y
-        )
-        
-        # Update start_img / end_img to match new_center and new_w/h
-        # We construct an unrotated rect centered at new_center
-        self.start_img = QPointF(new_center.x() - new_w/2, new_center.y() - new_h/2)
-        self.end_img = QPointF(new_center.x() + new_w/2, new_center.y() + new_h/2)
+        # Resizing with Rotation: anchor the opposite side/corner
+        self.geometry.resize_from(init, self.active_handle, x, y)
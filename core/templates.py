@@ -0,0 +1,61 @@
+import json
+import os
+
+from core.geometry import SelectionGeometry
+
+TEMPLATES_FILE = "selection_templates.json"
+SLOTS = [str(i) for i in range(1, 10)] # Ctrl+1..9 apply, Ctrl+Shift+1..9 pin
+
+def template_from_geometry(geometry: SelectionGeometry, width, height):
+    """
+    Selection relative to the page, so a template pinned on one scan lands in
+    the same place on pages of another resolution. The centre is a fraction
+    of each axis; the size is a fraction of the page width only, so squares,
+    circles and rotated boxes keep their shape when the aspect ratio differs.
+    """
+    return {
+        "cx": geometry.cx / width,
+        "cy": geometry.cy / height,
+        "w": geometry.w / width,
+        "h": geometry.h / width,
+        "size_scale": "width",
+        "angle": geometry.angle,
+        "mode": geometry.mode,
+    }
+
+def geometry_from_template(template, width, height) -> SelectionGeometry:
+    # Templates pinned before "size_scale" existed stored h as a fraction of the height
+    h_scale = width if template.get("size_scale") == "width" else height
+    return SelectionGeometry(template["cx"] * width, template["cy"] * height,
+                             template["w"] * width, template["h"] * h_scale,
+                             template.get("angle", 0.0), template.get("mode", "rect"))
+
+class TemplateStore:
+    """Pinned selection templates by slot ("1".."9"), kept in a JSON file."""
+    def __init__(self, path=TEMPLATES_FILE):
+        self.path = path
+        self.templates = {}
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    self.templates = {k: v for k, v in json.load(f).items() if k in SLOTS}
+            except Exception as e:
+                print(f"Error loading selection templates: {e}")
+                self.templates = {}
+
+    def save(self):
+        try:
+            with open(self.path, "w") as f:
+                json.dump(self.templates, f, indent=4)
+        except Exception as e:
+            print(f"Error saving selection templates: {e}")
+
+    def get(self, slot):
+        return self.templates.get(slot)
+
+    def pin(self, slot, geometry: SelectionGeometry, width, height):
+        self.templates[slot] = template_from_geometry(geometry, width, height)
+        self.save()
@@ -0,0 +1,88 @@
+import json
+import time
+
+from PyQt5.QtCore import QObject, QEvent
+
+TRACE_ENV = "SERIALCROPPER_TRACE" # Path of the trace file; recording is off when unset
+TRACE_VERSION = 1
+FLUSH_EVERY = 200 # Records buffered between writes
+
+_MOUSE_TYPES = {
+    QEvent.MouseButtonPress: "press",
+    QEvent.MouseButtonRelease: "release",
+    QEvent.MouseMove: "move",
+}
+_KEY_TYPES = {
+    QEvent.KeyPress: "key_press",
+    QEvent.KeyRelease: "key_release",
+}
+
+class TraceRecorder(QObject):
+    """
+    Records the canvas input an operator produces (mouse, wheel, keys,
+    resizes, page loads) as JSON lines with timestamps, for
+    benchmarks/replay_trace.py to feed back into an offscreen CanvasWidget.
+
+    Only events delivered to the canvas are recorded; window shortcuts
+    (Save, Restore, templates...) are not, so a replay covers the drawing,
+    zooming and panning work, not the save path.
+    """
+    def __init__(self, path, canvas, parent=None):
+        super().__init__(parent)
+        self.canvas = canvas
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+        self._buffer = []
+        self._start = time.perf_counter()
+        self._write({"type": "header", "version": TRACE_VERSION, "started": time.time(),
+                     "canvas": [canvas.width(), canvas.height()],
+                     "frame_ms": canvas.frame_timer.interval()})
+        canvas.installEventFilter(self)
+
+    def _write(self, record):
+        self._buffer.append(json.dumps(record, separators=(",", ":")))
+        if len(self._buffer) >= FLUSH_EVERY:
+            self.flush()
+
+    def _now(self):
+        return round(time.perf_counter() - self._start, 6)
+
+    def eventFilter(self, obj, event):
+        etype = event.type()
+        kind = _MOUSE_TYPES.get(etype)
+        if kind:
+            pos = event.localPos()
+            self._write({"t": self._now(), "type": kind, "x": round(pos.x(), 2), "y": round(pos.y(), 2),
+                         "button": int(event.button()), "buttons": int(event.buttons()),
+                         "mods": int(event.modifiers())})
+        elif etype == QEvent.Wheel:
+            pos = event.posF()
+            delta = event.angleDelta()
+            self._write({"t": self._now(), "type": "wheel", "x": round(pos.x(), 2), "y": round(pos.y(), 2),
+                         "dx": delta.x(), "dy": delta.y(), "buttons": int(event.buttons()),
+                         "mods": int(event.modifiers())})
+        elif etype in _KEY_TYPES:
+            self._write({"t": self._now(), "type": _KEY_TYPES[etype], "key": event.key(),
+                         "mods": int(event.modifiers()), "auto": event.isAutoRepeat()})
+        elif etype == QEvent.Resize:
+            size = event.size()
+            self._write({"t": self._now(), "type": "resize", "w": size.width(), "h": size.height()})
+        return False # Observe only
+
+    def record_page(self):
+        """A page was loaded: its size and the initial view, so the replay starts from the same state."""
+        size = self.canvas.image_size
+        vp = self.canvas.viewport
+        self._write({"t": self._now(), "type": "page", "w": size.width(), "h": size.height(),
+                     "scale": vp.scale, "ox": vp.offset.x(), "oy": vp.offset.y()})
+
+    def flush(self):
+        if self._buffer and not self._file.closed:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._file.flush()
+        self._buffer.clear()
+
+    def close(self):
+        self.canvas.removeEventFilter(self)
+        self.flush()
+        self._file.close()
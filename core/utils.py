@@ -1,26 +1,69 @@
 import os
+import zipfile
+
+from core.archives import is_archive, pending_members, strip_archive_ext
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
 
 def clean_filename(s: str) -> str:
     s = s.replace(" ", "_")
     return "".join(c for c in s if c.isalnum() or c in "_-")
 
-def get_files_in_folder(folder: str, extensions=(".png", ".jpg", ".jpeg", ".bmp", ".webp")):
+def get_files_in_folder(folder: str, extensions=IMAGE_EXTENSIONS, archives=True, listing=None):
+    """
+    Sorted image paths relative to `folder` (archive pages as <archive>/<member>).
+    If a dict is passed as `listing`, it is filled with normalized dir ->
+    (image and archive names, subdir names, archives not readable yet), so
+    FolderWatcher can start from it instead of walking the tree again.
+    """
     if not folder or not os.path.exists(folder):
         return []
     
     files = []
-    for root, _, filenames in os.walk(folder):
+    for root, dirnames, filenames in os.walk(folder):
+        # Get paths relative to the input folder
+        rel_dir = os.path.relpath(root, folder)
+        prefix = "" if rel_dir == "." else rel_dir + os.sep
+        names, unreadable = set(), set()
         for filename in filenames:
             if filename.lower().endswith(extensions):
-                # Get path relative to the input folder
-                rel_dir = os.path.relpath(root, folder)
-                if rel_dir == ".":
-                    files.append(filename)
+                names.add(filename)
+                files.append(prefix + filename)
+            elif archives and is_archive(filename):
+                if zipfile.is_zipfile(os.path.join(root, filename)):
+                    names.add(filename)
+                    files.extend(archive_pages(folder, prefix + filename, extensions))
                 else:
-                    files.append(os.path.join(rel_dir, filename))
+                    # No central directory yet: still being copied in (or not a zip at all)
+                    print(f"Archive {prefix + filename} is not readable yet")
+                    unreadable.add(filename)
+        if listing is not None:
+            listing[os.path.normpath(root)] = (names, set(dirnames), unreadable)
     
     return sorted(files)
 
+def source_metadata(rel_path: str):
+    """
+    (artist, work, page) of a page from its path relative to _para_procesar:
+    Artist/Work/Page.ext (or Artist/Work.cbz/Page.ext), "ND" where missing.
+    """
+    parts = rel_path.split(os.sep)
+    page = os.path.splitext(parts[-1])[0]
+    if len(parts) >= 3:
+        return strip_archive_ext(parts[0]), strip_archive_ext(parts[1]), page
+    if len(parts) == 2:
+        return strip_archive_ext(parts[0]), "ND", page
+    return "ND", "ND", page
+
+def archive_pages(folder: str, rel_archive: str, extensions=IMAGE_EXTENSIONS):
+    """Virtual relative paths (<archive>/<member>) of the pages still pending in an archive."""
+    try:
+        members = pending_members(os.path.join(folder, rel_archive), extensions)
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"Error reading archive {rel_archive}: {e}")
+        return []
+    return [os.path.join(rel_archive, *m.split("/")) for m in members]
+
 def get_next_file(current_file: str, folder: str) -> str:
     files = get_files_in_folder(folder)
     if not files:
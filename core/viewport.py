@@ -1,4 +1,22 @@
+import math
 from PyQt5.QtCore import QPointF
+from PyQt5.QtGui import QTransform
+
+from core.startup import numpy as _np # Off the cold-start path, no per-frame import
+
+def map_points(matrix, points):
+    """Applies a 3x3 affine matrix to an (N, 2) array of points in one op."""
+    np = _np()
+    pts = np.asarray(points, dtype=float)
+    return pts @ matrix[:2, :2].T + matrix[:2, 2]
+
+def matrix_to_qtransform(matrix) -> QTransform:
+    """3x3 affine (column-vector convention) -> QTransform (row-vector convention)."""
+    return QTransform(
+        matrix[0, 0], matrix[1, 0],
+        matrix[0, 1], matrix[1, 1],
+        matrix[0, 2], matrix[1, 2]
+    )
 
 class Viewport:
     def __init__(self):
@@ -64,6 +82,56 @@ class Viewport:
             pt.y() * self.scale + self.offset.y(),
         )
 
+    # -----------------------------
+    # Batch mapping (N x 2 NumPy arrays)
+    # -----------------------------
+    def screen_to_image_array(self, points):
+        np = _np()
+        pts = np.asarray(points, dtype=float)
+        return (pts - (self.offset.x(), self.offset.y())) / self.scale
+
+    def image_to_screen_array(self, points):
+        np = _np()
+        pts = np.asarray(points, dtype=float)
+        return pts * self.scale + (self.offset.x(), self.offset.y())
+
+    # -----------------------------
+    # Affine matrices (3x3, column vectors: p' = M @ [x, y, 1])
+    # -----------------------------
+    def image_to_screen_matrix(self):
+        np = _np()
+        s = self.scale
+        return np.array([
+            [s, 0.0, self.offset.x()],
+            [0.0, s, self.offset.y()],
+            [0.0, 0.0, 1.0],
+        ])
+
+    def screen_to_image_matrix(self):
+        np = _np()
+        inv = 1.0 / self.scale
+        return np.array([
+            [inv, 0.0, -self.offset.x() * inv],
+            [0.0, inv, -self.offset.y() * inv],
+            [0.0, 0.0, 1.0],
+        ])
+
+    def local_to_screen_matrix(self, cx, cy, angle, scaled=True):
+        """
+        Maps a rotated selection's local frame (origin at its center) to screen.
+        scaled=True: local units are image pixels.
+        scaled=False: local units are screen pixels (constant-size handles).
+        """
+        np = _np()
+        rad = math.radians(angle)
+        cos_a, sin_a = math.cos(rad), math.sin(rad)
+        k = self.scale if scaled else 1.0
+        return np.array([
+            [cos_a * k, -sin_a * k, cx * self.scale + self.offset.x()],
+            [sin_a * k, cos_a * k, cy * self.scale + self.offset.y()],
+            [0.0, 0.0, 1.0],
+        ])
+
     def zoom(self, factor, focus_point: QPointF):
         img_x = (focus_point.x() - self.offset.x()) / self.scale
         img_y = (focus_point.y() - self.offset.y()) / self.scale
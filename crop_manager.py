@@ -1,7 +1,31 @@
 # crop_manager.py
-from PIL import Image, ImageDraw
+"""
+Headless (Qt-free) crop backend built on Pillow + NumPy.
+
+Mirrors core.cropper.Cropper (same names, same geometry conventions) so
+worker processes can crop without creating a QApplication. Output matches
+the Qt path within the tolerances checked by benchmarks/crop_parity.py.
+"""
+import math
 import os
 
+import numpy as np
+from PIL import Image
+
+from core.masks import ellipse_mask, apply_mask
+from core.resample import rotated_crop
+
+def _as_rect(rect):
+    """(x, y, w, h) from a tuple or a SelectionGeometry-like object."""
+    if hasattr(rect, "cx"):
+        return rect.cx - rect.w / 2, rect.cy - rect.h / 2, rect.w, rect.h
+    x, y, w, h = rect
+    if w < 0:
+        x, w = x + w, -w
+    if h < 0:
+        y, h = y + h, -h
+    return x, y, w, h
+
 class CropManager:
     def __init__(self, output_dir="_output"):
         self.output_dir = output_dir
@@ -12,22 +36,78 @@ class CropManager:
             img = img.convert("RGBA")
         return img
 
-    def crop_rectangle(self, original, box):
-        crop = original.crop(box)
-        return self.ensure_png(crop)
+    @staticmethod
+    def crop(original, rect, angle: float = 0.0, mode: str = "rect", resample: str = "painter"):
+        """
+        original: PIL image. rect: (x, y, w, h) in image coords, or a
+        SelectionGeometry (its angle/mode are used unless given explicitly).
+        resample: filter for rotated/ellipse crops (see core.resample.MODES);
+        "painter" is Pillow's bilinear transform, the parity path.
+        """
+        if hasattr(rect, "cx") and angle == 0.0 and mode == "rect":
+            angle, mode = rect.angle, rect.mode
+
+        if angle != 0 or mode == "ellipse":
+            return CropManager.crop_rotated(original, rect, angle, mode, resample=resample)
 
-    def crop_ellipse(self, original, box):
-        crop = original.crop(box)
-        crop = self.ensure_png(crop)
+        x, y, w, h = _as_rect(rect)
+        if w <= 0 or h <= 0:
+            return None
 
-        # Crear máscara
-        mask = Image.new("L", crop.size, 0)
-        draw = ImageDraw.Draw(mask)
-        draw.ellipse((0, 0, crop.size[0], crop.size[1]), fill=255)
+        # Same integerization as Cropper.crop
+        left = int(max(0, x))
+        top = int(max(0, y))
+        right = int(min(original.width, x + w))
+        bottom = int(min(original.height, y + h))
+        if right - left <= 0 or bottom - top <= 0:
+            return None
 
-        crop.putalpha(mask)
+        crop = original.crop((left, top, right, bottom))
+        if crop.mode not in ("RGB", "RGBA"):
+            crop = crop.convert("RGBA")
         return crop
 
+    @staticmethod
+    def crop_rotated(original, rect, angle: float, mode: str = "rect", feather: float = 0.0,
+                     resample: str = "painter"):
+        x, y, rw, rh = _as_rect(rect)
+        w = int(rw)
+        h = int(rh)
+        if w <= 0 or h <= 0:
+            return None
+
+        cx = x + rw / 2
+        cy = y + rh / 2
+        # Resample premultiplied so transparent borders don't bleed dark fringes
+        src = original.convert("RGBA").convert("RGBa")
+
+        if resample != "painter":
+            pixels = rotated_crop(np.asarray(src), cx, cy, w, h, angle, resample)
+            if mode == "ellipse":
+                apply_mask(pixels, ellipse_mask(w, h, feather))
+            return Image.fromarray(pixels, "RGBa").convert("RGBA")
+
+        # Output pixel (u, v) samples source = center + R(angle) * ((u, v) - size / 2),
+        # the inverse of Cropper.crop_rotated's painter transform.
+        rad = math.radians(angle)
+        cos_a, sin_a = math.cos(rad), math.sin(rad)
+        affine = (
+            cos_a, -sin_a, cx - cos_a * w / 2 + sin_a * h / 2,
+            sin_a, cos_a, cy - sin_a * w / 2 - cos_a * h / 2,
+        )
+        result = src.transform((w, h), Image.AFFINE, affine, resample=Image.BILINEAR, fillcolor=(0, 0, 0, 0))
+
+        if mode == "ellipse":
+            pixels = np.array(result) # Writable copy; RGBa is premultiplied
+            apply_mask(pixels, ellipse_mask(w, h, feather))
+            result = Image.fromarray(pixels, "RGBa")
+
+        return result.convert("RGBA")
+
+    @staticmethod
+    def crop_ellipse(original, rect, angle: float = 0.0, feather: float = 0.0):
+        return CropManager.crop_rotated(original, rect, angle, "ellipse", feather)
+
     def save_crop(self, img, page, variant):
         filename = f"{page}_{variant}.png"
         path = os.path.join(self.output_dir, filename)
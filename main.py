@@ -1,13 +1,16 @@
+from core import startup # First import: starts the cold-start clock
 from PyQt5.QtWidgets import QApplication
 from viewer import ImageViewer
 import sys
 
+startup.mark("imports")
+
 def main():
     app = QApplication(sys.argv)
     w = ImageViewer()
+    startup.mark("window")
     w.show()
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
     main()
-
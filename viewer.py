@@ -1,17 +1,37 @@
 import os
 import json
+import time
+import hashlib
 from datetime import datetime
 from PyQt5.QtWidgets import QMainWindow, QSplitter, QFileDialog, QWidget, QVBoxLayout, QMessageBox, QAction
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap, QKeySequence
+from PyQt5.QtCore import Qt, QObject, QEvent, QTimer, QCoreApplication, pyqtSignal
+from PyQt5.QtGui import QImage, QKeySequence
 
 from widgets.canvas import CanvasWidget
 from widgets.canvas import CanvasWidget
 from widgets.sidebar import Sidebar
 from batch.batch_manager import BatchManager
 from batch.batch_manager import BatchManager
+from batch.claims import DEFAULT_LEASE
+from batch.folder_watcher import FolderWatcher
+from core import startup
+from core.trace import TraceRecorder, TRACE_ENV
 from core.activity_log import ActivityLog
-from core.utils import clean_filename
+from core.metrics import SessionMetrics
+from core.catalog import CropCatalog, catalog_path
+from core.utils import clean_filename, source_metadata
+from core.cropper import Cropper
+from core.io_scheduler import IOScheduler
+from core import packfile
+from core.image_loader import ImageLoader, load_image, read_preview
+from core.resample import MODES as RESAMPLE_MODES, DEFAULT_MODE as DEFAULT_RESAMPLE
+from core.renditions import DEFAULT_SPEC as DEFAULT_RENDITIONS, parse_spec, encode_renditions
+from core.templates import TemplateStore, SLOTS as TEMPLATE_SLOTS, geometry_from_template
+from widgets.custom_buttons_panel import button_paths
+
+class _IOEvents(QObject):
+    # Emitted from I/O worker threads; delivered on the GUI thread (queued)
+    write_finished = pyqtSignal(object) # (context, results)
 
 class ImageViewer(QMainWindow):
     def __init__(self):
@@ -21,7 +41,21 @@ class ImageViewer(QMainWindow):
 
         # Core Logic
         self.log = ActivityLog()
+        self.metrics = SessionMetrics()
+        self.io = IOScheduler()
+        self.io_events = _IOEvents(self)
+        self.catalog = None
+        self._retired_catalogs = [] # Replaced catalogs waiting for their in-flight saves
+        self._catalog_saves = {} # Catalog -> saves submitted against it, not reported yet
         self.batch_manager = None
+        self.watcher = None # New scans dropped into _para_procesar during the session
+        self.resample = DEFAULT_RESAMPLE # Rotated-crop filter unless a button overrides it
+        self.claims_cfg = {} # Page-claim options for shared batch folders
+        self.renditions = DEFAULT_RENDITIONS # Sizes written for every crop
+        self.output_mode = "files" # Or "pack": crops appended to one container per artist/work
+        self.memory = None # Optional long-session leak check (settings "memory_monitor")
+        self.loader = ImageLoader(self) # Full-resolution decodes behind the preview
+        self.load_token = None # Request whose result the canvas is waiting for
         
         # UI Setup
         # UI Setup
@@ -31,6 +65,11 @@ class ImageViewer(QMainWindow):
         self.canvas = CanvasWidget()
         self.sidebar = Sidebar()
         
+        # Interaction trace for benchmarks/replay_trace.py (SERIALCROPPER_TRACE=path)
+        self.trace = None
+        if os.environ.get(TRACE_ENV):
+            self.trace = TraceRecorder(os.environ[TRACE_ENV], self.canvas, self)
+        
         # Shortcuts helper to access panels easily
         self.meta_panel = self.sidebar.meta_panel
         self.custom_panel = self.sidebar.custom_panel
@@ -53,14 +92,40 @@ class ImageViewer(QMainWindow):
         self.current_metadata = {}
         self.variant_counter = 1
         self.session_processed_count = 0
+        self.page_crop_count = 0
+        self.page_loaded_at = None
         
         # Register initial custom actions
         self.register_custom_actions()
         
         self._log("Application started")
         
-        # Auto-load last session
+        # Auto-load last session after the first frame: load_settings() may
+        # open the last folder and decode a page, which shouldn't delay showing
+        # the window.
+        self.settings_loaded = False
+        self.canvas.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self.canvas and event.type() == QEvent.Paint:
+            self.canvas.removeEventFilter(self)
+            startup.mark("first_paint")
+            QTimer.singleShot(0, self._load_deferred)
+        return super().eventFilter(obj, event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Fallback in case the canvas is never painted (e.g. started minimized)
+        QTimer.singleShot(500, self._load_deferred)
+
+    def _load_deferred(self):
+        if self.settings_loaded:
+            return
+        self.settings_loaded = True
         self.load_settings()
+        startup.mark("settings_loaded")
+        self._log(f"Startup: {startup.summary()}")
+        self.metrics.record("startup", **{name: round(t, 4) for name, t in startup.marks().items()})
 
     def _setup_theme(self):
         self.setStyleSheet("""
@@ -103,15 +168,33 @@ class ImageViewer(QMainWindow):
         self.act_release_focus.triggered.connect(self.canvas.setFocus)
         self.addAction(self.act_release_focus)
         
+        # Selection templates: Ctrl+N applies slot N, Ctrl+Shift+N pins the current selection
+        self.templates = TemplateStore()
+        for slot in TEMPLATE_SLOTS:
+            apply_act = QAction(f"Apply Template {slot}", self)
+            apply_act.setShortcut(f"Ctrl+{slot}")
+            apply_act.triggered.connect(lambda _, s=slot: self.apply_template(s))
+            self.addAction(apply_act)
+            pin_act = QAction(f"Pin Template {slot}", self)
+            pin_act.setShortcut(f"Ctrl+Shift+{slot}")
+            pin_act.triggered.connect(lambda _, s=slot: self.pin_template(s))
+            self.addAction(pin_act)
+        
         # Metadata
         self.meta_panel.metadata_changed.connect(self.update_metadata)
         # self.meta_panel.selection_mode_changed.connect(self.canvas.set_select_mode) # Moved to ToolsPanel
         
         # Custom Buttons
         self.custom_panel.copy_requested.connect(self.custom_save_crop)
+        
+        # Background decodes
+        self.loader.loaded.connect(self._on_full_image)
         self.custom_panel.actions_updated.connect(self.register_custom_actions)
         self.custom_panel.set_validator(self.check_shortcut_conflict)
         
+        # Background writes
+        self.io_events.write_finished.connect(self._on_write_finished)
+        
         self.registered_custom_actions = []
 
     def _handle_tool_action(self, action):
@@ -171,34 +254,186 @@ class ImageViewer(QMainWindow):
             self.open_folder(folder)
 
     def open_folder(self, folder):
-        self.batch_manager = BatchManager(folder)
+        if self.batch_manager:
+            self.batch_manager.close() # Release claims on the previous batch
+        self.batch_manager = BatchManager(folder, owner=self.claims_cfg.get("owner"),
+                                          lease=self.claims_cfg.get("lease", DEFAULT_LEASE))
         count = self.batch_manager.scan()
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher.deleteLater()
+        # Seeded from the scan's listings: no second walk of the tree on the UI thread
+        self.watcher = FolderWatcher(self.batch_manager.todo_dir, self, listing=self.batch_manager.listing)
+        self.watcher.changed.connect(self._on_folder_changed)
+        
+        self._retire_catalog()
+        try:
+            self.catalog = CropCatalog(catalog_path(folder))
+            # Every page of the batch, so sources_without_crops covers unvisited pages too
+            self.catalog.add_sources((rel, *source_metadata(rel)) for rel in self.batch_manager.files)
+        except Exception as e:
+            self.catalog = None
+            self._log(f"Crop catalog unavailable: {e}")
+
         self._log(f"Batch folder loaded: {folder}")
         self._log(f"Found {count} images in _para_procesar")
+        self._log_recovery(self.batch_manager.recovery)
         if count == 0:
             QMessageBox.warning(self, "No Images", "No images found in _para_procesar subfolder.")
+        elif self.batch_manager.current_path() is None:
+            self._log("All pages are claimed by other operators (Next rescans)")
         
         self.session_processed_count = 0
         self.load_current_image()
         self.save_settings()
 
+    def _retire_catalog(self):
+        """
+        Detaches the current catalog. It is closed once the saves submitted
+        against it have reported (their rows belong to its batch, not the next).
+        """
+        if self.catalog:
+            self._retired_catalogs.append(self.catalog)
+            self.catalog = None
+        self._close_retired_catalogs()
+
+    def _close_retired_catalogs(self):
+        for catalog in list(self._retired_catalogs):
+            if not self._catalog_saves.get(catalog):
+                self._catalog_saves.pop(catalog, None)
+                self._retired_catalogs.remove(catalog)
+                catalog.close()
+
+    def _check_memory(self):
+        report = self.memory.page_loaded()
+        if not report:
+            return
+        rss = f"{report['rss'] / 2**20:.0f} MB" if report["rss"] else "n/a"
+        self._log(f"Memory after {report['pages']} pages: RSS {rss}, heap {report['traced'] / 2**20:.1f} MB "
+                  f"({report['growth'] / 1024:+.0f} KB)")
+        if report["leak"]:
+            self._log("Memory leak suspected: " + "; ".join(report["reasons"]))
+        self.metrics.record("memory", pages=report["pages"], rss=report["rss"], traced=report["traced"],
+                            growth=report["growth"], leak=report["leak"])
+
+    def _update_title(self):
+        rel_path = self.batch_manager.current_rel_path() if self.batch_manager else None
+        if rel_path:
+            remaining = len(self.batch_manager.files)
+            self.setWindowTitle(f"Serial Cropper v2.0 - [{self.session_processed_count}/{remaining}] - [{rel_path}]")
+
+    def _on_folder_changed(self, added, removed):
+        if not self.batch_manager:
+            return
+        n_added, n_removed, current_changed = self.batch_manager.apply_changes(added, removed)
+        if self.catalog and self.batch_manager.last_added:
+            self.catalog.add_sources((rel, *source_metadata(rel)) for rel in self.batch_manager.last_added)
+        if n_added or n_removed:
+            self._log(f"_para_procesar changed: +{n_added} / -{n_removed} images")
+        if current_changed:
+            self.load_current_image()
+        else:
+            self._update_title()
+
+    def _log_recovery(self, report):
+        if report["moves_completed"]:
+            self._log(f"Recovered: completed {report['moves_completed']} interrupted page moves")
+        for path in report["crops_lost"]:
+            self._log(f"Recovered: removed incomplete crop {path}")
+        for source in report["pages_returned"]:
+            self._log(f"Recovered: {source} returned to _para_procesar (crops lost in a crash)")
+
+    def _read_settings(self):
+        if os.path.exists("settings.json"):
+            with open("settings.json", "r") as f:
+                return json.load(f)
+        return {}
+
     def load_settings(self):
         try:
-            if os.path.exists("settings.json"):
-                with open("settings.json", "r") as f:
-                    data = json.load(f)
-                    last_folder = data.get("last_folder")
-                    if last_folder and os.path.exists(last_folder):
-                        self.open_folder(last_folder)
+            data = self._read_settings()
+            
+            # Optional structured on-disk activity log:
+            # "activity_log": {"path": "activity.jsonl", "max_bytes": 5242880, "backups": 3}
+            log_cfg = data.get("activity_log")
+            if log_cfg and log_cfg.get("path"):
+                self.log.enable_file_log(
+                    log_cfg["path"],
+                    max_bytes=log_cfg.get("max_bytes", 5 * 1024 * 1024),
+                    backup_count=log_cfg.get("backups", 3),
+                )
+            
+            # Optional throughput metrics export:
+            # "metrics": {"jsonl": "metrics.jsonl", "prometheus": "serialcropper.prom",
+            #             "http_port": 9109, "workstation": "scan-01"}
+            metrics_cfg = data.get("metrics")
+            if metrics_cfg:
+                if metrics_cfg.get("workstation"):
+                    self.metrics.workstation = metrics_cfg["workstation"]
+                self.metrics.configure(
+                    jsonl_path=metrics_cfg.get("jsonl"),
+                    prom_path=metrics_cfg.get("prometheus"),
+                    http_port=metrics_cfg.get("http_port"),
+                )
+            
+            # Per-volume write limits, matched by longest path prefix:
+            # "io_volumes": {"default": {"concurrency": 2},
+            #                "//nas/share": {"concurrency": 1, "bytes_per_sec": 20000000,
+            #                                "timeout": 30, "retries": 3}}
+            self.io.limits = data.get("io_volumes", {})
+            
+            # Rotated/ellipse crop filter: "painter" (legacy), "nearest",
+            # "bilinear", "bicubic" or "lanczos". Custom buttons may override it.
+            resample = data.get("resample", DEFAULT_RESAMPLE)
+            if resample in RESAMPLE_MODES:
+                self.resample = resample
+            else:
+                self._log(f"Unknown resample mode '{resample}', using '{DEFAULT_RESAMPLE}'")
+            
+            # Extra sizes per crop, each in its own subfolder of the output folder:
+            # "renditions": [{"name": "full"}, {"name": "web", "max_side": 2048},
+            #                {"name": "thumb", "max_side": 256}]
+            try:
+                self.renditions = parse_spec(data.get("renditions"))
+            except ValueError as e:
+                self._log(f"Invalid renditions setting ({e}), saving full size only")
+            
+            # "output_mode": "files" (one PNG per crop) or "pack" (appended to
+            # <output>/<Artist_W>.pack; extract with python -m core.packfile)
+            output_mode = data.get("output_mode", "files")
+            if output_mode in packfile.OUTPUT_MODES:
+                self.output_mode = output_mode
+            else:
+                self._log(f"Unknown output mode '{output_mode}', writing files")
+            
+            # Optional leak check for long sessions (tracemalloc slows allocations):
+            # "memory_monitor": {"every": 100, "threshold_kb": 1024, "qt_threshold": 20,
+            #                    "report": "memory.jsonl"}
+            memory_cfg = data.get("memory_monitor")
+            if memory_cfg and not self.memory:
+                from core.memory_monitor import MemoryMonitor # Only loaded when enabled
+                self.memory = MemoryMonitor(self, every=memory_cfg.get("every", 100),
+                                            threshold_kb=memory_cfg.get("threshold_kb", 1024),
+                                            qt_threshold=memory_cfg.get("qt_threshold", 20),
+                                            report_path=memory_cfg.get("report"))
+            
+            # Shared batch folders: "claims": {"owner": "scan-01", "lease": 120}
+            self.claims_cfg = data.get("claims", {})
+            
+            last_folder = data.get("last_folder")
+            if last_folder and os.path.exists(last_folder) and not self.batch_manager:
+                self.open_folder(last_folder)
         except Exception as e:
             print(f"Error loading settings: {e}")
 
     def save_settings(self):
         if self.batch_manager and self.batch_manager.root_dir:
             try:
-                data = {"last_folder": self.batch_manager.root_dir}
+                # Read-modify-write so keys edited by hand are preserved
+                data = self._read_settings()
+                data["last_folder"] = self.batch_manager.root_dir
                 with open("settings.json", "w") as f:
-                    json.dump(data, f)
+                    json.dump(data, f, indent=4)
             except Exception as e:
                 print(f"Error saving settings: {e}")
 
@@ -207,9 +442,29 @@ class ImageViewer(QMainWindow):
             return
         
         path = self.batch_manager.current_path()
+        self.loader.cancel() # A page still decoding for the previous image is no longer wanted
+        self.load_token = None
         if path:
-            self.canvas.set_pixmap(QPixmap(path))
+            # Reduced JPEG decode first, so the page (and drawing) is available
+            # right away; the full image replaces it when the worker is done.
+            with self.metrics.timed("preview"):
+                preview, full_size = read_preview(path, self.canvas.size())
+            if preview is not None:
+                self.canvas.set_preview(preview, full_size)
+                self.load_token = self.loader.request(path)
+                image_size = full_size
+            else:
+                with self.metrics.timed("decode"):
+                    image = load_image(path)
+                self.canvas.set_image(image) # Converted to SOURCE_FORMAT by the canvas
+                image_size = image.size()
+            if self.trace:
+                self.trace.record_page()
+            if self.memory:
+                self._check_memory()
             self.variant_counter = 1
+            self.page_crop_count = 0
+            self.page_loaded_at = time.perf_counter()
             
             # Update metadata defaults
             filename = os.path.basename(path)
@@ -217,23 +472,13 @@ class ImageViewer(QMainWindow):
             
             # Extract Artist and Work from path
             # Structure: .../_para_procesar/Artist/Work/Page.ext
+            # (or Artist/Work.cbz/Page.ext: archives are read as folders)
             try:
                 # Get path relative to _para_procesar
                 # We need to find where _para_procesar is in the path
                 # Since batch_manager knows todo_dir, we can use relpath
                 rel_path = os.path.relpath(path, self.batch_manager.todo_dir)
-                parts = rel_path.split(os.sep)
-                
-                if len(parts) >= 3:
-                    artist = parts[0]
-                    work = parts[1]
-                    # page is parts[-1] (filename)
-                elif len(parts) == 2:
-                    artist = parts[0]
-                    work = "ND"
-                else:
-                    artist = "ND"
-                    work = "ND"
+                artist, work, _ = source_metadata(rel_path)
             except ValueError:
                 # Path not relative to todo_dir (shouldn't happen in normal flow)
                 artist = "ND"
@@ -244,25 +489,68 @@ class ImageViewer(QMainWindow):
             self.meta_panel.date_edit.setText(datetime.now().strftime("%Y-%m-%d %H:%M"))
             
             # Update Window Title with Relative Path and Progress
-            remaining = len(self.batch_manager.files) if self.batch_manager else 0
-            self.setWindowTitle(f"Serial Cropper v2.0 - [{self.session_processed_count}/{remaining}] - [{rel_path}]")
+            self._update_title()
             
             self._log(f"Loaded: {filename} ({artist} - {work})")
+            if self.catalog:
+                self.catalog.add_source(rel_path, artist, work, page)
+            self.metrics.record("image_loaded", source=rel_path, width=image_size.width(), height=image_size.height())
         else:
-            self.canvas.set_pixmap(None) # Clear canvas?
+            self.canvas.set_image(None) # Clear canvas?
             self.setWindowTitle("Serial Cropper v2.0")
             self._log("No image loaded")
 
+    def _on_full_image(self, token, path, image, opaque, seconds):
+        if token != self.load_token:
+            return # Stale: the operator already moved to another page
+        self.load_token = None
+        self.metrics.observe("decode", seconds)
+        if image.isNull():
+            # The preview stays up but preview_pending keeps crops off it (they'd be low resolution)
+            self._log(f"Error decoding {os.path.basename(path)}: only its preview is shown, it can't be cropped")
+            return
+        self.canvas.swap_full_image(image, opaque)
+
+    def _wait_for_full_image(self):
+        """Blocks until the page behind the preview is decoded and swapped in."""
+        if self.load_token is None:
+            return
+        self.loader.wait()
+        # Deliver the queued `loaded` signal now instead of on the next event loop pass
+        QCoreApplication.sendPostedEvents(None, QEvent.MetaCall)
+
     def next_image(self):
+        if self.batch_manager and self.batch_manager.current_path() is None:
+            # Nothing claimed (e.g. all pages were held by others): look again
+            self.batch_manager.scan()
+            self.load_current_image()
+            return
         if self.batch_manager:
+            source = self.batch_manager.current_rel_path()
+            if source and self.page_crop_count == 0:
+                self.metrics.record("page_skipped", source=source)
+            
             self.session_processed_count += 1
-            self.batch_manager.mark_current_processed()
+            with self.metrics.timed("move"):
+                moved = self.batch_manager.mark_current_processed()
+            if moved:
+                if self.page_loaded_at is not None:
+                    self.metrics.observe("page", time.perf_counter() - self.page_loaded_at)
+                self.metrics.record("page_moved", source=source, crops=self.page_crop_count)
             self.load_current_image()
 
-    def save_crop(self, keep, output_path=None):
-        crop = self.canvas.get_crop()
+    def save_crop(self, keep, output_paths=None, resample=None, renditions=None):
+        if self.canvas.preview_pending and self.canvas.selection.has_selection():
+            # Crops must come from the full image, never the preview
+            with self.metrics.timed("wait_full"):
+                self._wait_for_full_image()
+        with self.metrics.timed("crop"):
+            crop = self.canvas.get_crop(resample or self.resample)
         if not crop:
-            self._log("No selection to crop")
+            if self.canvas.preview_pending and self.canvas.selection.has_selection():
+                self._log("Cannot crop: this page could not be decoded at full size (only its preview is shown)")
+            else:
+                self._log("No selection to crop")
             return
             
         # Filename generation
@@ -278,48 +566,183 @@ class ImageViewer(QMainWindow):
         if not page: page = "000"
 
         base = f"{artist}_{work_init}_{page}"
-        filename = f"{base}({self.variant_counter}).png"
         
-        # Output dir
-        if output_path:
-            out_dir = output_path
-        else:
-            out_dir = self.batch_manager.output_dir if self.batch_manager else "_output"
-            
-        os.makedirs(out_dir, exist_ok=True)
-        path = os.path.join(out_dir, filename)
+        # Output dirs ("_output" resolves to the batch output folder)
+        default_dir = self.batch_manager.output_dir if self.batch_manager else "_output"
+        out_dirs = []
+        for out_dir in (output_paths or [default_dir]):
+            out_dir = default_dir if out_dir == "_output" else out_dir
+            if out_dir not in out_dirs:
+                out_dirs.append(out_dir)
+        
+        # Each rendition (full, web, thumb...) goes to its subfolder of every output folder
+        renditions = renditions or self.renditions
+        rendition_dirs = {r["name"]: [os.path.join(d, r["folder"]) if r["folder"] else d for d in out_dirs]
+                          for r in renditions}
+        all_dirs = [d for dirs in rendition_dirs.values() for d in dirs]
         
-        while os.path.exists(path):
+        if self.output_mode == "pack":
+            # Crops of one artist/work share a container in each folder
+            container = f"{artist}_{work_init}{packfile.PACK_SUFFIX}"
+            rendition_dirs = {name: [os.path.join(d, container) for d in dirs]
+                              for name, dirs in rendition_dirs.items()}
+            all_dirs = [d for dirs in rendition_dirs.values() for d in dirs]
+        
+        # Same filename in every destination: first variant not queued in any of
+        # them. Only in-memory reservations are checked here (no filesystem call
+        # on the UI thread); if the name is already on disk in any destination,
+        # the I/O dispatcher moves every rendition and copy of this crop to the
+        # same next free variant.
+        filename = f"{base}({self.variant_counter}).png"
+        while any(self._target_taken(os.path.join(d, filename)) for d in all_dirs):
             self.variant_counter += 1
             filename = f"{base}({self.variant_counter}).png"
-            path = os.path.join(out_dir, filename)
             
-        # Convert to QImage to add metadata
-        image = crop.toImage()
+        # crop is already a QImage (a view over the source for rect crops)
+        image = crop
         
         # Embed Metadata
-        artist = self.current_metadata.get("artist", "ND")
-        work = self.current_metadata.get("work", "ND")
-        page = self.current_metadata.get("page", "000")
-        
-        image.setText("Artist", artist)
-        image.setText("Work", work)
-        image.setText("Page", page)
-        image.setText("Software", "SerialCropper v2.0")
+        text = {
+            "Artist": self.current_metadata.get("artist", "ND"),
+            "Work": self.current_metadata.get("work", "ND"),
+            "Page": self.current_metadata.get("page", "000"),
+            "Software": "SerialCropper v2.0",
+        }
             
-        if image.save(path, "PNG"):
-            self._log(f"Saved: {filename}")
-            self.variant_counter += 1
-            if not keep:
-                self.canvas.selection.clear()
-                self.canvas.update()
-                self.next_image()
-        else:
-            self._log("Error saving file")
+        # Encode once per rendition (sizes derived from each other, encodes in
+        # parallel), then fan the bytes out to every destination. Writes run on
+        # per-volume queues so slow shares never block the UI.
+        with self.metrics.timed("encode"):
+            encoded = encode_renditions(image, renditions, text)
+        if encoded is None:
+            self._log("Error encoding crop")
+            return
             
-    def custom_save_crop(self, path):
+        saves = []
+        names = set() # Filenames the copies of this crop end up with (shared by its renditions)
+        for i, (rendition, rendered, data) in enumerate(encoded):
+            context = {
+                "filename": filename,
+                "rendition": rendition["name"],
+                "primary": i == 0, # Largest rendition: counted and catalogued
+                "width": rendered.width(),
+                "height": rendered.height(),
+                "bytes": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "submitted": time.perf_counter(),
+                # For the crop catalog
+                "metadata": dict(self.current_metadata),
+                "source": self.batch_manager.current_rel_path() if self.batch_manager else None,
+                "geometry": self.canvas.selection.geometry.copy(),
+                # Captured now: the folder (and its catalog) may change before the write ends
+                "catalog": self.catalog,
+                "batch": self.batch_manager,
+                "names": names,
+            }
+            targets = [os.path.join(d, filename) for d in rendition_dirs[rendition["name"]]]
+            saves.append((data, targets, context))
+        self._submit_saves(saves)
+        self._update_io_status()
+        
+        # Counted (and the page moved on) once queued, not once written: write
+        # results arrive later in _on_write_finished, which returns the page to
+        # todo if its crop could not be saved anywhere.
+        self.variant_counter += 1
+        self.page_crop_count += 1
+        if not keep:
+            self.canvas.selection.clear()
+            self.canvas.update()
+            self.next_image()
+
+    def _submit_saves(self, saves):
+        """(data, targets, context) per rendition of one crop; written under one filename."""
+        # Journaled: a crash before the write is synced is caught on the next start
+        journal = self.batch_manager.journal if self.batch_manager else None
+        queued = []
+        for data, targets, context in saves:
+            txn = journal.begin("save", source=context["source"], targets=targets,
+                                sha256=context["sha256"]) if journal else None
+
+            catalog = context["catalog"]
+            if catalog:
+                self._catalog_saves[catalog] = self._catalog_saves.get(catalog, 0) + 1
+
+            def finished(results, txn=txn, context=context):
+                if journal:
+                    journal.commit(txn, paths=[r["path"] for r in results if r["ok"]])
+                self.io_events.write_finished.emit((context, results))
+
+            queued.append((data, targets, finished))
+        self.io.submit_writes(queued)
+
+    def _target_taken(self, path):
+        return self.io.is_reserved(path)
+
+    def _on_write_finished(self, payload):
+        context, results = payload
+        suffix = "" if context["primary"] else f" [{context['rendition']}]"
+        self.metrics.observe("write", time.perf_counter() - context["submitted"])
+        
+        saved = [r for r in results if r["ok"]]
+        names = context["names"]
+        diverged = len(names) > 1
+        names.update(os.path.basename(r["path"]) for r in saved)
+        if len(names) > 1 and not diverged:
+            # A name taken after the dispatcher checked it (e.g. another operator, same moment)
+            self._log(f"Warning: copies of this crop were saved under different names: {', '.join(sorted(names))}")
+        for r in results:
+            dest = os.path.dirname(r["path"])
+            if r["ok"]:
+                # The worker may have picked a later variant if the name was taken on disk
+                filename = os.path.basename(r["path"]) + suffix
+                how = " (hardlink)" if r["method"] == "link" else ""
+                self._log(f"Saved: {filename} -> {dest}{how}" if len(results) > 1 else f"Saved: {filename}")
+            else:
+                self._log(f"Error saving to {dest}: {r['error']} (after {r.get('attempts', 1)} attempts)")
+        
+        # Pages move on as soon as their crops are queued. If a crop could not be
+        # written anywhere (after every retry), its page goes back to todo.
+        source = context["source"]
+        if (not saved and context["primary"] and source and context["batch"] is self.batch_manager
+                and source != self.batch_manager.current_rel_path()):
+            if self.batch_manager.return_page(source):
+                self._log(f"Returned {source} to _para_procesar: its crop was not saved")
+                self._update_title()
+                
+        if saved and context["primary"]:
+            self.metrics.record("crop_saved", path=saved[0]["path"], destinations=len(saved),
+                                width=context["width"], height=context["height"], bytes=context["bytes"])
+            catalog = context["catalog"]
+            if catalog:
+                meta = context["metadata"]
+                for r in saved:
+                    catalog.add_crop(r["path"], meta.get("artist", "ND"), meta.get("work", "ND"),
+                                          meta.get("page", "000"), context["source"], context["geometry"],
+                                          size=context["bytes"], sha256=context["sha256"])
+        if self._catalog_saves.get(context["catalog"]):
+            self._catalog_saves[context["catalog"]] -= 1
+            self._close_retired_catalogs()
+        self._update_io_status()
+
+    def _update_io_status(self):
+        self.sidebar.io_panel.set_depths(self.io.queue_depths())
+            
+    def custom_save_crop(self, button):
         # Custom save always behaves like "Keep" (doesn't advance image)
-        self.save_crop(keep=True, output_path=path)
+        paths = button_paths(button)
+        if not paths:
+            self._log(f"Custom save '{button.get('name', '')}' has no destination")
+            return
+        resample = button.get("resample")
+        if resample not in RESAMPLE_MODES:
+            resample = None # Unset or unknown: use the settings default
+        renditions = None
+        if button.get("renditions"):
+            try:
+                renditions = parse_spec(button["renditions"])
+            except ValueError as e:
+                self._log(f"Custom save '{button.get('name', '')}': invalid renditions ({e})")
+        self.save_crop(keep=True, output_paths=paths, resample=resample, renditions=renditions)
 
     def update_metadata(self, data):
         self.current_metadata = data
@@ -328,11 +751,60 @@ class ImageViewer(QMainWindow):
 
     def _log(self, msg):
         self.log.add(msg)
-        self.log_panel.update_log(self.log.get_entries())
+        self.log_panel.append_entry(msg)
+
+    def closeEvent(self, event):
+        self.loader.cancel()
+        self.loader.wait() # Don't tear down while a decode thread is running
+        if not self.io.close(timeout=10.0):
+            print("Warning: closing with unfinished writes")
+        packfile.close_all() # Flush pack indexes
+        # Deliver the write results queued while waiting, so their catalog rows are kept
+        QCoreApplication.sendPostedEvents(None, QEvent.MetaCall) # Queued slot calls (PyQt proxies)
+        self._retire_catalog()
+        for catalog in self._retired_catalogs: # Writes that never finished: nothing more to record
+            catalog.close()
+        self._retired_catalogs.clear()
+        if self.watcher:
+            self.watcher.stop()
+        if self.batch_manager:
+            self.batch_manager.close() # Release page claims for other operators
+        if self.trace:
+            self.trace.close()
+        if self.memory:
+            self.memory.stop()
+        self.log.close() # Flush buffered log lines to disk
+        self.metrics.close()
+        super().closeEvent(event)
 
     def restore_selection(self):
-        if self.canvas.selection.restore_previous():
+        selection = self.canvas.selection
+        if selection.restore_previous():
+            self.sidebar.tools_panel.set_mode(selection.mode)
             self.canvas.update()
-            self._log("Selection restored")
+            self._log(f"Selection restored ({selection.history_position()}/{len(selection.history)})")
         else:
             self._log("No previous selection to restore")
+
+    def pin_template(self, slot):
+        size = self.canvas.image_size
+        if not self.canvas.selection.has_selection() or size.isEmpty():
+            self._log("No selection to pin")
+            return
+        self.templates.pin(slot, self.canvas.selection.geometry, size.width(), size.height())
+        self._log(f"Template {slot} pinned")
+
+    def apply_template(self, slot):
+        template = self.templates.get(slot)
+        if not template:
+            self._log(f"Template {slot} is empty (Ctrl+Shift+{slot} pins one)")
+            return
+        size = self.canvas.image_size
+        if size.isEmpty():
+            self._log("No image loaded")
+            return
+        self.canvas.selection.clear() # Keeps the replaced selection in the history
+        self.canvas.selection.set_geometry(geometry_from_template(template, size.width(), size.height()))
+        self.sidebar.tools_panel.set_mode(self.canvas.selection.mode)
+        self.canvas.update()
+        self._log(f"Template {slot} applied")
@@ -1,10 +1,17 @@
-from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import QPainter, QColor, QPen, QPainterPath, QPixmap, QCursor
-from PyQt5.QtCore import Qt, QRectF, QPointF
+from PyQt5.QtWidgets import QWidget, QApplication
+from PyQt5.QtGui import QPainter, QColor, QPen, QPainterPath, QPixmap, QCursor, QImage
+from PyQt5.QtCore import Qt, QRectF, QPointF, QTimer, QSize
 
-from core.viewport import Viewport
+from core.viewport import Viewport, matrix_to_qtransform
 from core.selection import Selection, HitTest
 from core.cropper import Cropper
+from core.pyramid import ImagePyramid
+from core.image_buffer import to_source_format
+
+# Time without zoom/pan events before the smooth (high quality) pass is painted
+SETTLE_DELAY_MS = 150
+# Fallback when the screen does not report a refresh rate
+DEFAULT_REFRESH_HZ = 60.0
 
 class CanvasWidget(QWidget):
     def __init__(self, parent=None):
@@ -15,10 +22,31 @@ class CanvasWidget(QWidget):
         self.viewport = Viewport()
         self.selection = Selection()
         
-        self.pixmap = None
+        self.image = None
+        self.image_size = QSize() # Full-resolution page size (image coordinates)
+        self.image_opaque = True
+        self.preview_pending = False # self.image is a reduced preview; full page still decoding
+        self.pyramid = ImagePyramid()
         self.panning = False
         self.pan_last_pos = None
         
+        # Progressive rendering: fast pass while interacting, smooth pass once settled
+        self.interacting = False
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(SETTLE_DELAY_MS)
+        self.settle_timer.timeout.connect(self._on_settled)
+        
+        # Input coalescing: moves keep only the latest position, wheel deltas
+        # are summed, and both are applied at most once per display frame.
+        self.pending_move = None # (pos, modifiers)
+        self.pending_wheel_delta = 0
+        self.pending_wheel_pos = None
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setTimerType(Qt.PreciseTimer)
+        self.frame_timer.setInterval(self._frame_interval_ms())
+        self.frame_timer.timeout.connect(self._on_frame)
+        
         self.cursor_rotate = self._create_rotate_cursor()
 
     def _create_rotate_cursor(self):
@@ -63,13 +91,97 @@ class CanvasWidget(QWidget):
         
         return QCursor(pixmap)
 
-    def set_pixmap(self, pixmap: QPixmap):
-        self.pixmap = pixmap
-        if pixmap:
-            self.viewport.fit_extents(self.width(), self.height(), pixmap.width(), pixmap.height())
+    def set_image(self, image: QImage):
+        """Sets the source page (kept as one QImage in SOURCE_FORMAT; drawn and cropped directly)."""
+        if image is not None and image.isNull():
+            image = None
+        # Remember if the page was opaque before conversion (rect crops then encode as RGB)
+        self.image_opaque = image is not None and not image.hasAlphaChannel()
+        if image is not None:
+            image = to_source_format(image)
+        self.image = image
+        self.image_size = image.size() if image is not None else QSize()
+        self.preview_pending = False
+        self.pyramid.set_image(image)
+        if image:
+            self.viewport.fit_extents(self.width(), self.height(), image.width(), image.height())
         self.selection.clear()
         self.update()
 
+    def set_preview(self, preview: QImage, full_size: QSize):
+        """
+        Shows a reduced decode of a page while the full image loads. Viewport
+        and selection work in full-resolution coordinates from the start, so
+        the operator can already draw; swap_full_image() keeps both.
+        """
+        self.image_opaque = not preview.hasAlphaChannel()
+        self.image = to_source_format(preview)
+        self.image_size = QSize(full_size)
+        self.preview_pending = True
+        self.pyramid.set_image(self.image, full_width=full_size.width()) # Drawn scaled up to page size
+        self.viewport.fit_extents(self.width(), self.height(), full_size.width(), full_size.height())
+        self.selection.clear()
+        self.update()
+
+    def swap_full_image(self, image: QImage, opaque: bool):
+        """Replaces the preview with the decoded page (SOURCE_FORMAT) without resetting the view."""
+        if image.size() != self.image_size:
+            # Header size disagreed with the decoded image: treat as a new page
+            self.set_image(image)
+            return
+        self.image = image
+        self.image_opaque = opaque
+        self.preview_pending = False
+        self.pyramid.set_image(image)
+        self.update()
+
+    def _frame_interval_ms(self):
+        screen = QApplication.primaryScreen()
+        rate = screen.refreshRate() if screen else 0
+        if not rate or rate <= 0:
+            rate = DEFAULT_REFRESH_HZ
+        return max(1, int(1000 / rate))
+
+    def _schedule_input(self):
+        # Leading edge: the first event after an idle period is applied right
+        # away (no added latency); events arriving within the same frame are
+        # folded into one update on the next tick.
+        if not self.frame_timer.isActive():
+            self._apply_pending_input()
+            self.frame_timer.start()
+
+    def _on_frame(self):
+        if not self._apply_pending_input():
+            self.frame_timer.stop()
+
+    def _apply_pending_input(self):
+        applied = False
+        if self.pending_move is not None:
+            pos, modifiers = self.pending_move
+            self.pending_move = None
+            self._apply_move(pos, modifiers)
+            applied = True
+            
+        if self.pending_wheel_delta:
+            delta = self.pending_wheel_delta
+            self.pending_wheel_delta = 0
+            self._apply_wheel(delta, self.pending_wheel_pos)
+            applied = True
+        return applied
+
+    def _begin_interaction(self):
+        # Paint the fast pass now, schedule a single smooth repaint once idle
+        self.interacting = True
+        self.settle_timer.start()
+
+    def _on_settled(self):
+        self.settle_timer.stop()
+        self.interacting = False
+        self.update()
+
+    def set_pixmap(self, pixmap: QPixmap):
+        self.set_image(pixmap.toImage() if pixmap else None)
+
     def set_select_mode(self, mode: str):
         self.selection.set_mode(mode)
         self.update()
@@ -78,74 +190,56 @@ class CanvasWidget(QWidget):
         painter = QPainter(self)
         painter.fillRect(self.rect(), QColor(32, 32, 32))
 
-        if not self.pixmap:
+        if not self.image:
             return
 
         # Draw Image
+        # While zooming/panning: nearest-neighbour from the cached pyramid level.
+        # Once settled: smooth filtering from the same level (< 2x downsample).
+        level = self.pyramid.level_for_scale(self.viewport.scale)
+        source, factor = self.pyramid.get_level(level)
+        
         painter.save()
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, not self.interacting)
         painter.translate(self.viewport.offset)
-        painter.scale(self.viewport.scale, self.viewport.scale)
-        painter.drawPixmap(0, 0, self.pixmap)
+        painter.scale(self.viewport.scale * factor, self.viewport.scale * factor)
+        painter.drawImage(0, 0, source)
         painter.restore()
 
         # Draw Selection
         if self.selection.has_selection():
-            r_img = self.selection.get_rect()
-            
-            # To draw rotated, we need to map the center to screen, then rotate painter
-            center_img = r_img.center()
-            center_screen = self.viewport.image_to_screen(center_img)
+            g = self.selection.geometry
             
             # Calculate width/height in screen coords
             # Since scale is uniform, we can just scale dimensions
-            w_screen = r_img.width() * self.viewport.scale
-            h_screen = r_img.height() * self.viewport.scale
+            w_screen = g.w * self.viewport.scale
+            h_screen = g.h * self.viewport.scale
             
-            # Create rect centered at 0,0 for drawing after translation
+            # Create rect centered at 0,0 for drawing in the selection frame
             r_draw = QRectF(-w_screen/2, -h_screen/2, w_screen, h_screen)
+            
+            # Selection frame: origin at the selection center, rotated, screen-pixel units
+            frame = matrix_to_qtransform(
+                self.viewport.local_to_screen_matrix(g.cx, g.cy, g.angle, scaled=False)
+            )
 
             painter.save()
-            painter.translate(center_screen)
-            painter.rotate(self.selection.angle)
-            
             painter.setRenderHint(QPainter.Antialiasing, True)
             dim_color = QColor(0, 0, 0, 140)
             
-            # Dimming is tricky with rotation. 
-            # Simplest approach: Draw full screen dim, then subtract the rotated shape?
-            # QPainterPath supports subtraction.
-            
-            # Reset transform for the "Outer" path (screen rect)
-            painter.restore() 
-            painter.save()
-            
-            path = QPainterPath()
-            path.addRect(QRectF(self.rect()))
-            
-            # Create the "Hole" path
-            hole_path = QPainterPath()
-            
-            # We need the hole path in SCREEN coordinates but rotated
-            # So we create it centered, rotate it, then translate it
-            temp_path = QPainterPath()
+            # Dim: full screen rect minus the rotated "hole" (mapped to screen)
+            shape = QPainterPath()
             if self.selection.mode == "ellipse":
-                temp_path.addEllipse(r_draw)
+                shape.addEllipse(r_draw)
             else:
-                temp_path.addRect(r_draw)
-                
-            # Apply transform to path manually
-            from PyQt5.QtGui import QTransform
-            transform = QTransform()
-            transform.translate(center_screen.x(), center_screen.y())
-            transform.rotate(self.selection.angle)
-            hole_path = transform.map(temp_path)
+                shape.addRect(r_draw)
             
-            final_path = path.subtracted(hole_path)
-            painter.fillPath(final_path, dim_color)
+            path = QPainterPath()
+            path.addRect(QRectF(self.rect()))
+            painter.fillPath(path.subtracted(frame.map(shape)), dim_color)
             
             # Now draw the border and handles (using the rotated coordinate system)
-            painter.translate(center_screen)
-            painter.rotate(self.selection.angle)
+            painter.setTransform(frame)
             
             pen = QPen(QColor(255, 60, 60), 2)
             painter.setPen(pen)
@@ -191,8 +285,9 @@ class CanvasWidget(QWidget):
 
     def mousePressEvent(self, event):
         self.setFocus() # Claim focus on click
-        if not self.pixmap:
+        if not self.image:
             return
+        self._apply_pending_input() # Keep ordering with coalesced moves
 
         if event.button() == Qt.LeftButton:
             img_pos = self.viewport.screen_to_image(event.pos())
@@ -209,30 +304,34 @@ class CanvasWidget(QWidget):
             
         elif event.button() == Qt.MiddleButton:
             self.panning = True
-            self.pan_last_pos = event.pos()
+            self.pan_last_pos = QPointF(event.pos())
 
     def mouseMoveEvent(self, event):
-        if not self.pixmap:
+        if not self.image:
             return
+        self.pending_move = (QPointF(event.pos()), event.modifiers())
+        self._schedule_input()
 
-        img_pos = self.viewport.screen_to_image(event.pos())
+    def _apply_move(self, pos, modifiers):
+        img_pos = self.viewport.screen_to_image(pos)
 
         if self.selection.active_handle != HitTest.NONE:
             # Modifying (Move or Resize)
-            is_perfect = bool(event.modifiers() & Qt.ShiftModifier)
+            is_perfect = bool(modifiers & Qt.ShiftModifier)
             self.selection.update_modification(img_pos, is_perfect)
             self.update()
             
         elif self.selection.is_dragging:
             # Creating new
-            is_perfect = bool(event.modifiers() & Qt.ShiftModifier)
+            is_perfect = bool(modifiers & Qt.ShiftModifier)
             self.selection.update(img_pos, is_perfect)
             self.update()
             
         elif self.panning:
-            delta = event.pos() - self.pan_last_pos
+            delta = pos - self.pan_last_pos
             self.viewport.pan(delta)
-            self.pan_last_pos = event.pos()
+            self.pan_last_pos = pos
+            self._begin_interaction()
             self.update()
             
         else:
@@ -241,10 +340,12 @@ class CanvasWidget(QWidget):
             self._update_cursor(hit)
 
     def mouseReleaseEvent(self, event):
+        self._apply_pending_input()
         if event.button() == Qt.LeftButton:
             self.selection.finish()
         elif event.button() == Qt.MiddleButton:
             self.panning = False
+            self._on_settled()
 
     def keyPressEvent(self, event):
         super().keyPressEvent(event)
@@ -266,44 +367,52 @@ class CanvasWidget(QWidget):
             self.setCursor(Qt.ArrowCursor)
 
     def wheelEvent(self, event):
-        if not self.pixmap:
+        if not self.image:
             return
         
-        factor = 1.15 if event.angleDelta().y() > 0 else 1/1.15
-        self.viewport.zoom(factor, event.pos())
+        self.pending_wheel_delta += event.angleDelta().y()
+        self.pending_wheel_pos = QPointF(event.pos())
+        self._schedule_input()
+
+    def _apply_wheel(self, delta, pos):
+        # 120 units = one notch = 15% zoom; summed deltas compound the same way
+        factor = 1.15 ** (delta / 120)
+        self.viewport.zoom(factor, pos)
+        self._begin_interaction()
         self.update()
 
     def resizeEvent(self, event):
         self.viewport.apply_resize(event.oldSize(), event.size())
         super().resizeEvent(event)
 
-    def get_crop(self):
-        if not self.selection.has_selection():
+    def get_crop(self, resample="painter"):
+        if not self.selection.has_selection() or self.preview_pending:
             return None
-        return Cropper.crop(self.pixmap, self.selection.get_rect(), self.selection.angle, self.selection.mode)
+        return Cropper.crop(self.image, self.selection.get_rect(), self.selection.angle,
+                            self.selection.mode, opaque=self.image_opaque, resample=resample)
     
     def reset_view(self):
-        if self.pixmap:
-            self.viewport.fit_extents(self.width(), self.height(), self.pixmap.width(), self.pixmap.height())
+        if self.image:
+            self.viewport.fit_extents(self.width(), self.height(), self.image_size.width(), self.image_size.height())
             self.update()
     
     def zoom(self, factor):
-        if self.pixmap:
+        if self.image:
             center = QPointF(self.width() / 2, self.height() / 2)
             self.viewport.zoom(factor, center)
             self.update()
 
     def zoom_extents(self):
-        if self.pixmap:
-            self.viewport.fit_extents(self.width(), self.height(), self.pixmap.width(), self.pixmap.height())
+        if self.image:
+            self.viewport.fit_extents(self.width(), self.height(), self.image_size.width(), self.image_size.height())
             self.update()
             
     def zoom_100(self):
-        if self.pixmap:
-            self.viewport.set_one_to_one(self.width(), self.height(), self.pixmap.width(), self.pixmap.height())
+        if self.image:
+            self.viewport.set_one_to_one(self.width(), self.height(), self.image_size.width(), self.image_size.height())
             self.update()
 
     def zoom_selection(self):
-        if self.pixmap and self.selection.has_selection():
+        if self.image and self.selection.has_selection():
             self.viewport.zoom_to_rect(self.selection.get_rect(), self.width(), self.height())
             self.update()
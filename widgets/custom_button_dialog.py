@@ -0,0 +1,110 @@
+from PyQt5.QtWidgets import (QVBoxLayout, QPushButton, QDialog, QLabel, QLineEdit, QFileDialog,
+                             QKeySequenceEdit, QHBoxLayout, QMessageBox, QComboBox)
+
+from core.resample import MODES as RESAMPLE_MODES
+
+def split_paths(text):
+    return [p.strip() for p in text.split(";") if p.strip()]
+
+class CustomButtonDialog(QDialog):
+    def __init__(self, parent=None, validator=None):
+        super().__init__(parent)
+        self.validator = validator
+        self.setWindowTitle("Add Custom Copy")
+        self.setModal(True)
+        self.resize(400, 200)
+        
+        # Apply Dark Theme to Dialog
+        self.setStyleSheet("""
+            QDialog { background-color: #2a2a2a; color: #f0f0f0; }
+            QLabel { color: #e0e0e0; font-weight: bold; }
+            QLineEdit { background: #3a3a3a; color: #ffffff; border: 1px solid #555; padding: 4px; }
+            QPushButton { background: #444; color: #fff; border: 1px solid #555; padding: 5px; }
+            QPushButton:hover { background: #555; }
+            QKeySequenceEdit { background: #3a3a3a; color: #ffffff; border: 1px solid #555; }
+            QComboBox { background: #3a3a3a; color: #ffffff; border: 1px solid #555; padding: 3px; }
+        """)
+        
+        layout = QVBoxLayout(self)
+        
+        # Name
+        layout.addWidget(QLabel("Button Name:"))
+        self.name_edit = QLineEdit()
+        layout.addWidget(self.name_edit)
+        
+        # Path(s)
+        layout.addWidget(QLabel("Destination Folder(s):"))
+        path_layout = QHBoxLayout()
+        self.path_edit = QLineEdit()
+        self.path_edit.setPlaceholderText("Folder; another folder; _output")
+        self.path_edit.setToolTip("Separate several destinations with ';'.\n"
+                                  "'_output' means the batch output folder.\n"
+                                  "The crop is encoded once and written to all of them.")
+        self.browse_btn = QPushButton("...")
+        self.browse_btn.clicked.connect(self.browse_folder)
+        path_layout.addWidget(self.path_edit)
+        path_layout.addWidget(self.browse_btn)
+        layout.addLayout(path_layout)
+        
+        # Shortcut
+        layout.addWidget(QLabel("Shortcut (Optional):"))
+        self.shortcut_edit = QKeySequenceEdit()
+        layout.addWidget(self.shortcut_edit)
+        
+        # Resampling for rotated/ellipse crops
+        layout.addWidget(QLabel("Rotated Crop Resampling:"))
+        self.resample_combo = QComboBox()
+        self.resample_combo.addItem("Default (settings)", None)
+        for mode in RESAMPLE_MODES:
+            self.resample_combo.addItem(mode, mode)
+        self.resample_combo.setToolTip("nearest: fastest draft\n"
+                                       "painter/bilinear: smooth\n"
+                                       "bicubic/lanczos: sharpest on text")
+        layout.addWidget(self.resample_combo)
+        
+        # Buttons
+        btn_layout = QHBoxLayout()
+        self.ok_btn = QPushButton("Save")
+        self.ok_btn.clicked.connect(self.validate_and_accept)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.reject)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.cancel_btn)
+        btn_layout.addWidget(self.ok_btn)
+        layout.addLayout(btn_layout)
+        
+    def browse_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder")
+        if folder:
+            # Append, so several destinations can be picked one after another
+            paths = split_paths(self.path_edit.text())
+            if folder not in paths:
+                paths.append(folder)
+            self.path_edit.setText("; ".join(paths))
+            
+    def validate_and_accept(self):
+        shortcut = self.shortcut_edit.keySequence().toString()
+        if self.validator and shortcut:
+            is_valid, owner = self.validator(shortcut)
+            if not is_valid:
+                QMessageBox.warning(self, "Duplicate Shortcut", 
+                                  f"Shortcut '{shortcut}' is already in use by: '{owner}'.\n"
+                                  "Please choose another.")
+                return
+
+        if not self.name_edit.text() or not split_paths(self.path_edit.text()):
+             QMessageBox.warning(self, "Error", "Name and Folder are required.")
+             return
+             
+        self.accept()
+
+    def get_data(self):
+        data = {
+            "name": self.name_edit.text(),
+            "paths": split_paths(self.path_edit.text()),
+            "shortcut": self.shortcut_edit.keySequence().toString()
+        }
+        resample = self.resample_combo.currentData()
+        if resample:
+            data["resample"] = resample
+        return data
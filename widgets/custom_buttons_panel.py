@@ -1,97 +1,19 @@
 import json
 import os
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QPushButton, QDialog, QLabel, 
-                             QLineEdit, QFileDialog, QKeySequenceEdit, QHBoxLayout, QMessageBox, QAction)
-import json
-import os
-from PyQt5.QtWidgets import (QGroupBox, QVBoxLayout, QPushButton, QDialog, QLabel, 
-                             QLineEdit, QFileDialog, QKeySequenceEdit, QHBoxLayout, QMessageBox, QAction, QGridLayout)
-from PyQt5.QtCore import pyqtSignal, Qt
-from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QGroupBox, QPushButton, QDialog, QAction, QGridLayout
+from PyQt5.QtCore import pyqtSignal
 
 CONFIG_FILE = "custom_buttons.json"
 
-class CustomButtonDialog(QDialog):
-    def __init__(self, parent=None, validator=None):
-        super().__init__(parent)
-        self.validator = validator
-        self.setWindowTitle("Add Custom Copy")
-        self.setModal(True)
-        self.resize(400, 200)
-        
-        # Apply Dark Theme to Dialog
-        self.setStyleSheet("""
-            QDialog { background-color: #2a2a2a; color: #f0f0f0; }
-            QLabel { color: #e0e0e0; font-weight: bold; }
-            QLineEdit { background: #3a3a3a; color: #ffffff; border: 1px solid #555; padding: 4px; }
-            QPushButton { background: #444; color: #fff; border: 1px solid #555; padding: 5px; }
-            QPushButton:hover { background: #555; }
-            QKeySequenceEdit { background: #3a3a3a; color: #ffffff; border: 1px solid #555; }
-        """)
-        
-        layout = QVBoxLayout(self)
-        
-        # Name
-        layout.addWidget(QLabel("Button Name:"))
-        self.name_edit = QLineEdit()
-        layout.addWidget(self.name_edit)
-        
-        # Path
-        layout.addWidget(QLabel("Destination Folder:"))
-        path_layout = QHBoxLayout()
-        self.path_edit = QLineEdit()
-        self.browse_btn = QPushButton("...")
-        self.browse_btn.clicked.connect(self.browse_folder)
-        path_layout.addWidget(self.path_edit)
-        path_layout.addWidget(self.browse_btn)
-        layout.addLayout(path_layout)
-        
-        # Shortcut
-        layout.addWidget(QLabel("Shortcut (Optional):"))
-        self.shortcut_edit = QKeySequenceEdit()
-        layout.addWidget(self.shortcut_edit)
-        
-        # Buttons
-        btn_layout = QHBoxLayout()
-        self.ok_btn = QPushButton("Save")
-        self.ok_btn.clicked.connect(self.validate_and_accept)
-        self.cancel_btn = QPushButton("Cancel")
-        self.cancel_btn.clicked.connect(self.reject)
-        btn_layout.addStretch()
-        btn_layout.addWidget(self.cancel_btn)
-        btn_layout.addWidget(self.ok_btn)
-        layout.addLayout(btn_layout)
-        
-    def browse_folder(self):
-        folder = QFileDialog.getExistingDirectory(self, "Select Folder")
-        if folder:
-            self.path_edit.setText(folder)
-            
-    def validate_and_accept(self):
-        shortcut = self.shortcut_edit.keySequence().toString()
-        if self.validator and shortcut:
-            is_valid, owner = self.validator(shortcut)
-            if not is_valid:
-                QMessageBox.warning(self, "Duplicate Shortcut", 
-                                  f"Shortcut '{shortcut}' is already in use by: '{owner}'.\n"
-                                  "Please choose another.")
-                return
-
-        if not self.name_edit.text() or not self.path_edit.text():
-             QMessageBox.warning(self, "Error", "Name and Folder are required.")
-             return
-             
-        self.accept()
-
-    def get_data(self):
-        return {
-            "name": self.name_edit.text(),
-            "path": self.path_edit.text(),
-            "shortcut": self.shortcut_edit.keySequence().toString()
-        }
+def button_paths(data):
+    """Destination folders of a button ("paths" list, or legacy single "path")."""
+    paths = data.get("paths")
+    if paths:
+        return list(paths)
+    return [data["path"]] if data.get("path") else []
 
 class CustomButtonsPanel(QGroupBox):
-    copy_requested = pyqtSignal(str) # Emits path
+    copy_requested = pyqtSignal(dict) # Emits the button data (destinations in "paths"/"path")
     actions_updated = pyqtSignal() # Emits when actions change so main window can re-register them
 
     def __init__(self, parent=None):
@@ -138,9 +60,14 @@ class CustomButtonsPanel(QGroupBox):
         while self.layout.count():
             item = self.layout.takeAt(0)
             widget = item.widget()
-            if widget:
-                widget.setParent(None)
-        
+            if widget is self.add_btn:
+                widget.setParent(None) # Re-added below
+            elif widget:
+                widget.deleteLater()
+        
+        # Old shortcut actions are children of the panel: delete them, not just forget them
+        for action in self.actions:
+            action.deleteLater()
         self.actions.clear()
         
         # Add "Add" button at 0,0
@@ -170,7 +97,7 @@ class CustomButtonsPanel(QGroupBox):
 
     def _create_button_ui(self, data):
         name = data.get("name", "Unnamed")
-        path = data.get("path", "")
+        paths = button_paths(data)
         shortcut = data.get("shortcut", "")
         
         text = name
@@ -178,19 +105,23 @@ class CustomButtonsPanel(QGroupBox):
             text += f" ({shortcut})"
             
         btn = QPushButton(text)
-        btn.setToolTip(f"Save to: {path}\nShortcut: {shortcut}")
-        btn.clicked.connect(lambda: self.copy_requested.emit(path))
+        tooltip = "Save to:\n  " + "\n  ".join(paths) + f"\nShortcut: {shortcut}"
+        if data.get("resample"):
+            tooltip += f"\nResampling: {data['resample']}"
+        btn.setToolTip(tooltip)
+        btn.clicked.connect(lambda: self.copy_requested.emit(data))
         
         # Create Action
         if shortcut:
             action = QAction(name, self)
             action.setShortcut(shortcut)
-            action.triggered.connect(lambda: self.copy_requested.emit(path))
+            action.triggered.connect(lambda: self.copy_requested.emit(data))
             self.actions.append(action)
             
         return btn
 
     def open_add_dialog(self):
+        from widgets.custom_button_dialog import CustomButtonDialog # Rarely used: loaded on first open
         dlg = CustomButtonDialog(self, validator=self.validator_callback)
         if dlg.exec_() == QDialog.Accepted:
             data = dlg.get_data()
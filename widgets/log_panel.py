@@ -1,19 +1,26 @@
-from PyQt5.QtWidgets import QGroupBox, QVBoxLayout, QLabel, QScrollArea
+from PyQt5.QtWidgets import QGroupBox, QVBoxLayout, QPlainTextEdit
 from PyQt5.QtCore import Qt
 
 class LogPanel(QGroupBox):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, max_lines=500):
         super().__init__("Log", parent)
         self.layout = QVBoxLayout(self)
-        self.label = QLabel("Log started...")
-        self.label.setWordWrap(True)
-        self.label.setAlignment(Qt.AlignTop)
         
-        scroll = QScrollArea()
-        scroll.setWidget(self.label)
-        scroll.setWidgetResizable(True)
-        self.layout.addWidget(scroll)
+        # Append-only view: each entry is one block, old blocks are dropped
+        # by Qt once max_lines is reached (no full relayout per entry).
+        self.view = QPlainTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setMaximumBlockCount(max_lines)
+        self.view.setLineWrapMode(QPlainTextEdit.WidgetWidth)
+        self.view.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.view.setStyleSheet("QPlainTextEdit { background: transparent; color: #e0e0e0; border: none; }")
+        self.view.setPlainText("Log started...")
+        self.layout.addWidget(self.view)
 
-    def update_log(self, entries):
-        text = "\n".join(entries)
-        self.label.setText(text)
+    def append_entry(self, message):
+        # Keep following the tail unless the user scrolled up to read
+        bar = self.view.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum() - 2
+        self.view.appendPlainText(message)
+        if at_bottom:
+            bar.setValue(bar.maximum())
@@ -112,6 +112,23 @@ class ActionsPanel(QGroupBox):
         layout.addWidget(self.btn_save_keep, 1, 0)
         layout.addWidget(self.btn_next, 1, 1)
 
+class IOStatusPanel(QGroupBox):
+    """Pending writes per destination volume."""
+    def __init__(self):
+        super().__init__("Writes")
+        layout = QVBoxLayout(self)
+        self.label = QLabel("Idle")
+        self.label.setWordWrap(True)
+        layout.addWidget(self.label)
+
+    def set_depths(self, depths):
+        busy = {name: depth for name, depth in depths.items() if depth}
+        if not busy:
+            self.label.setText("Idle")
+            return
+        lines = [f"{depth} queued → {name}" for name, depth in sorted(busy.items())]
+        self.label.setText("\n".join(lines))
+
 class Sidebar(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -143,7 +160,11 @@ class Sidebar(QWidget):
         # self.custom_panel.setTitle("Quick Tags") # Handled in class
         layout.addWidget(self.custom_panel)
         
-        # 6. Log
+        # 6. Write queues
+        self.io_panel = IOStatusPanel()
+        layout.addWidget(self.io_panel)
+        
+        # 7. Log
         self.log_panel = LogPanel()
         layout.addWidget(self.log_panel)
         